@@ -0,0 +1,239 @@
+"""
+Module: batch
+
+Runs the quiz transforms over many files without a display, e.g.
+    photo-id batch sort "trips/**/*.json"
+Files are spread over a pool of worker processes, one per core. Each worker
+opens the taxonomy cache read-only, so the memory mapped taxonomy is shared
+between them rather than copied.
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import logging
+import os
+import pathlib
+import typing
+
+from photo_id import build_manifest
+from photo_id import get_size_data
+from photo_id import get_taxonomy
+from photo_id import process_quiz
+from photo_id import taxonomy_index
+
+# Exit codes.
+OK = 0
+FAILED = 1
+NO_FILES = 2
+
+# Per process state, loaded by the first file each worker runs.
+_taxonomy: typing.Optional[taxonomy_index.TaxonomyIndex] = None
+_avonet_data: typing.Optional[dict] = None
+_manifest: typing.Optional[build_manifest.BuildManifest] = None
+
+
+class Result(typing.NamedTuple):
+    """The outcome of transforming one file."""
+
+    path: str
+    ok: bool
+    message: str
+
+
+def add_parser(subparsers) -> None:
+    """Adds the batch command and its subcommands to the argument parser."""
+    parser = subparsers.add_parser(
+        "batch", help="transform quiz files without the GUI"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: one per core)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild files even if their inputs have not changed",
+    )
+    commands = parser.add_subparsers(dest="batch_command", required=True)
+
+    sort = commands.add_parser("sort", help="sort quizzes taxonomically")
+    sort.add_argument("files", nargs="+", help="quiz files or glob patterns")
+
+    split = commands.add_parser("split", help="break quizzes into parts")
+    split.add_argument(
+        "--max-size",
+        type=int,
+        default=25,
+        help="maximum species per part (default: 25)",
+    )
+    split.add_argument("files", nargs="+", help="quiz files or glob patterns")
+
+    build = commands.add_parser(
+        "build", help="build quizzes from eBird target species lists"
+    )
+    build.add_argument(
+        "--min-frequency",
+        type=int,
+        default=0,
+        help="minimum percentage observed to include a species",
+    )
+    build.add_argument("--start-month", type=int, required=True)
+    build.add_argument("--end-month", type=int, required=True)
+    build.add_argument(
+        "--location", required=True, help="2 letter location code"
+    )
+    build.add_argument(
+        "files", nargs="+", help="target species files or glob patterns"
+    )
+
+    avonet = commands.add_parser(
+        "avonet", help="add cached Avonet data to quizzes"
+    )
+    avonet.add_argument("files", nargs="+", help="quiz files or glob patterns")
+
+
+def expand_files(patterns: typing.Iterable[str]) -> typing.List[str]:
+    """
+    Returns the files matching a list of glob patterns, in order and without
+    duplicates. '**' matches any number of directories.
+    """
+    files: typing.Dict[str, None] = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            logging.warning("No files match %s", pattern)
+        for match in matches:
+            if os.path.isfile(match):
+                files[match] = None
+    return list(files)
+
+
+def _init_worker(command: str, options: dict) -> None:
+    """Loads the data a command needs, once per worker process."""
+    global _taxonomy, _avonet_data, _manifest
+    if _manifest is None and not options.get("force"):
+        _manifest = build_manifest.BuildManifest()
+    if command in ("sort", "split") and _taxonomy is None:
+        # The refresh was started by the parent, if the cache was stale.
+        cache = get_taxonomy.ebird_taxonomy(ttl=float("inf"))
+        _taxonomy = taxonomy_index.TaxonomyIndex(cache)
+    elif command == "avonet" and _avonet_data is None:
+        _avonet_data = get_size_data.read_cached_avonet_data()
+
+
+def _transform(
+    command: str,
+    path: str,
+    options: dict,
+    manifest: typing.Optional[build_manifest.BuildManifest],
+) -> str:
+    if command == "sort":
+        corrections = process_quiz.sort_quiz(path, _taxonomy, manifest)
+        return f"sorted to {path}.sorted, {len(corrections)} corrected"
+    if command == "split":
+        corrections = process_quiz.split_quiz(
+            path, options["max_size"], _taxonomy, manifest
+        )
+        return f"split, {len(corrections)} corrected"
+    if command == "build":
+        output = str(pathlib.Path(path).with_suffix(".json"))
+        if output == path:
+            raise ValueError("target species file is already .json")
+        process_quiz.build_quiz_from_target_species(
+            path,
+            options["min_frequency"],
+            output,
+            options["start_month"],
+            options["end_month"],
+            options["location"],
+            manifest,
+        )
+        return f"built {output}"
+    process_quiz.apply_avonet_data(path, _avonet_data, manifest)
+    return "Avonet data applied"
+
+
+def run_file(command: str, path: str, options: dict) -> Result:
+    """
+    Transforms one file. Errors, including the exits of the interactive
+    code paths, are returned as a failed Result rather than raised.
+    """
+    try:
+        _init_worker(command, options)
+        manifest = None if options.get("force") else _manifest
+        hits = manifest.hits if manifest is not None else 0
+        message = _transform(command, path, options, manifest)
+        if manifest is not None and manifest.hits > hits:
+            message = "up to date"
+        return Result(path, True, message)
+    except (Exception, SystemExit) as e:
+        logging.info("Failed to %s %s", command, path, exc_info=True)
+        return Result(path, False, str(e) or type(e).__name__)
+
+
+def run_files(
+    command: str,
+    files: typing.List[str],
+    options: dict,
+    jobs: int = 1,
+) -> typing.Iterator[Result]:
+    """
+    Transforms files across a pool of processes, yielding results in the
+    order the files were given.
+    """
+    if jobs <= 1 or len(files) <= 1:
+        for path in files:
+            yield run_file(command, path, options)
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(files))
+    ) as pool:
+        yield from pool.map(
+            run_file,
+            [command] * len(files),
+            files,
+            [options] * len(files),
+        )
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Runs a batch command and prints a line per file.
+
+    Returns:
+        int: The exit code, OK, FAILED if any file failed or NO_FILES.
+    """
+    files = expand_files(args.files)
+    if not files:
+        print("No files to process")
+        return NO_FILES
+    command = args.batch_command
+    if command in ("sort", "split"):
+        # Make sure the cache exists before the workers all open it.
+        get_taxonomy.ebird_taxonomy().close()
+    elif command == "avonet" and not get_size_data.read_cached_avonet_data():
+        # Otherwise every quiz would be reported as updated with nothing.
+        print("No cached Avonet data, refresh and process it in the app first")
+        return FAILED
+    options = {
+        name: getattr(args, name)
+        for name in (
+            "max_size",
+            "min_frequency",
+            "start_month",
+            "end_month",
+            "location",
+            "force",
+        )
+        if hasattr(args, name)
+    }
+    failed = 0
+    for result in run_files(command, files, options, args.jobs):
+        status = "ok" if result.ok else "FAILED"
+        print(f"{status:6} {result.path}: {result.message}")
+        failed += not result.ok
+    print(f"{len(files)} file(s), {failed} failed")
+    return FAILED if failed else OK
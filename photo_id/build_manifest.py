@@ -0,0 +1,141 @@
+"""
+Module: build_manifest
+
+Remembers what each quiz transform was last built from, so running it again
+over unchanged inputs does nothing. For each transform and source file the
+manifest records a hash of the source's content and the parameters that
+affect the result (taxonomy version, Avonet data, sizes), along with the
+size and modification time of every file it wrote. A transform is current
+when the hash matches and its outputs have not been touched since.
+
+The manifest is a small SQLite database, so the worker processes of a batch
+run can share it safely.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import typing
+
+MANIFEST_FILE = ".cache/build_manifest.sqlite"
+
+# The last object passed to data_version and its digest.
+_last_data: typing.Tuple[typing.Any, str] = (None, "")
+
+
+def data_version(data: typing.Any) -> str:
+    """
+    Returns a digest of JSON-like data, e.g. the Avonet data. The digest of
+    the last object is remembered, so calling this for every file is cheap.
+    """
+    global _last_data
+    if data is not _last_data[0]:
+        encoded = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        _last_data = (
+            data,
+            hashlib.sha256(encoded.encode("utf-8")).hexdigest(),
+        )
+    return _last_data[1]
+
+
+def _stat(path: str) -> typing.Optional[typing.List[int]]:
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    return [status.st_size, status.st_mtime_ns]
+
+
+class BuildManifest:
+    """
+    The record of previous builds.
+
+    Args:
+        path (str): The manifest database. Defaults to MANIFEST_FILE.
+    """
+
+    def __init__(self, path: str = MANIFEST_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS builds ("
+            "transform TEXT, source TEXT, key TEXT, outputs TEXT, "
+            "PRIMARY KEY (transform, source))"
+        )
+        self._db.commit()
+        # How many transforms were found to be current.
+        self.hits = 0
+
+    def close(self) -> None:
+        """Closes the manifest database."""
+        self._db.close()
+
+    @staticmethod
+    def _key(
+        transform: str, source: str, params: typing.Any
+    ) -> typing.Optional[str]:
+        try:
+            with open(source, mode="rb") as file:
+                content = file.read()
+        except OSError:
+            return None
+        key = hashlib.sha256(
+            json.dumps([transform, params], sort_keys=True).encode("utf-8")
+        )
+        key.update(b"\0")
+        key.update(content)
+        return key.hexdigest()
+
+    def is_current(
+        self, transform: str, source: str, params: typing.Any
+    ) -> bool:
+        """
+        Returns whether a transform of a source file was already built with
+        the same content and parameters, and its outputs are unchanged.
+        """
+        row = self._db.execute(
+            "SELECT key, outputs FROM builds WHERE transform=? AND source=?",
+            (transform, os.path.abspath(source)),
+        ).fetchone()
+        if row is None or row[0] != self._key(transform, source, params):
+            return False
+        for path, status in json.loads(row[1]):
+            if _stat(path) != status:
+                return False
+        self.hits += 1
+        return True
+
+    def record(
+        self,
+        transform: str,
+        source: str,
+        params: typing.Any,
+        outputs: typing.Iterable[str],
+    ) -> None:
+        """
+        Records that a transform of a source file was built, after its
+        outputs were written. A source transformed in place lists itself
+        as an output and is hashed as it is now.
+        """
+        key = self._key(transform, source, params)
+        if key is None:
+            return
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?)",
+                (
+                    transform,
+                    os.path.abspath(source),
+                    key,
+                    json.dumps(
+                        [
+                            [os.path.abspath(path), _stat(path)]
+                            for path in outputs
+                        ]
+                    ),
+                ),
+            )
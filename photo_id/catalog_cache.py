@@ -0,0 +1,183 @@
+"""
+Module: catalog_cache
+
+A persistent cache of Macaulay Library catalog searches. Scraping the
+catalog is the slowest and most rate limited request the quiz makes, and its
+results rarely change, so the asset IDs found for each species, region and
+month range are kept in a small SQLite database. Entries older than the TTL
+are still used, and refreshed for next time by a low priority job on the
+shared scheduler.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+from photo_id import scheduler
+from photo_id.scheduler import Priority
+
+CACHE_FILE = ".cache/catalog.sqlite"
+# Days before a catalog search is repeated.
+ttl_days_name = "PHOTO_ID_CATALOG_TTL_DAYS"
+default_ttl_days = 14
+
+_shared: typing.Optional["CatalogCache"] = None
+_shared_lock = threading.Lock()
+
+
+def catalog_ttl() -> float:
+    """
+    Returns how long a catalog search is fresh for, in seconds.
+    """
+    try:
+        days = float(os.getenv(ttl_days_name, default_ttl_days))
+    except ValueError:
+        logging.warning(
+            "Ignoring invalid %s, using %d days",
+            ttl_days_name,
+            default_ttl_days,
+        )
+        days = default_ttl_days
+    return days * 24 * 60 * 60
+
+
+class CatalogKey(typing.NamedTuple):
+    """A catalog search. An empty region or months 1 to 12 match all."""
+
+    species_code: str
+    region: str
+    begin_month: int
+    end_month: int
+
+
+def catalog_key(
+    species_code: str, region: str, begin_month, end_month
+) -> CatalogKey:
+    """Returns the key of a search, with months as numbers."""
+    return CatalogKey(
+        species_code, region or "", int(begin_month), int(end_month)
+    )
+
+
+class CatalogEntry(typing.NamedTuple):
+    """The asset IDs a search found, and whether they are due a refresh."""
+
+    asset_ids: typing.List[str]
+    stale: bool
+
+
+class CatalogCache:
+    """
+    Catalog search results keyed by CatalogKey. Safe to use from several
+    threads and processes.
+
+    Args:
+        path (str): The cache database.
+        ttl (float, optional): Seconds a result is fresh for. Defaults to
+            the PHOTO_ID_CATALOG_TTL_DAYS environment variable or 14 days.
+    """
+
+    def __init__(
+        self, path: str = CACHE_FILE, ttl: typing.Optional[float] = None
+    ):
+        self.ttl = catalog_ttl() if ttl is None else ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._revalidating: typing.Set[CatalogKey] = set()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "species_code TEXT, region TEXT, begin_month INTEGER, "
+                "end_month INTEGER, asset_ids TEXT, fetched_at REAL, "
+                "PRIMARY KEY (species_code, region, begin_month, end_month))"
+            )
+
+    def close(self) -> None:
+        """Closes the cache database."""
+        with self._lock:
+            self._db.close()
+
+    def get(self, key: CatalogKey) -> typing.Optional[CatalogEntry]:
+        """Returns the cached result of a search, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT asset_ids, fetched_at FROM searches WHERE "
+                "species_code=? AND region=? AND begin_month=? "
+                "AND end_month=?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        return CatalogEntry(
+            json.loads(row[0]), time.time() - row[1] > self.ttl
+        )
+
+    def put(self, key: CatalogKey, asset_ids: typing.List[str]) -> None:
+        """Stores the result of a search."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(list(asset_ids)), time.time()),
+            )
+
+    def revalidate(
+        self,
+        key: CatalogKey,
+        search: typing.Callable[[], typing.List[str]],
+    ) -> typing.Optional[scheduler.Job]:
+        """
+        Queues a search to be repeated on the shared scheduler, behind any
+        image work, and its result stored. Returns the job, or None if the
+        search is already being repeated.
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return None
+            self._revalidating.add(key)
+
+        def run() -> None:
+            try:
+                self.put(key, search())
+            except Exception as e:
+                logging.warning("Catalog refresh of %s failed: %s", key, e)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        return scheduler.shared_scheduler().submit(run, Priority.WARMING)
+
+    def lookup(
+        self,
+        key: CatalogKey,
+        search: typing.Callable[[], typing.List[str]],
+    ) -> typing.List[str]:
+        """
+        Returns the asset IDs for a search. A cached result is returned
+        straight away, and refreshed in the background if it is stale;
+        otherwise the search is run and its result cached.
+        """
+        entry = self.get(key)
+        if entry is None:
+            asset_ids = search()
+            self.put(key, asset_ids)
+            return asset_ids
+        if entry.stale:
+            self.revalidate(key, search)
+        return entry.asset_ids
+
+
+def shared_cache() -> CatalogCache:
+    """Returns the catalog cache shared by the whole process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CatalogCache()
+        return _shared
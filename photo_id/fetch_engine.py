@@ -0,0 +1,272 @@
+"""
+Module: fetch_engine
+
+Coordinates every catalog and image request made by the quiz windows. An
+asyncio event loop on a background thread admits requests, limiting how many
+are in flight to each host at once and, for hosts that throttle clients, how
+fast new ones start using a token bucket. Admitted requests run on the shared
+HTTP session from http_client in a pool of threads, so many can overlap
+without blocking the Tk thread, and the limits hold across all open windows.
+A streamed response keeps its place in its host's limit until it is closed,
+so reading its body counts as being in flight.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import time
+import typing
+import urllib.parse
+import weakref
+
+import requests
+
+from photo_id import http_client
+
+CATALOG_HOST = "media.ebird.org"
+# Most requests in flight to one host.
+DEFAULT_HOST_LIMIT = 8
+HOST_LIMITS = {CATALOG_HOST: 4}
+# Requests started per second and the burst allowed, for throttled hosts.
+HOST_RATES = {CATALOG_HOST: (2.0, 5)}
+# Most requests in flight across all hosts.
+MAX_IN_FLIGHT = 32
+
+_shared: typing.Optional["FetchEngine"] = None
+_shared_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Limits how often something starts. Holds up to `burst` tokens, refilled
+    at `rate` tokens a second; each acquire waits for and takes one. Must be
+    used from a single event loop.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock: typing.Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Waiters queue on the lock so tokens are handed out in order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FetchEngine:
+    """
+    Runs HTTP GET requests under per-host concurrency and rate limits.
+
+    Args:
+        host_limits (dict, optional): Most requests in flight by host name.
+        host_rates (dict, optional): (requests a second, burst) by host name.
+        default_limit (int): Most requests in flight to other hosts.
+        max_in_flight (int): Most requests in flight in total.
+    """
+
+    def __init__(
+        self,
+        host_limits: typing.Optional[typing.Dict[str, int]] = None,
+        host_rates: typing.Optional[
+            typing.Dict[str, typing.Tuple[float, int]]
+        ] = None,
+        default_limit: int = DEFAULT_HOST_LIMIT,
+        max_in_flight: int = MAX_IN_FLIGHT,
+    ):
+        self.host_limits = dict(
+            HOST_LIMITS if host_limits is None else host_limits
+        )
+        self.host_rates = dict(
+            HOST_RATES if host_rates is None else host_rates
+        )
+        self.default_limit = default_limit
+        self._semaphores: typing.Dict[str, asyncio.Semaphore] = {}
+        self._buckets: typing.Dict[str, TokenBucket] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="photo-id-fetch"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="photo-id-fetch", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops the engine. Requests still queued or running are cancelled, so
+        nothing is left waiting for them.
+        """
+        asyncio.run_coroutine_threadsafe(
+            self._cancel_all(), self._loop
+        ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._loop.close()
+
+    async def _cancel_all(self) -> None:
+        tasks = [
+            task
+            for task in asyncio.all_tasks()
+            if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def fetch(
+        self, url: str, timeout: float = http_client.READ_TIMEOUT, **kwargs
+    ) -> concurrent.futures.Future:
+        """
+        Queues a GET request. Returns a future for the requests.Response;
+        cancelling it drops the request if it has not started. A response
+        requested with stream=True must be closed once read, to let the
+        next request to its host start.
+
+        Args:
+            url (str): The address to fetch.
+            timeout (float): Seconds allowed between bytes of the response.
+            **kwargs: Passed on to http_client.get.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._fetch(url, timeout, kwargs), self._loop
+        )
+
+    def get(
+        self, url: str, timeout: float = http_client.READ_TIMEOUT, **kwargs
+    ) -> requests.Response:
+        """Sends a GET request and waits for the response."""
+        return self.fetch(url, timeout, **kwargs).result()
+
+    async def _fetch(
+        self, url: str, timeout: float, kwargs: dict
+    ) -> requests.Response:
+        host = urllib.parse.urlsplit(url).hostname or ""
+        semaphore = self._semaphore(host)
+        await semaphore.acquire()
+        try:
+            bucket = self._bucket(host)
+            if bucket is not None:
+                await bucket.acquire()
+            response = await self._loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    http_client.get, url, timeout=timeout, **kwargs
+                ),
+            )
+        except BaseException:
+            semaphore.release()
+            raise
+        if not kwargs.get("stream"):
+            semaphore.release()
+            return response
+        self._release_on_close(response, semaphore)
+        return response
+
+    def _release_on_close(
+        self, response: requests.Response, semaphore: asyncio.Semaphore
+    ) -> None:
+        """
+        Keeps a streamed response's host slot until its body has been read
+        and it is closed, or it is garbage collected.
+        """
+        release = weakref.finalize(response, self._release, semaphore)
+        release.atexit = False
+        close = response.close
+
+        def close_and_release() -> None:
+            try:
+                close()
+            finally:
+                release()
+
+        response.close = close_and_release
+
+    def _release(self, semaphore: asyncio.Semaphore) -> None:
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(semaphore.release)
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(
+                self.host_limits.get(host, self.default_limit)
+            )
+        return self._semaphores[host]
+
+    def _bucket(self, host: str) -> typing.Optional[TokenBucket]:
+        if host not in self._buckets and host in self.host_rates:
+            self._buckets[host] = TokenBucket(*self.host_rates[host])
+        return self._buckets.get(host)
+
+
+class FetchGroup:
+    """
+    Requests that can be called off together, such as searches made in case
+    they are needed. Cancelling the group drops its requests that are still
+    waiting for a host slot or a token, or for their response, and refuses
+    any made after it.
+
+    Args:
+        engine (FetchEngine, optional): Sends the requests. Defaults to the
+            engine shared by the whole process.
+    """
+
+    def __init__(self, engine: typing.Optional[FetchEngine] = None):
+        self.engine = engine or shared_engine()
+        self._lock = threading.Lock()
+        self._futures: typing.Set[concurrent.futures.Future] = set()
+        self._cancelled = False
+
+    def get(
+        self, url: str, timeout: float = http_client.READ_TIMEOUT, **kwargs
+    ) -> requests.Response:
+        """
+        Sends a GET request and waits for the response.
+
+        Raises:
+            concurrent.futures.CancelledError: The group was cancelled.
+        """
+        with self._lock:
+            if self._cancelled:
+                raise concurrent.futures.CancelledError
+            future = self.engine.fetch(url, timeout, **kwargs)
+            self._futures.add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+
+    def cancel(self) -> None:
+        """Drops the requests still waiting and refuses any more."""
+        with self._lock:
+            self._cancelled = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+
+def shared_engine() -> FetchEngine:
+    """Returns the fetch engine shared by the whole process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = FetchEngine()
+        return _shared
@@ -0,0 +1,133 @@
+"""
+Module: fuzzy_names
+
+Approximate matching of species names. Names are normalised (case,
+hyphens, punctuation, Grey/Gray) and broken into character trigrams, and an
+inverted index from trigram to names finds the few candidates worth
+comparing, so a miss is resolved without scanning every name.
+"""
+
+import collections
+import difflib
+import heapq
+import itertools
+import math
+import re
+import typing
+
+# Minimum similarity, from 0 to 1, for a name to be corrected automatically.
+DEFAULT_THRESHOLD = 0.85
+# How many of the best trigram candidates are compared in full.
+CANDIDATES = 8
+# Lowest trigram similarity (Dice coefficient) a candidate can have and still
+# be found. Candidates must share one of the query's rarer trigrams, so the
+# long posting lists of very common trigrams never have to be read.
+MIN_TRIGRAM_SIMILARITY = 0.6
+
+_SPELLINGS = {"grey": "gray", "&": "and"}
+_SEPARATORS = re.compile(r"[-_/]+")
+_PUNCTUATION = re.compile(r"[^\w\s&]+")
+
+
+def normalise(name: str) -> str:
+    """Returns a name reduced to lower case words with common variants
+    spelled one way, so 'Grey-headed' and 'Gray Headed' look the same."""
+    name = _SEPARATORS.sub(" ", name.casefold())
+    name = _PUNCTUATION.sub("", name)
+    return " ".join(_SPELLINGS.get(word, word) for word in name.split())
+
+
+def trigrams(name: str) -> typing.Set[str]:
+    """Returns the character trigrams of a normalised name."""
+    if not name:
+        return set()
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Match(typing.NamedTuple):
+    """A fuzzy match: the position of the matched name and its score."""
+
+    position: int
+    name: str
+    score: float
+
+
+class FuzzyNameIndex:
+    """
+    A trigram index over a list of names.
+
+    Args:
+        names: (position, name) pairs. The position is returned with a match
+            and is typically the position of the entry in the taxonomy.
+    """
+
+    def __init__(self, names: typing.Iterable[typing.Tuple[int, str]]):
+        self._positions: typing.List[int] = []
+        self._names: typing.List[str] = []
+        self._normalised: typing.List[str] = []
+        self._sizes: typing.List[int] = []
+        self._exact: typing.Dict[str, int] = {}
+        postings: typing.Dict[str, typing.List[int]] = collections.defaultdict(
+            list
+        )
+        for position, name in names:
+            if not name:
+                continue
+            key = normalise(name)
+            grams = trigrams(key)
+            number = len(self._names)
+            self._positions.append(position)
+            self._names.append(name)
+            self._normalised.append(key)
+            self._sizes.append(len(grams))
+            self._exact.setdefault(key, number)
+            for gram in grams:
+                postings[gram].append(number)
+        self._postings = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def match(
+        self, name: str, threshold: float = DEFAULT_THRESHOLD
+    ) -> typing.Optional[Match]:
+        """
+        Returns the closest name scoring at least the threshold, or None.
+        """
+        key = normalise(name)
+        number = self._exact.get(key)
+        if number is not None:
+            return Match(self._positions[number], self._names[number], 1.0)
+        grams = trigrams(key)
+        if not grams:
+            return None
+        # A name sharing o of the query's q trigrams has a Dice coefficient
+        # of at most 2o/(q+o), so it must share at least `needed` of them and
+        # therefore one of the q - needed + 1 rarest.
+        needed = math.ceil(
+            MIN_TRIGRAM_SIMILARITY * len(grams) / (2 - MIN_TRIGRAM_SIMILARITY)
+        )
+        rarest = sorted(
+            (self._postings.get(gram, ()) for gram in grams), key=len
+        )[: len(grams) - needed + 1]
+        shared = collections.Counter(itertools.chain.from_iterable(rarest))
+        # Dice coefficient on trigrams ranks candidates cheaply; the best few
+        # are then scored exactly on the normalised strings.
+        candidates = heapq.nlargest(
+            CANDIDATES,
+            (number for number, _ in shared.most_common(4 * CANDIDATES)),
+            key=lambda n: 2 * shared[n] / (len(grams) + self._sizes[n]),
+        )
+        best: typing.Optional[Match] = None
+        for number in candidates:
+            score = difflib.SequenceMatcher(
+                None, key, self._normalised[number]
+            ).ratio()
+            if best is None or score > best.score:
+                best = Match(
+                    self._positions[number], self._names[number], score
+                )
+        if best is None or best.score < threshold:
+            return None
+        return best
@@ -14,6 +14,8 @@ import zipfile
 import openpyxl
 import requests
 
+from photo_id import http_client
+
 
 def read_xlsx_to_dict(
     file_path: str, sheet_name: str, columns: list = None
@@ -99,7 +101,7 @@ def download_file(url: str, dest_path: str):
     # Function implementation goes here
     try:
         # Make HTTP request to download the file
-        response = requests.get(url, timeout=30)
+        response = http_client.get(url, timeout=30)
         # Raise an exception if the request was unsuccessful
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
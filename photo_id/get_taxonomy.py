@@ -1,32 +1,250 @@
-from ebird.api import get_taxonomy
+from ebird.api import get_taxonomy, get_taxonomy_versions
 import json
+import logging
 import os
+import shutil
 import sys
+import threading
+import time
+import typing
+import urllib.error
+
+from photo_id import taxonomy_cache
+from photo_id import taxonomy_index
 
 ebird_api_key_name = "EBIRDAPIKEY"
+# Days before the cached taxonomy is revalidated against eBird.
+ttl_days_name = "PHOTO_ID_TAXONOMY_TTL_DAYS"
+default_ttl_days = 30
+cache_file = ".cache/taxonomy.bin"
+# JSON cache written by earlier versions, converted on first use.
+legacy_cache_file = ".cache/taxonomy"
+# Other locales only cache the common names, keyed by species code.
+locale_fields = ("speciesCode", "comName")
+# Superseded English taxonomies are kept here for migrating quizzes.
+versions_directory = ".cache/versions"
+
+
+def cache_path(locale: str = "en") -> str:
+    """
+    Returns the cache file for the taxonomy in a locale.
+    """
+    if locale == "en":
+        return cache_file
+    return f".cache/taxonomy-{locale}.bin"
+
+
+def ebird_api_key() -> typing.Optional[str]:
+    """
+    Returns the ebird API key from the environment.
+    """
+    ebird_api_key = os.getenv(ebird_api_key_name)
+    if ebird_api_key == "0":
+        sys.exit(
+            "ebird API key must be specified in the "
+            + ebird_api_key_name
+            + " environment variable."
+        )
+    return ebird_api_key
+
+
+def taxonomy_ttl() -> float:
+    """
+    Returns how long a cached taxonomy is fresh for, in seconds.
+    """
+    try:
+        days = float(os.getenv(ttl_days_name, default_ttl_days))
+    except ValueError:
+        logging.warning(
+            "Ignoring invalid %s, using %d days",
+            ttl_days_name,
+            default_ttl_days,
+        )
+        days = default_ttl_days
+    return days * 24 * 60 * 60
+
+
+def latest_taxonomy_version(api_key: str) -> str:
+    """
+    Returns the version of the latest ebird taxonomy.
+    """
+    for version in get_taxonomy_versions(api_key):
+        if version.get("latest"):
+            return str(version["authorityVer"])
+    return ""
+
+
+def version_path(version: str) -> str:
+    """
+    Returns the file a superseded taxonomy version is archived in.
+    """
+    return os.path.join(versions_directory, f"taxonomy-{version}.bin")
+
+
+def archive_name(path: str, cached_version: str) -> str:
+    """
+    Returns the name a cache is archived under when it is superseded. A
+    cache converted from the legacy format has no version, so it is named
+    after the date it was fetched instead.
+    """
+    if cached_version:
+        return cached_version
+    cache = taxonomy_cache.open_cache(path)
+    try:
+        fetched_at = cache.fetched_at
+    finally:
+        cache.close()
+    return time.strftime("fetched-%Y-%m-%d", time.gmtime(fetched_at))
 
 
-def ebird_taxonomy() -> list:
+def cached_versions() -> typing.Dict[str, str]:
     """
-    Retrieves the ebird taxonomy.
+    Returns the cache file of each taxonomy version available locally,
+    keyed by version, including the current cache.
+    """
+    versions = {}
+    if os.path.isdir(versions_directory):
+        for name in sorted(os.listdir(versions_directory)):
+            if name.startswith("taxonomy-") and name.endswith(".bin"):
+                version = name[len("taxonomy-") : -len(".bin")]
+                versions[version] = os.path.join(versions_directory, name)
+    try:
+        cache = taxonomy_cache.open_cache(cache_file)
+    except taxonomy_cache.TaxonomyCacheError:
+        return versions
+    versions[cache.taxonomy_version] = cache_file
+    cache.close()
+    return versions
+
+
+def fetch_taxonomy(api_key: str, locale: str = "en") -> list:
+    """
+    Downloads the ebird taxonomy. For locales other than English only the
+    species codes and common names are kept.
+    """
+    taxonomy = get_taxonomy(api_key, locale=locale)
+    if locale == "en":
+        return taxonomy
+    return [
+        {name: entry[name] for name in locale_fields if name in entry}
+        for entry in taxonomy
+    ]
+
+
+def refresh_taxonomy(cached_version: str = "", locale: str = "en") -> None:
+    """
+    Revalidates the cached taxonomy against ebird. If ebird has a newer
+    version it is downloaded, otherwise the cache is re-stamped as fresh.
+    Either way the cache file is replaced atomically, and a failure leaves
+    the existing cache in place.
+
+    Parameters:
+    cached_version (str): The taxonomy version currently in the cache.
+    locale (str): The locale of the cached common names.
+    """
+    path = cache_path(locale)
+    try:
+        api_key = ebird_api_key()
+        version = latest_taxonomy_version(api_key)
+        if version and version == cached_version:
+            cache = taxonomy_cache.open_cache(path)
+            try:
+                taxonomy = list(cache)
+            finally:
+                cache.close()
+            logging.info("Taxonomy version %s is current", version)
+        else:
+            logging.info("Downloading taxonomy version %s", version)
+            taxonomy = fetch_taxonomy(api_key, locale)
+            if locale == "en" and os.path.isfile(path):
+                os.makedirs(versions_directory, exist_ok=True)
+                shutil.copyfile(
+                    path, version_path(archive_name(path, cached_version))
+                )
+        taxonomy_cache.write_cache(path, taxonomy, version)
+    except (urllib.error.URLError, ValueError, OSError) as e:
+        logging.warning("Taxonomy refresh failed: %s", str(e))
+
+
+def start_refresh(
+    cached_version: str = "", locale: str = "en"
+) -> threading.Thread:
+    """
+    Runs refresh_taxonomy in a background thread and returns the thread.
+    """
+    thread = threading.Thread(
+        target=refresh_taxonomy,
+        args=(cached_version, locale),
+        name="taxonomy-refresh",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def ebird_taxonomy(
+    ttl: typing.Optional[float] = None, locale: str = "en"
+) -> taxonomy_cache.TaxonomyCache:
+    """
+    Retrieves the ebird taxonomy. A cached taxonomy older than the TTL is
+    still returned, and refreshed in the background for the next launch.
+    Each locale has its own cache, fetched the first time it is asked for.
+
+    Parameters:
+    ttl (float, optional): Seconds a cached taxonomy is fresh for. Defaults
+    to the PHOTO_ID_TAXONOMY_TTL_DAYS environment variable or 30 days.
+    locale (str): The locale of the common names. Other than for English,
+    only the speciesCode and comName of each entry are returned.
 
     Returns:
-        list: The ebird taxonomy.
-    """
-    taxonomy = []
-    cache_file = ".cache/taxonomy"
-    if not os.path.isfile(cache_file):
-        ebird_api_key = os.getenv(ebird_api_key_name)
-        if ebird_api_key == "0":
-            sys.exit(
-                "ebird API key must be specified in the "
-                + ebird_api_key_name
-                + " environment variable."
-            )
-        taxonomy = get_taxonomy(ebird_api_key)
-        with open(cache_file, encoding="utf-8", mode="wt") as f:
-            json.dump(taxonomy, f)
+        TaxonomyCache: The ebird taxonomy as a lazily decoded list of dicts.
+    """
+    if ttl is None:
+        ttl = taxonomy_ttl()
+    path = cache_path(locale)
+    try:
+        cache = taxonomy_cache.open_cache(path)
+    except taxonomy_cache.TaxonomyCacheError as e:
+        logging.info("Rebuilding taxonomy cache: %s", str(e))
     else:
-        with open(cache_file, encoding="utf-8", mode="rt") as f:
+        if cache.age() > ttl:
+            logging.info("Taxonomy cache is stale, refreshing")
+            start_refresh(cache.taxonomy_version, locale)
+        return cache
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if locale == "en" and os.path.isfile(legacy_cache_file):
+        with open(legacy_cache_file, encoding="utf-8", mode="rt") as f:
             taxonomy = json.load(f)
-    return taxonomy
+        # Unknown version, so let the TTL decide when to revalidate it.
+        taxonomy_cache.write_cache(
+            cache_file,
+            taxonomy,
+            fetched_at=os.path.getmtime(legacy_cache_file),
+        )
+    else:
+        api_key = ebird_api_key()
+        taxonomy_cache.write_cache(
+            path,
+            fetch_taxonomy(api_key, locale),
+            latest_taxonomy_version(api_key),
+        )
+    return taxonomy_cache.open_cache(path)
+
+
+def load_locale(index: taxonomy_index.TaxonomyIndex, locale: str) -> None:
+    """
+    Adds the common names of a locale to a taxonomy index, if they are not
+    already there, so quizzes written in that language can be resolved.
+    """
+    if not locale or locale == "en" or locale in index.locales:
+        return
+    try:
+        names = ebird_taxonomy(locale=locale)
+    except (urllib.error.URLError, ValueError) as e:
+        logging.error("Could not load taxonomy locale %s: %s", locale, str(e))
+        return
+    try:
+        index.add_locale(locale, names)
+    finally:
+        names.close()
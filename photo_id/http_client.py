@@ -0,0 +1,106 @@
+"""
+Module: http_client
+
+The HTTP client shared by every network call the app makes. A single
+requests.Session per process keeps connections to each host alive between
+requests, so fetching a catalog page and then its images pays for one TCP
+and TLS handshake per host instead of one per request. Timeouts and
+connection retries are set here once rather than at every call site.
+"""
+
+import logging
+import os
+import threading
+import typing
+
+import requests
+import requests.adapters
+import urllib3.util
+
+# Connections kept open to each host.
+pool_size_name = "PHOTO_ID_HTTP_POOL_SIZE"
+default_pool_size = 16
+# Number of hosts whose connections are kept open.
+POOL_HOSTS = 8
+# Seconds allowed to open a connection.
+CONNECT_TIMEOUT = 5
+# Seconds allowed between bytes of a response, unless a call says otherwise.
+READ_TIMEOUT = 20
+# Attempts to open a connection before giving up. Requests that reached the
+# server are not repeated here; see the retry module.
+CONNECT_RETRIES = 2
+
+_session: typing.Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    """
+    Returns the connections to keep open to each host, from the environment.
+    """
+    try:
+        size = int(os.getenv(pool_size_name, default_pool_size))
+        if size < 1:
+            raise ValueError(size)
+    except ValueError:
+        logging.warning(
+            "Ignoring invalid %s, using %d", pool_size_name, default_pool_size
+        )
+        size = default_pool_size
+    return size
+
+
+def new_session(size: typing.Optional[int] = None) -> requests.Session:
+    """
+    Returns a session with pooled keep-alive connections.
+
+    Args:
+        size (int, optional): Connections kept open to each host. Defaults
+            to the PHOTO_ID_HTTP_POOL_SIZE environment variable or 16.
+    """
+    if size is None:
+        size = pool_size()
+    retries = urllib3.util.Retry(
+        total=CONNECT_RETRIES,
+        connect=CONNECT_RETRIES,
+        read=0,
+        status=0,
+        redirect=5,
+        backoff_factor=0.2,
+        # Retrying responses, Retry-After included, is left to retry.get.
+        respect_retry_after_header=False,
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=POOL_HOSTS,
+        pool_maxsize=size,
+        max_retries=retries,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def shared_session() -> requests.Session:
+    """Returns the session shared by the whole process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = new_session()
+        return _session
+
+
+def get(
+    url: str, timeout: float = READ_TIMEOUT, **kwargs
+) -> requests.Response:
+    """
+    Sends a GET request on the shared session.
+
+    Args:
+        url (str): The address to fetch.
+        timeout (float): Seconds allowed between bytes of the response.
+        **kwargs: Passed on to requests.Session.get.
+    """
+    return shared_session().get(
+        url, timeout=(CONNECT_TIMEOUT, timeout), **kwargs
+    )
@@ -0,0 +1,166 @@
+"""
+Module: image_cache
+
+A disk cache for downloaded quiz images, shared by every window and every
+running copy of the app. Each image is stored in a file named after a hash
+of its URL, written under a temporary name and renamed into place, and a
+small SQLite index records its size and when it was last used. When the
+cache grows past its byte budget the least recently used images are removed.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import typing
+
+CACHE_DIRECTORY = ".cache/images"
+# Megabytes of images kept on disk.
+budget_name = "PHOTO_ID_IMAGE_CACHE_MB"
+default_budget_mb = 500
+
+_shared: typing.Optional["ImageCache"] = None
+_shared_lock = threading.Lock()
+
+
+def cache_budget() -> int:
+    """
+    Returns the most bytes of images to keep, from the environment.
+    """
+    try:
+        megabytes = float(os.getenv(budget_name, default_budget_mb))
+    except ValueError:
+        logging.warning(
+            "Ignoring invalid %s, using %d MB", budget_name, default_budget_mb
+        )
+        megabytes = default_budget_mb
+    return int(megabytes * 1024 * 1024)
+
+
+class ImageCache:
+    """
+    A least recently used cache of image bytes keyed by URL. Safe to use
+    from several threads and several processes at once.
+
+    Args:
+        directory (str): Where the images and index are kept.
+        max_bytes (int, optional): The byte budget. Defaults to the
+            PHOTO_ID_IMAGE_CACHE_MB environment variable or 500 MB.
+    """
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIRECTORY,
+        max_bytes: typing.Optional[int] = None,
+    ):
+        self.directory = directory
+        self.max_bytes = cache_budget() if max_bytes is None else max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "key TEXT PRIMARY KEY, size INTEGER, accessed REAL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS images_accessed "
+                "ON images (accessed)"
+            )
+
+    def close(self) -> None:
+        """Closes the index."""
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, url: str) -> typing.Optional[bytes]:
+        """Returns the cached bytes of an image, or None."""
+        key = self._key(url)
+        try:
+            with open(self._path(key), mode="rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE images SET accessed=? WHERE key=?", (time.time(), key)
+            )
+        return data
+
+    def put(self, url: str, data: bytes) -> None:
+        """Stores the bytes of an image, evicting old images if needed."""
+        key = self._key(url)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="wb", dir=self.directory, prefix=".image-", delete=False
+        ) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            # Another process may have the same image open on Windows.
+            os.remove(f.name)
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?)",
+                (key, len(data), time.time()),
+            )
+            self._evict()
+
+    def size(self) -> int:
+        """Returns the bytes of images in the cache."""
+        with self._lock:
+            (total,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM images"
+            ).fetchone()
+        return total
+
+    def _evict(self) -> None:
+        """Removes least recently used images until within the budget."""
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM images"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM images ORDER BY accessed"
+        ):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # In use by another process, try again later
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM images WHERE key=?", evicted)
+        logging.info("Evicted %d images from the image cache", len(evicted))
+
+
+def shared_cache() -> ImageCache:
+    """Returns the image cache shared by the whole process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ImageCache()
+        return _shared
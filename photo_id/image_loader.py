@@ -0,0 +1,109 @@
+"""
+Module: image_loader
+
+Loads quiz images in the background. Work such as searching the catalog and
+downloading and decoding photos runs on the worker threads of the shared
+priority scheduler, so network requests start in order of priority, and each
+result is handed back to the Tk thread, which is the only thread allowed to
+touch widgets, through a queue polled with root.after.
+Each poll delivers results for a limited time, so a burst of finished
+images is shown over several turns of the event loop instead of freezing
+the window.
+"""
+
+import logging
+import queue
+import time
+import typing
+
+from photo_id import scheduler
+from photo_id.scheduler import Priority
+
+# Milliseconds between checks for finished work.
+POLL_INTERVAL = 50
+# Seconds a poll may spend delivering results before yielding to Tk.
+DELIVERY_BUDGET = 0.015
+
+
+class ImageLoader:
+    """
+    Runs image work on worker threads for one window.
+
+    Args:
+        root: The Tk widget whose event loop receives the results.
+        work_scheduler (Scheduler, optional): Runs the work. Defaults to
+            the scheduler shared by all windows.
+    """
+
+    def __init__(
+        self,
+        root,
+        work_scheduler: typing.Optional[scheduler.Scheduler] = None,
+    ):
+        self.root = root
+        self.scheduler = work_scheduler or scheduler.shared_scheduler()
+        self._results: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(
+        self,
+        work: typing.Callable[[], typing.Any],
+        done: typing.Callable[[typing.Any], None],
+        priority: Priority = Priority.FIRST_IMAGE,
+        failed: typing.Optional[typing.Callable[[Exception], None]] = None,
+    ) -> scheduler.Job:
+        """
+        Runs work on a worker thread, then calls done with its result on the
+        Tk thread, or failed with its exception if it raised one. Must be
+        called from the Tk thread.
+        """
+        job = self.scheduler.submit(work, priority, owner=self)
+        self._pending += 1
+        job.add_done_callback(lambda f: self._results.put((done, failed, f)))
+        self._schedule_poll()
+        return job
+
+    def reprioritise(self, job: scheduler.Job, priority: Priority) -> None:
+        """Moves work that has not started to a new priority."""
+        self.scheduler.reprioritise(job, priority)
+
+    def _schedule_poll(self, delay: int = POLL_INTERVAL) -> None:
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.root.after(delay, self.poll)
+
+    def poll(self) -> None:
+        """Delivers the results of finished work on the Tk thread."""
+        self._polling = False
+        if self._closed:
+            return
+        deadline = time.monotonic() + DELIVERY_BUDGET
+        while True:
+            if time.monotonic() > deadline:
+                # Let Tk handle input, then carry on straight away.
+                self._schedule_poll(1)
+                return
+            try:
+                done, failed, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.exception("Image loading failed")
+                if failed is not None:
+                    failed(e)
+                continue
+            done(result)
+        if self._pending > 0:
+            self._schedule_poll()
+
+    def close(self) -> None:
+        """Stops delivering results and drops work that has not started."""
+        self._closed = True
+        self.scheduler.cancel_owner(self)
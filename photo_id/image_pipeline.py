@@ -0,0 +1,141 @@
+"""
+Module: image_pipeline
+
+Turns downloaded photos into images the size a quiz frame shows. JPEGs are
+decoded in draft mode, which lets the decoder scale by 1/2, 1/4 or 1/8 while
+decoding instead of producing every pixel, and the resize shrinks by a whole
+factor with a cheap box reduce before the final high quality resample.
+
+Decoding and resampling are CPU bound, so `decode` runs them in a pool of
+worker processes, one per core by default, which hand back the raw RGB
+pixels of the scaled image. Only building the Image from those pixels
+happens in the calling process.
+"""
+
+import concurrent.futures
+import concurrent.futures.process
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import typing
+
+from PIL import Image
+
+# Images are reduced by whole factors until at most this many times the
+# final size, then resampled with LANCZOS.
+REDUCING_GAP = 2.0
+# Worker processes that decode images; 0 decodes in the calling thread.
+processes_name = "PHOTO_ID_DECODE_PROCESSES"
+default_processes = os.cpu_count() or 1
+
+_pool: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def decode_processes() -> int:
+    """
+    Returns the number of processes to decode images in, from the
+    environment.
+    """
+    try:
+        processes = int(os.getenv(processes_name, default_processes))
+        if processes < 0:
+            raise ValueError(processes)
+    except ValueError:
+        logging.warning(
+            "Ignoring invalid %s, using %d", processes_name, default_processes
+        )
+        processes = default_processes
+    return processes
+
+
+def scale_to_width(image: Image.Image, width: int) -> Image.Image:
+    """
+    Scales an image to a width, preserving its aspect ratio. Decoding is
+    cheapest if the image has been opened but not yet loaded.
+
+    Args:
+        image (Image.Image): The image, as returned by Image.open.
+        width (int): The width wanted, in pixels.
+    """
+    original_width, original_height = image.size
+    height = max(1, int((width / original_width) * original_height))
+    if image.format == "JPEG" and width < original_width:
+        # Decodes to the smallest DCT scale at least the requested size.
+        image.draft("RGB", (width, height))
+    return image.resize(
+        (width, height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP
+    )
+
+
+def decode_here(data: bytes, width: int) -> Image.Image:
+    """Decodes compressed image bytes straight to a width."""
+    return scale_to_width(Image.open(io.BytesIO(data)), width)
+
+
+class Pixels(typing.NamedTuple):
+    """The RGB pixels of a decoded image, a row at a time."""
+
+    size: typing.Tuple[int, int]
+    data: bytes
+
+
+def decode_pixels(data: bytes, width: int) -> Pixels:
+    """
+    Decodes compressed image bytes to RGB pixels of a width. Runs in a
+    worker process.
+    """
+    image = decode_here(data, width).convert("RGB")
+    return Pixels(image.size, image.tobytes())
+
+
+def to_image(pixels: Pixels) -> Image.Image:
+    """Builds an image from decoded pixels."""
+    return Image.frombytes("RGB", pixels.size, pixels.data)
+
+
+def shared_pool() -> typing.Optional[concurrent.futures.ProcessPoolExecutor]:
+    """
+    Returns the decode process pool shared by the whole process, or None
+    if images are decoded in the calling thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            processes = decode_processes()
+            if processes == 0:
+                return None
+            # Spawned rather than forked, as the app runs threads.
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(pool: concurrent.futures.ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode(data: bytes, width: int) -> Image.Image:
+    """
+    Decodes compressed image bytes straight to a width, in the decode
+    process pool if there is one. Safe to call from any thread.
+    """
+    pool = shared_pool()
+    if pool is None:
+        return decode_here(data, width)
+    try:
+        pixels = pool.submit(decode_pixels, data, width).result()
+    except concurrent.futures.process.BrokenProcessPool as e:
+        # A worker died; start a new pool next time.
+        logging.warning("Image decode process failed: %s", e)
+        _discard_pool(pool)
+        return decode_here(data, width)
+    return to_image(pixels)
@@ -6,17 +6,20 @@ import io
 import logging
 import random
 import re
+import typing
 import webbrowser
 
 from tkinter import (
     ttk,
     Label,
+    TclError,
     StringVar,
     Toplevel,
     Canvas,
     Message,
     Scrollbar,
     Button,
+    messagebox,
 )
 from tkinter.constants import (
     VERTICAL,
@@ -32,18 +35,140 @@ from tkinter.constants import (
 
 import requests
 from PIL import Image, ImageTk
+from photo_id import catalog_cache
+from photo_id import fetch_engine
+from photo_id import image_cache
+from photo_id import image_loader
+from photo_id import image_pipeline
 from photo_id import process_quiz
-import sys
+from photo_id import retry
+from photo_id import scheduler
+from photo_id.scheduler import Priority
 
 
 REQUIRED_IMAGES = 2
 IMAGES_TO_USE = 12
 MAX_WIDTH = 460  # Make this a function of the screen size
+IMAGE_WIDTH = 420  # this is a good size for the images
+LOADING_TEXT = "Loading image..."
+# Shown for a species whose images can not be found or fetched.
+PLACEHOLDER_IMAGE = (
+    "photo_id/resources/Banner__Under_Construction__version_2.jpg"
+)
+# Decoded images kept by each species, for the current one and either side.
+LOOKAHEAD_BUFFER = 3
+# How much wider than in the quiz an image is shown when clicked.
+LARGE_VIEW_SCALE = 2.5
+ASSET_URL = (
+    "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/"
+    "{asset_id}/{width}"
+)
+# Space in pixels around the image of a species in the grid.
+CELL_PADDING = 8
+# Height in pixels assumed for a row of species before it is created.
+ROW_HEIGHT = 450
+# Rows within this many view heights of the view are created and shown, and
+# rows further than FAR_VIEWS away release their images.
+NEAR_VIEWS = 0.5
+FAR_VIEWS = 2
+# Catalog pages are worth waiting for; a missing image is replaced by a
+# placeholder, so image downloads give up sooner.
+CATALOG_RETRY = retry.RetryPolicy(attempts=5)
+IMAGE_RETRY = retry.RetryPolicy(attempts=3, max_delay=5.0)
+CATALOG_IMAGE_PATTERN = re.compile(
+    rb"https://cdn\.download\.ams\.birds\.cornell\.edu/api/v\d/asset/(\d+)/1200"
+)
+# Images on a catalog page needed for IMAGES_TO_USE, as the first two are
+# skipped and then only every other one is used.
+CATALOG_MATCHES = 2 + 2 * IMAGES_TO_USE - 1
+CATALOG_CHUNK_SIZE = 16 * 1024
+# Bytes kept between chunks, more than the longest image URL.
+CATALOG_OVERLAP = 128
+# Widths of the renditions the image CDN serves.
+RENDITION_WIDTHS = (160, 320, 480, 640, 900, 1200, 1800, 2400)
+
+
+def rendition_width(display_width: int) -> int:
+    """Returns the smallest rendition at least as wide as the display."""
+    for width in RENDITION_WIDTHS:
+        if width >= display_width:
+            return width
+    return RENDITION_WIDTHS[-1]
+
+
+def asset_url(asset_id: str, display_width: int = 1200) -> str:
+    """
+    Returns the URL of a Macaulay Library image asset, in the smallest
+    rendition that fills display_width pixels.
+    """
+    return ASSET_URL.format(
+        asset_id=asset_id, width=rendition_width(display_width)
+    )
+
+
+def scan_asset_ids(
+    chunks: typing.Iterable[bytes], limit: int = CATALOG_MATCHES
+) -> typing.List[str]:
+    """
+    Returns the asset IDs of the images on a catalog page as it arrives,
+    stopping once limit have been found.
+
+    Args:
+        chunks: The bytes of the page, in pieces.
+        limit (int): The most asset IDs wanted.
+    """
+    asset_ids = []
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        scanned = 0
+        for match in CATALOG_IMAGE_PATTERN.finditer(pending):
+            asset_ids.append(match.group(1).decode("ascii"))
+            if len(asset_ids) >= limit:
+                return asset_ids
+            scanned = match.end()
+        # Keeps enough of the end to find a URL split between chunks.
+        pending = pending[max(scanned, len(pending) - CATALOG_OVERLAP) :]
+    return asset_ids
+
+
+def fallback_searches(
+    species_code: str, location: str, start_month, end_month
+) -> typing.List[catalog_cache.CatalogKey]:
+    """
+    Returns the catalog searches to try for a species, most specific first:
+    the location and months, any location, then any time of year.
+    """
+    searches = []
+    for key in (
+        catalog_cache.catalog_key(
+            species_code, location, start_month, end_month
+        ),
+        catalog_cache.catalog_key(species_code, "", start_month, end_month),
+        catalog_cache.catalog_key(species_code, "", 1, 12),
+    ):
+        if key not in searches:
+            searches.append(key)
+    return searches
+
+
+def display_scaling(widget) -> float:
+    """
+    Returns how many screen pixels there are for each pixel of a standard
+    96 DPI display, so images stay sharp on high DPI screens.
+    """
+    try:
+        dpi = float(widget.winfo_fpixels("1i"))
+    except (TclError, TypeError, ValueError):
+        return 1.0
+    return max(1.0, dpi / 96)
 
 
 class VerticalScrolledFrame(ttk.Frame):
     """A Tkinter scrollable frame
     * Use the 'interior' attribute to place widgets inside the scrollable frame.
+    * Or call virtualize() to show a large grid of widgets, only creating
+      the ones in or near the view.
     * Construct and pack/place/grid normally.
     * This frame only allows vertical scrolling.
     """
@@ -86,6 +211,150 @@ class VerticalScrolledFrame(ttk.Frame):
                 canvas.itemconfigure(interior_id, width=canvas.winfo_width())
 
         canvas.bind("<Configure>", _configure_canvas)
+        self.canvas = canvas
+        self.vscrollbar = vscrollbar
+        self.cells = {}
+
+    def virtualize(
+        self,
+        count: int,
+        columns: int,
+        cell_width: int,
+        create: typing.Callable[[int], typing.Any],
+        on_hide: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+        on_show: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+        on_visible: typing.Optional[
+            typing.Callable[[typing.Any, bool], None]
+        ] = None,
+        row_height: int = ROW_HEIGHT,
+    ) -> None:
+        """
+        Shows a grid of count cells, creating the widget for a cell only when
+        its row first comes near the view. Rows scrolled well out of view are
+        passed to on_hide, so they can release what they hold, and to
+        on_show when they come back.
+
+        Args:
+            count (int): The number of cells.
+            columns (int): The number of cells in a row.
+            cell_width (int): The width of a column, in pixels.
+            create: Called with the index of a cell, returns its widget. The
+                widget must be a child of the `canvas` attribute.
+            on_hide: Called with the widget of a cell leaving the view.
+            on_show: Called with the widget of a cell coming back.
+            on_visible: Called with the widget of a cell and whether it is
+                now on screen, whenever that changes.
+            row_height (int): The height of a row until it has been created.
+        """
+        self.interior.unbind("<Configure>")
+        self._count = count
+        self._columns = columns
+        self._cell_width = cell_width
+        self._create = create
+        self._on_hide = on_hide
+        self._on_show = on_show
+        self._on_visible = on_visible
+        self._visible_rows = set()
+        self._row_heights = [row_height] * -(-count // columns)
+        self._hidden_rows = set()
+        self.cells = {}
+        self.canvas.config(
+            yscrollcommand=self._scrolled, width=columns * cell_width
+        )
+        self.canvas.bind("<Configure>", lambda _event: self.refresh(), "+")
+        self._update_scrollregion()
+        self.refresh()
+
+    def _row_tops(self) -> typing.List[int]:
+        tops = [0]
+        for height in self._row_heights:
+            tops.append(tops[-1] + height)
+        return tops
+
+    def _update_scrollregion(self) -> None:
+        self.canvas.config(
+            scrollregion="0 0 %s %s"
+            % (self._columns * self._cell_width, sum(self._row_heights))
+        )
+
+    def _scrolled(self, first, last) -> None:
+        self.vscrollbar.set(first, last)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Creates, hides and shows cells to match the scroll position."""
+        top = self.canvas.canvasy(0)
+        view_height = self.canvas.winfo_height()
+        bottom = top + view_height
+        near = view_height * NEAR_VIEWS
+        far = view_height * FAR_VIEWS
+        tops = self._row_tops()
+        for row, height in enumerate(self._row_heights):
+            row_top, row_bottom = tops[row], tops[row] + height
+            if row_bottom >= top - near and row_top <= bottom + near:
+                if row * self._columns not in self.cells:
+                    self._create_row(row, row_top)
+                elif row in self._hidden_rows:
+                    self._hidden_rows.discard(row)
+                    self._call_for_row(self._on_show, row)
+            elif row_bottom < top - far or row_top > bottom + far:
+                if (
+                    row * self._columns in self.cells
+                    and row not in self._hidden_rows
+                ):
+                    self._hidden_rows.add(row)
+                    self._call_for_row(self._on_hide, row)
+            visible = row_bottom > top and row_top < bottom
+            if visible != (row in self._visible_rows):
+                if visible:
+                    self._visible_rows.add(row)
+                else:
+                    self._visible_rows.discard(row)
+                if self._on_visible is not None:
+                    for index in self._row_indexes(row):
+                        self._on_visible(self.cells[index][0], visible)
+
+    def _row_indexes(self, row: int) -> range:
+        first = row * self._columns
+        return range(first, min(first + self._columns, self._count))
+
+    def _call_for_row(self, callback, row: int) -> None:
+        if callback is not None:
+            for index in self._row_indexes(row):
+                callback(self.cells[index][0])
+
+    def _create_row(self, row: int, row_top: int) -> None:
+        for index in self._row_indexes(row):
+            widget = self._create(index)
+            window = self.canvas.create_window(
+                (index % self._columns) * self._cell_width,
+                row_top,
+                window=widget,
+                anchor=NW,
+            )
+            self.cells[index] = (widget, window)
+            widget.bind(
+                "<Configure>", lambda _event: self._row_resized(row), "+"
+            )
+
+    def _row_resized(self, row: int) -> None:
+        """Moves the rows below a row whose height has changed."""
+        height = max(
+            self.cells[index][0].winfo_reqheight()
+            for index in self._row_indexes(row)
+        )
+        if height == self._row_heights[row]:
+            return
+        self._row_heights[row] = height
+        tops = self._row_tops()
+        for index, (_widget, window) in self.cells.items():
+            self.canvas.coords(
+                window,
+                (index % self._columns) * self._cell_width,
+                tops[index // self._columns],
+            )
+        self._update_scrollregion()
+        self.refresh()
 
 
 def web_browser_callback(url):
@@ -101,7 +370,9 @@ def web_browser_callback(url):
 class SpeciesFrame(ttk.Frame):
     """
     A frame dedicated to displaying species information, including images and details.
-
+    With a loader, images are fetched in the background and shown when they arrive.
+    On a high DPI display, display_scale picks a larger rendition to scale down
+    from, while the images are still shown image_width pixels wide.
     """
 
     def __init__(
@@ -113,6 +384,8 @@ class SpeciesFrame(ttk.Frame):
         start_month: str,
         end_month: str,
         image_width: int,
+        loader: typing.Optional[image_loader.ImageLoader] = None,
+        display_scale: float = 1.0,
     ):
         ttk.Frame.__init__(self, base, borderwidth=2, relief=RIDGE)
         species_data = large_species_list[species_number]
@@ -127,12 +400,20 @@ class SpeciesFrame(ttk.Frame):
         self.image_number = 0
         self.selected_species = StringVar(self)
         self.selected_species.set("")
-        self.image_display = Label(self)
+        # Shown until the image arrives, and again while it is released.
+        self.image_display = Label(self, text=LOADING_TEXT)
         self.full_species_list = large_species_list
         self.cached_image_list = []
+        self.asset_ids = []
         self.image_width = image_width
+        self.display_scale = display_scale
+        self.loader = loader
+        # Decoded images by number: the current one and those either side.
+        self.image_buffer: typing.Dict[int, typing.Any] = {}
+        # Images being loaded, by number.
+        self.jobs: typing.Dict[int, scheduler.Job] = {}
+        self.visible = False
 
-        self.update_image()
         # Now create a short list of species to select from
 
         position_in_list = species_number
@@ -213,28 +494,185 @@ class SpeciesFrame(ttk.Frame):
         current_row = current_row + 1
 
         self.image_display.grid(row=current_row, column=0, columnspan=3)
+        self.image_display.bind("<Button-1>", self.open_large_view)
+        # Everything but the image is laid out, so fetch it last.
+        self.update_image()
 
-    def scale_image_width(self, image):
+    def scale_image_width(self, image, new_width: typing.Optional[int] = None):
         """
         Scales an image to a max size while preserving aspect ratio. Only the width matters.
         """
-        width, height = image.size
-        new_width = self.image_width
-        new_height = int((self.image_width / width) * height)
+        if new_width is None:
+            new_width = self.image_width
+        return image_pipeline.scale_to_width(image, new_width)
 
-        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    def load_image(self, image_number: int):
+        """
+        Fetches and scales an image. Safe to call off the Tk thread; the
+        decoding runs in the image pipeline's worker processes.
+        """
+        img_bytes = self.get_image_data(
+            self.species_code,
+            self.location,
+            self.start_month,
+            self.end_month,
+            image_number,
+        )
+        if img_bytes is None:
+            return self.scale_image_width(Image.open(PLACEHOLDER_IMAGE))
+        return image_pipeline.decode(img_bytes, self.image_width)
 
     def update_image(self) -> None:
         """Updates the image displayed in the frame."""
+        image_number = self.image_number
+        if self.loader is None:
+            self.show_image(self.load_image(image_number))
+        elif image_number in self.image_buffer:
+            self.show_image(self.image_buffer[image_number])
+            self.prefetch()
+        else:
+            self.request_image(image_number)
+        self.reprioritise()
+
+    def image_priority(self, image_number: int) -> Priority:
+        """
+        Returns how urgently an image is wanted. The images either side of
+        the current one are only looked ahead to while the frame is on
+        screen.
+        """
+        if image_number == self.image_number:
+            return Priority.VISIBLE if self.visible else Priority.FIRST_IMAGE
+        if self.visible and image_number in self.neighbours():
+            return Priority.LOOKAHEAD
+        return Priority.WARMING
+
+    def request_image(self, image_number: int) -> None:
+        """Loads an image in the background, unless already loading."""
+        job = self.jobs.get(image_number)
+        if job is not None and not job.cancelled():
+            return
+        self.jobs[image_number] = self.loader.submit(
+            lambda: self.load_image(image_number),
+            lambda image: self.image_loaded(image_number, image),
+            self.image_priority(image_number),
+            failed=lambda error: self.image_failed(image_number),
+        )
+
+    def reprioritise(self) -> None:
+        """Re-ranks the images being loaded after the user has moved."""
+        if self.loader is None:
+            return
+        for image_number, job in self.jobs.items():
+            self.loader.reprioritise(job, self.image_priority(image_number))
+
+    def set_visible(self, visible: bool) -> None:
+        """Records whether the frame is on screen, to rank its images."""
+        self.visible = visible
+        self.reprioritise()
+
+    def image_loaded(self, image_number: int, image) -> None:
+        """
+        Keeps a background loaded image and shows it, unless the user has
+        moved on, then prefetches the images either side.
+        """
+        self.jobs.pop(image_number, None)
+        self.image_buffer[image_number] = image
+        if image_number == self.image_number:
+            self.show_image(image)
+        self._trim_buffer()
+        self.prefetch()
+
+    def image_failed(self, image_number: int) -> None:
+        """
+        Shows the placeholder for an image that could not be loaded, if it
+        is still wanted. Moving back to it tries again.
+        """
+        self.jobs.pop(image_number, None)
+        if image_number == self.image_number:
+            self.show_image(
+                self.scale_image_width(Image.open(PLACEHOLDER_IMAGE))
+            )
 
-        image = self.get_image(
-            self.species_code, self.location, self.start_month, self.end_month
+    def neighbours(self) -> typing.List[int]:
+        """Returns the numbers of the next and prior images."""
+        count = min(len(self.cached_image_list), IMAGES_TO_USE)
+        if count < 2:
+            return []
+        return list(
+            dict.fromkeys(
+                (
+                    (self.image_number + 1) % count,
+                    (self.image_number - 1) % count,
+                )
+            )
         )
-        image = self.scale_image_width(image)
+
+    def prefetch(self) -> None:
+        """Loads and decodes the next and prior images in the background."""
+        for image_number in self.neighbours():
+            if image_number not in self.image_buffer:
+                self.request_image(image_number)
+
+    def _trim_buffer(self) -> None:
+        """Drops buffered images that are not the current one or beside it."""
+        keep = {self.image_number, *self.neighbours()}
+        for image_number in list(self.image_buffer):
+            if len(self.image_buffer) <= LOOKAHEAD_BUFFER:
+                break
+            if image_number not in keep:
+                del self.image_buffer[image_number]
+
+    def show_image(self, image) -> None:
+        """Displays a scaled image. Must be called on the Tk thread."""
         tk_image = ImageTk.PhotoImage(image)
         self.image_display.configure(image=tk_image)
         self.image_display.image = tk_image
 
+    def open_large_view(self, unused=None) -> None:
+        """
+        Shows the current image in a window of its own, downloading a larger
+        rendition than the quiz uses.
+        """
+        del unused
+        if not self.asset_ids:
+            return  # Still loading
+        width = int(self.image_width * LARGE_VIEW_SCALE)
+        url = asset_url(
+            self.asset_ids[self.image_number],
+            round(width * self.display_scale),
+        )
+        top = Toplevel()
+        top.title("Photo")
+        label = Label(top)
+        label.pack()
+
+        def load():
+            return image_pipeline.decode(self._download_image(url), width)
+
+        def show(image):
+            tk_image = ImageTk.PhotoImage(image)
+            label.configure(image=tk_image)
+            label.image = tk_image
+
+        if self.loader is None:
+            show(load())
+        else:
+            self.loader.submit(load, show)
+
+    def release_image(self) -> None:
+        """
+        Drops the displayed image while the frame is out of view, and the
+        loads of its images that have not started.
+        """
+        self.image_display.configure(image="")
+        self.image_display.image = None
+        self.image_buffer.clear()
+        self.jobs = {
+            image_number: job
+            for image_number, job in self.jobs.items()
+            if not job.cancel()
+        }
+
     def check_selection(self, unused) -> None:
         """Check a selection to see if it is the right species."""
 
@@ -252,6 +690,8 @@ class SpeciesFrame(ttk.Frame):
         Advances to the next image in the cached list. If the end of the list is reached,
         it loops back to the first image.
         """
+        if not self.cached_image_list:
+            return  # Still loading
         self.image_number = (self.image_number + 1) % min(
             len(self.cached_image_list), IMAGES_TO_USE
         )
@@ -262,6 +702,8 @@ class SpeciesFrame(ttk.Frame):
         Moves to the previous image in the cached list. If at the beginning of the list,
         it loops back to the last image.
         """
+        if not self.cached_image_list:
+            return  # Still loading
         if self.image_number == 0:
             self.image_number = (
                 min(len(self.cached_image_list), IMAGES_TO_USE) - 1
@@ -277,18 +719,146 @@ class SpeciesFrame(ttk.Frame):
         start_month: int,
         end_month: int,
     ) -> list:
-        """Gets list of images urls."""
+        """
+        Gets list of images urls, from the most specific search with enough
+        images.
+        """
         if not self.cached_image_list:
-            location_param = self._get_location_param(location)
-            time_param = self._get_time_param(start_month, end_month)
-            get_string = self._build_get_string(
-                species_code, location_param, time_param
+            asset_ids = self.resolve_asset_ids(
+                species_code, location, start_month, end_month
             )
-            result = self._fetch_images(get_string)
-            self.cached_image_list = self._extract_images(result.content)
+            self.asset_ids = asset_ids
+            self.cached_image_list = [
+                asset_url(a, round(self.image_width * self.display_scale))
+                for a in asset_ids
+            ]
 
         return self.cached_image_list
 
+    def resolve_asset_ids(
+        self,
+        species_code: str,
+        location: str,
+        start_month: int,
+        end_month: int,
+    ) -> list:
+        """
+        Returns the asset IDs of the most specific search with more than
+        REQUIRED_IMAGES images: first the location and months, then any
+        location, then any time of year. Searches in the catalog cache are
+        answered from it. With a loader, the wider searches that are not
+        cached are queued as low priority jobs while a narrower one is made,
+        so a scarce species does not wait for each round trip in turn. A
+        wider search that has not started by the time it is needed is made
+        straight away instead, and those that are not needed are cancelled.
+        """
+        cache = catalog_cache.shared_cache()
+        searches = fallback_searches(
+            species_code, location, start_month, end_month
+        )
+        group = fetch_engine.FetchGroup()
+        speculative: typing.Dict[catalog_cache.CatalogKey, scheduler.Job] = {}
+        asset_ids = []
+        try:
+            for number, key in enumerate(searches):
+                job = speculative.pop(key, None)
+                try:
+                    if job is not None and not job.cancel():
+                        # Already started, so wait for it rather than repeat it.
+                        asset_ids = job.result()
+                    else:
+                        if cache.get(key) is None:
+                            self.speculate(
+                                searches[number + 1 :], speculative, group
+                            )
+                        asset_ids = cache.lookup(
+                            key, self.catalog_search(key, group)
+                        )
+                except requests.exceptions.RequestException as e:
+                    logging.warning(
+                        "Catalog search %d for %s failed with %s",
+                        number + 1,
+                        species_code,
+                        e,
+                    )
+                    asset_ids = []
+                if len(asset_ids) > REQUIRED_IMAGES:
+                    break
+                logging.info(
+                    "Not enough images for %s in search %d, widening it",
+                    species_code,
+                    number + 1,
+                )
+        finally:
+            # Drops the wider searches still queued or waiting for a slot.
+            for job in speculative.values():
+                job.cancel()
+            group.cancel()
+        return asset_ids
+
+    def speculate(
+        self,
+        searches: typing.List[catalog_cache.CatalogKey],
+        speculative: typing.Dict[catalog_cache.CatalogKey, scheduler.Job],
+        group: fetch_engine.FetchGroup,
+    ) -> None:
+        """
+        Queues the searches that are not cached or queued already as low
+        priority jobs, in case the search being made comes back short.
+        """
+        if self.loader is None:
+            return
+        cache = catalog_cache.shared_cache()
+        for key in searches:
+            if key in speculative or cache.get(key) is not None:
+                continue
+            search = self.catalog_search(key, group)
+            speculative[key] = self.loader.scheduler.submit(
+                lambda key=key, search=search: cache.lookup(key, search),
+                Priority.WARMING,
+                owner=self.loader,
+            )
+
+    def catalog_search(
+        self,
+        key: catalog_cache.CatalogKey,
+        group: typing.Optional[fetch_engine.FetchGroup] = None,
+    ) -> typing.Callable[[], list]:
+        """Returns a function making a search, for the catalog cache."""
+        return lambda: self.search_catalog(
+            key.species_code,
+            key.region,
+            key.begin_month,
+            key.end_month,
+            group=group,
+        )
+
+    def search_catalog(
+        self,
+        species_code: str,
+        location: str,
+        start_month: int,
+        end_month: int,
+        group: typing.Optional[fetch_engine.FetchGroup] = None,
+    ) -> list:
+        """
+        Searches the Macaulay Library catalog for asset IDs. With a group,
+        the request is cancelled along with it.
+        """
+        location_param = self._get_location_param(location)
+        time_param = self._get_time_param(start_month, end_month)
+        get_string = self._build_get_string(
+            species_code, location_param, time_param
+        )
+        result = self._fetch_images(get_string, group)
+        try:
+            return self._extract_asset_ids(
+                result.iter_content(CATALOG_CHUNK_SIZE)
+            )
+        finally:
+            # Drops the rest of the page if enough images were found.
+            result.close()
+
     def _get_location_param(self, location: str) -> str:
         """Returns the location parameter for the eBird API."""
         return f"&regionCode={location}" if location else ""
@@ -310,85 +880,93 @@ class SpeciesFrame(ttk.Frame):
             f"&sort=rating_rank_desc&mediaType=photo{location_param}{time_param}"
         )
 
-    def _fetch_images(self, get_string: str) -> requests.Response:
-        """Fetches images from the eBird API."""
-        for retries in range(5):
-            try:
-                result = requests.get(get_string, timeout=20)
-                result.raise_for_status()
-                return result  # Exit loop if request is successful
-            except requests.exceptions.RequestException as e:
-                logging.warning(
-                    "Get failed with %s, %d times", str(e), retries
-                )
-                if retries == 4:
-                    sys.exit(1)  # Exit if all retries fail
-
-    def _extract_images(self, content: str) -> list:
-        """Extracts image URLs from the eBird API response."""
-        content_str = str(content)
-        images = re.findall(
-            r"https://cdn\.download\.ams\.birds\.cornell\.edu/api/v\d/asset/\d+/1200",
-            content_str,
+    def _fetch_images(
+        self,
+        get_string: str,
+        group: typing.Optional[fetch_engine.FetchGroup] = None,
+    ) -> requests.Response:
+        """Fetches images from the eBird API, retrying failures."""
+        engine = group or fetch_engine.shared_engine()
+        return retry.get(
+            get_string,
+            lambda url: engine.get(url, timeout=20, stream=True),
+            CATALOG_RETRY,
         )
+
+    def _extract_asset_ids(self, chunks: typing.Iterable[bytes]) -> list:
+        """Extracts image asset IDs from the eBird API response."""
+        asset_ids = scan_asset_ids(chunks)
         # Filter and limit images based on requirements
-        if len(images) > 2 + REQUIRED_IMAGES:
-            return images[2::2][:IMAGES_TO_USE]
+        if len(asset_ids) > 2 + REQUIRED_IMAGES:
+            return asset_ids[2::2][:IMAGES_TO_USE]
         return []
 
-    def get_image(
+    def _download_image(self, url: str) -> bytes:
+        """Returns the bytes of an image, from the disk cache if possible."""
+        cache = image_cache.shared_cache()
+        img_bytes = cache.get(url)
+        if img_bytes is None:
+            result = retry.get(
+                url,
+                lambda url: fetch_engine.shared_engine().get(url, timeout=10),
+                IMAGE_RETRY,
+            )
+            img_bytes = result.content
+            try:
+                Image.open(io.BytesIO(img_bytes)).verify()
+            except (OSError, SyntaxError) as e:
+                # Not cached, so the next attempt downloads it again.
+                raise requests.exceptions.ContentDecodingError(
+                    f"{url} is not an image: {e}"
+                ) from e
+            cache.put(url, img_bytes)
+        return img_bytes
+
+    def get_image_data(
         self,
         species_code: str,
         location: str,
         start_month: int,
         end_month: int,
-    ) -> None:
-        """Gets a requested image and displays it."""
+        image_number: typing.Optional[int] = None,
+    ) -> typing.Optional[bytes]:
+        """
+        Gets the bytes of a requested image, by default the current one.
+        Returns None if there is no image or it could not be fetched.
+        """
+        if image_number is None:
+            image_number = self.image_number
         # e.g. display_image('comchi1', 'NO', 6 )
         image_list = self.get_image_list(
             species_code, location, start_month, end_month
         )
 
-        # Try to get multiple images - otherwise expand search to other locations and times
-        if len(image_list) <= REQUIRED_IMAGES:
-            # Try looking at all locations
-            logging.info(
-                "Not enough images for %s at given location and time",
-                species_code,
-            )
-            image_list = self.get_image_list(
-                species_code, "", start_month, end_month
-            )
-            if len(image_list) <= REQUIRED_IMAGES:
-                logging.info(
-                    "Not enough images for %s at any location at given time",
-                    species_code,
-                )
-                # Try looking at all times
-                image_list = self.get_image_list(species_code, "", 1, 12)
-
-        if len(image_list) > 0:
-            try:
-                result = requests.get(
-                    image_list[self.image_number], timeout=10
-                )
-                result.raise_for_status()
-                img_bytes = result.content
-                image = Image.open(io.BytesIO(img_bytes))
-            except requests.exceptions.RequestException as e:
-                logging.warning("Get failed with %s", str(e))
-                image = Image.open(
-                    "photo_id/resources/Banner__Under_Construction__version_2.jpg"
-                )
-        else:
+        if len(image_list) == 0:
             logging.error(
                 "No images for %s at any location or time", species_code
             )
-            image = Image.open(
-                "photo_id/resources/Banner__Under_Construction__version_2.jpg"
-            )
+            return None
+        try:
+            return self._download_image(image_list[image_number])
+        except requests.exceptions.RequestException as e:
+            logging.warning("Get failed with %s", str(e))
+            return None
 
-        return image
+    def get_image(
+        self,
+        species_code: str,
+        location: str,
+        start_month: int,
+        end_month: int,
+        image_number: typing.Optional[int] = None,
+    ) -> Image.Image:
+        """Gets a requested image, by default the current one."""
+        img_bytes = self.get_image_data(
+            species_code, location, start_month, end_month, image_number
+        )
+        if img_bytes is None:
+            return Image.open(PLACEHOLDER_IMAGE)
+        return Image.open(io.BytesIO(img_bytes))
 
 
 class MatchWindow:
@@ -397,54 +975,71 @@ class MatchWindow:
     quiz_species = {}
     quiz_species_list = []
 
-    def __init__(self, file: str, taxonomy: dict, have_list: list):
+    def __init__(self, file: str, taxonomy: list, have_list: list):
         self.root = Toplevel()
-        quiz_data = process_quiz.process_quiz_file(file, taxonomy)
+        # Images for all the species are fetched in parallel.
+        self.loader = image_loader.ImageLoader(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        corrections = []
+        quiz_data = process_quiz.process_quiz_file(
+            file, taxonomy, corrections=corrections
+        )
         species_list = quiz_data["species"]
+        if corrections:
+            messagebox.showinfo(
+                title="Species names corrected",
+                message=process_quiz.describe_corrections(corrections),
+                parent=self.root,
+            )
 
         Label(
             self.root, text="Notes:" + quiz_data["notes"]
         ).pack()  # default value
-        image_width = 420  # this is a good size for the images
-
-        columns = self.root.winfo_screenwidth() // image_width
-
-        rows = int(len(species_list) / columns) + 1
+        # The scaling only picks the rendition; the layout stays the same.
+        display_scale = display_scaling(self.root)
+        image_width = IMAGE_WIDTH
+        cell_width = image_width + CELL_PADDING
 
-        # Create a photoimage object of the image in the path
+        columns = max(1, self.root.winfo_screenwidth() // cell_width)
 
-        self.image_display = [
-            [None for _ in range(columns)] for _ in range(rows + 1)
-        ]
         self.frame = VerticalScrolledFrame(self.root)
         # self.frame.grid(row=1, column=0)
         self.frame.pack(fill="both", expand=1)
 
         self.root.title(self.root.title() + " :" + file)
-        species_number = 0
 
-        for row in range(1, rows + 1):
-            for column in range(columns):
-                logging.info(
-                    "Processing image %d of %d",
-                    species_number,
-                    len(species_list),
-                )
-                if species_number >= len(species_list):
-                    break
-                self.image_display[row][column] = SpeciesFrame(
-                    self.frame.interior,
-                    species_number,
-                    species_list,
-                    quiz_data["location"],
-                    quiz_data["start_month"],
-                    quiz_data["end_month"],
-                    image_width,
-                )
-                self.image_display[row][column].grid(row=row, column=column)
-                species_number = species_number + 1
+        def create_species_frame(species_number: int) -> SpeciesFrame:
+            logging.info(
+                "Processing image %d of %d",
+                species_number,
+                len(species_list),
+            )
+            return SpeciesFrame(
+                self.frame.canvas,
+                species_number,
+                species_list,
+                quiz_data["location"],
+                quiz_data["start_month"],
+                quiz_data["end_month"],
+                image_width,
+                loader=self.loader,
+                display_scale=display_scale,
+            )
 
-            if species_number >= len(species_list):
-                break
+        # Species frames are only created as they are scrolled into view.
+        self.frame.virtualize(
+            len(species_list),
+            columns,
+            cell_width,
+            create_species_frame,
+            on_hide=SpeciesFrame.release_image,
+            on_show=SpeciesFrame.update_image,
+            on_visible=SpeciesFrame.set_visible,
+        )
         logging.info("Finished processing images")
         self.root.state("zoomed")
+
+    def close(self) -> None:
+        """Closes the window and drops its outstanding image fetches."""
+        self.loader.close()
+        self.root.destroy()
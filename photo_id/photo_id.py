@@ -5,15 +5,32 @@ plumages.
 """
 
 import argparse
+import concurrent.futures
+import importlib.metadata
 import logging
-import tomllib
+import sys
+import typing
 
-from tkinter import messagebox, Tk, Menu, filedialog, simpledialog
+from tkinter import (
+    messagebox,
+    ttk,
+    Label,
+    Tk,
+    Toplevel,
+    Menu,
+    filedialog,
+    simpledialog,
+)
+from photo_id import batch
 from photo_id import get_taxonomy
 from photo_id import get_have_list
 from photo_id import get_size_data
 from photo_id import match_window
 from photo_id import process_quiz
+from photo_id import taxonomy_cache
+from photo_id import taxonomy_index
+from photo_id import taxonomy_migration
+from photo_id import taxonomy_store
 
 
 class MainWindow:
@@ -22,11 +39,20 @@ class MainWindow:
     json_files = ("json files", "*.json")
 
     def __init__(self, default_have_list: str):
-        self.have_list = []
         self.avonet_data = {}
-        self.taxonomy = get_taxonomy.ebird_taxonomy()
+        # Load the taxonomy and have list in the background so the window
+        # appears straight away. Actions that need them wait on the futures.
+        self.loader = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="photo-id-load"
+        )
+        self.have_list_file = default_have_list
+        self.taxonomy_future = self.loader.submit(self.load_taxonomy)
         if default_have_list != "":
-            self.have_list = get_have_list.get_have_list(default_have_list)
+            self.have_list_future = self.loader.submit(
+                get_have_list.get_have_list, default_have_list
+            )
+        else:
+            self.have_list = []
         self.root = Tk()
         self.root.title("Photo ID quiz")
         menubar = Menu(self.root)
@@ -49,6 +75,10 @@ class MainWindow:
         file_menu.add_command(
             label="Break Quiz into Parts", command=self.break_quiz_into_parts
         )
+        file_menu.add_command(
+            label="Migrate Quizzes to Current Taxonomy",
+            command=self.migrate_quizzes,
+        )
         file_menu.add_separator()
         file_menu.add_command(
             label="Refresh Avonet data",
@@ -76,6 +106,93 @@ class MainWindow:
 
         self.root.config(menu=menubar)
         self.root.mainloop()
+        self.loader.shutdown(wait=False)
+
+    @staticmethod
+    def load_taxonomy() -> taxonomy_index.TaxonomyIndex:
+        """
+        Loads the taxonomy into a columnar store and indexes it. Every field
+        is kept, so codes can be looked up and sorted quizzes match those
+        written by `photo-id batch`.
+        """
+        cache = get_taxonomy.ebird_taxonomy()
+        try:
+            store = taxonomy_store.TaxonomyStore(cache)
+        finally:
+            cache.close()
+        return taxonomy_index.TaxonomyIndex(store)
+
+    @property
+    def taxonomy(self) -> taxonomy_index.TaxonomyIndex:
+        """The taxonomy, waiting for it to load if necessary."""
+        return self.taxonomy_future.result()
+
+    @property
+    def have_list(self) -> list:
+        """The have list, waiting for it to load if necessary."""
+        return self.have_list_future.result()
+
+    @have_list.setter
+    def have_list(self, have_list: list) -> None:
+        self.have_list_future = concurrent.futures.Future()
+        self.have_list_future.set_result(have_list)
+
+    def when_loaded(
+        self,
+        futures: typing.List[concurrent.futures.Future],
+        action: typing.Callable[[], None],
+    ) -> None:
+        """Runs an action once the futures are done, showing a progress
+        indicator in the meantime so the main loop is never blocked."""
+        if all(future.done() for future in futures):
+            self.run_loaded(futures, action)
+            return
+        progress = Toplevel(self.root)
+        progress.title("Loading")
+        Label(progress, text="Loading taxonomy...", padx=20, pady=10).pack()
+        bar = ttk.Progressbar(progress, mode="indeterminate", length=200)
+        bar.pack(padx=20, pady=10)
+        bar.start()
+
+        def poll() -> None:
+            if all(future.done() for future in futures):
+                progress.destroy()
+                self.run_loaded(futures, action)
+            else:
+                self.root.after(100, poll)
+
+        self.root.after(100, poll)
+
+    def run_loaded(
+        self,
+        futures: typing.List[concurrent.futures.Future],
+        action: typing.Callable[[], None],
+    ) -> None:
+        """Runs an action whose futures are done. If one of them failed the
+        error is shown instead, and the load is started again so the action
+        can be retried."""
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                logging.error("Loading failed: %s", str(error))
+                self.retry_failed_loads()
+                messagebox.showerror(
+                    title="Loading failed",
+                    message=f"{error}\n\nIt is being loaded again, "
+                    "please try once more.",
+                    parent=self.root,
+                )
+                return
+        action()
+
+    def retry_failed_loads(self) -> None:
+        """Starts the background loads that failed again."""
+        if self.taxonomy_future.done() and self.taxonomy_future.exception():
+            self.taxonomy_future = self.loader.submit(self.load_taxonomy)
+        if self.have_list_future.done() and self.have_list_future.exception():
+            self.have_list_future = self.loader.submit(
+                get_have_list.get_have_list, self.have_list_file
+            )
 
     def match_open(self) -> None:
         """Open and start a new matching game defined by a quiz file."""
@@ -85,7 +202,12 @@ class MainWindow:
             filetypes=[self.json_files],
         )
         if filename != "":
-            match_window.MatchWindow(filename, self.taxonomy, self.have_list)
+            self.when_loaded(
+                [self.taxonomy_future, self.have_list_future],
+                lambda: match_window.MatchWindow(
+                    filename, self.taxonomy, self.have_list
+                ),
+            )
 
     def sort_quiz(self) -> None:
         """Open a quiz, sort it taxonomically, and write it back. This is not necessary to show
@@ -97,7 +219,20 @@ class MainWindow:
             filetypes=[self.json_files],
         )
         if filename != "":
-            process_quiz.sort_quiz(filename, self.taxonomy)
+            self.when_loaded(
+                [self.taxonomy_future],
+                lambda: self.report_corrections(
+                    process_quiz.sort_quiz(filename, self.taxonomy)
+                ),
+            )
+
+    def report_corrections(self, corrections: list) -> None:
+        """Shows the species names that were auto-corrected, if any."""
+        if corrections:
+            messagebox.showinfo(
+                title="Species names corrected",
+                message=process_quiz.describe_corrections(corrections),
+            )
 
     def read_avonet_data(self) -> None:
         """Read the avonet data from the cache file."""
@@ -168,7 +303,60 @@ class MainWindow:
             filetypes=[self.json_files],
         )
         if filename != "":
-            process_quiz.split_quiz(filename, 25, self.taxonomy)
+            self.when_loaded(
+                [self.taxonomy_future],
+                lambda: self.report_corrections(
+                    process_quiz.split_quiz(filename, 25, self.taxonomy)
+                ),
+            )
+
+    def migrate_quizzes(self) -> None:
+        """Move a directory of quizzes from an earlier cached taxonomy
+        version to the current one."""
+        versions = get_taxonomy.cached_versions()
+        old_versions = [
+            version
+            for version, path in versions.items()
+            if path != get_taxonomy.cache_file
+        ]
+        if not old_versions:
+            messagebox.showinfo(
+                title="Migrate Quizzes",
+                message="No earlier taxonomy version is cached.",
+            )
+            return
+        old_version = simpledialog.askstring(
+            "Migrate Quizzes",
+            "Taxonomy version the quizzes use "
+            f"({', '.join(old_versions)}):",
+            initialvalue=old_versions[-1],
+        )
+        if old_version not in old_versions:
+            return
+        directory = filedialog.askdirectory(
+            title="Select the Quiz Directory to migrate", initialdir="."
+        )
+        if directory:
+            self.when_loaded(
+                [self.taxonomy_future],
+                lambda: self.migrate_directory(
+                    directory, versions[old_version]
+                ),
+            )
+
+    def migrate_directory(self, directory: str, old_cache: str) -> None:
+        """Migrate the quizzes in a directory from the taxonomy in a cache
+        file to the current taxonomy, and report the files rewritten."""
+        old = taxonomy_cache.open_cache(old_cache)
+        try:
+            diff = taxonomy_migration.diff_taxonomies(old, self.taxonomy)
+        finally:
+            old.close()
+        rewritten = taxonomy_migration.migrate_directory(directory, diff)
+        messagebox.showinfo(
+            title="Migrate Quizzes",
+            message=f"{len(rewritten)} quiz file(s) updated.",
+        )
 
     def apply_avonet_data_to_quizzes(self) -> None:
         """Apply avonet data to quizzes."""
@@ -190,21 +378,34 @@ class MainWindow:
         )
 
 
+def app_version() -> str:
+    """Returns the installed version of the app."""
+    try:
+        return importlib.metadata.version("photo-id")
+    except importlib.metadata.PackageNotFoundError:
+        return "0.0.0"
+
+
+class VersionAction(argparse.Action):
+    """Prints the version and exits. The version is only looked up then."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, **kwargs):
+        kwargs.setdefault("help", "show program's version number and exit")
+        super().__init__(
+            option_strings, dest, nargs=0, default=argparse.SUPPRESS, **kwargs
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(f"{parser.prog} {app_version()}")
+        parser.exit()
+
+
 def main():
     """Main function for the app."""
     arg_parser = argparse.ArgumentParser(
         prog="photo-id", description="Quiz on photo id."
     )
-    with open("pyproject.toml", "rb") as f:
-        pyproject_data = tomllib.load(f)
-    version = (
-        pyproject_data.get("tool", {})
-        .get("poetry", {})
-        .get("version", "0.0.0")
-    )
-    arg_parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {version}"
-    )
+    arg_parser.add_argument("--version", action=VersionAction)
     arg_parser.add_argument(
         "--verbose", action="store_true", help="increase verbosity"
     )
@@ -213,11 +414,15 @@ def main():
         default="",
         help="list of birds had for a region/time frame",
     )
+    subparsers = arg_parser.add_subparsers(dest="command")
+    batch.add_parser(subparsers)
     args = arg_parser.parse_args()
 
     if args.verbose:
         logging.basicConfig(level=logging.INFO)
 
+    if args.command == "batch":
+        sys.exit(batch.run(args))
     MainWindow(args.have_list)
 
 
@@ -2,43 +2,110 @@
 Processes a quiz file
 """
 
+import io
 import json
 import logging
+import os
 import pathlib
 import re
 import typing
 import sys
 
+from photo_id import build_manifest
+from photo_id import fuzzy_names
+from photo_id import get_taxonomy
+from photo_id import taxonomy_index
 
-def sorted_species(initial_list: list, taxonomy: list) -> list:
+
+def write_if_changed(path: str, data: typing.Any, **options) -> bool:
+    """
+    Writes data to a JSON file, taking the same options as json.dump, unless
+    the file already holds exactly the same text. Unchanged files keep their
+    modification time.
+
+    Returns:
+    bool: True if the file was written.
+    """
+    buffer = io.StringIO()
+    json.dump(data, buffer, **options)
+    text = buffer.getvalue()
+    try:
+        with open(path, encoding="utf-8", mode="rt") as file:
+            if file.read() == text:
+                logging.info("%s is unchanged", path)
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    with open(path, encoding="utf-8", mode="wt") as file:
+        file.write(text)
+    return True
+
+
+def taxonomy_params(taxonomy: typing.Any) -> typing.Optional[dict]:
+    """
+    Returns the build parameters a taxonomy contributes to a sorted quiz, or
+    None if its version is not known and so results cannot be reused.
     """
-    Sorts a list of species based on their taxonomic order.
+    version = getattr(taxonomy, "taxonomy_version", "")
+    if not version:
+        return None
+    return {
+        "taxonomy": version,
+        "threshold": fuzzy_names.DEFAULT_THRESHOLD,
+    }
+
+
+def sorted_species(
+    initial_list: list,
+    taxonomy: list,
+    threshold: float = fuzzy_names.DEFAULT_THRESHOLD,
+    corrections: typing.Optional[list] = None,
+) -> list:
+    """
+    Sorts a list of species based on their taxonomic order. Names with no
+    exact match are resolved to the closest taxonomy name when it is similar
+    enough, e.g. 'Grey Heron' or 'Whiterumped Swift'.
 
     Parameters:
     initial_list: A list of dicts, each containing the common name of a species.
-    taxonomy: A list of dicts, each containing the common name and taxonomic order of a species.
+    taxonomy: A TaxonomyIndex, or a list of dicts each containing the common
+    name and taxonomic order of a species.
+    threshold: The similarity from 0 to 1 needed to correct a name.
+    corrections: If given, a dict is appended for each corrected name with
+    the original 'name', the 'comName' it was corrected to and the 'score'.
 
     Returns:
     list: A sorted list of species by their taxonomic order.
     """
+    index = taxonomy_index.as_index(taxonomy)
     result: typing.List[typing.Dict[str, typing.Any]] = []
+    seen: typing.Set[str] = set()
     for species in initial_list:
-        entry = next(
-            (
-                item
-                for item in taxonomy
-                if item["comName"].upper() == species["comName"].upper()
-            ),
-            None,
-        )
+        entry = index.by_common_name(species["comName"])
+        if entry is None:
+            match = index.closest(species["comName"], threshold)
+            if match is not None:
+                entry = index[match.position]
+                logging.info(
+                    "Species %s auto-corrected to %s (%.2f)",
+                    species["comName"],
+                    entry["comName"],
+                    match.score,
+                )
+                if corrections is not None:
+                    corrections.append(
+                        {
+                            "name": species["comName"],
+                            "comName": entry["comName"],
+                            "score": match.score,
+                        }
+                    )
         if entry is None:
             logging.info("Species not found %s", species["comName"])
-        elif any(
-            res["comName"].upper() == entry["comName"].upper()
-            for res in result
-        ):
+        elif entry["comName"].casefold() in seen:
             logging.info("Duplicate species removed %s", species["comName"])
         else:
+            seen.add(entry["comName"].casefold())
             entry = entry.copy()
             for key, value in species.items():
                 if key not in entry.keys():
@@ -49,13 +116,30 @@ def sorted_species(initial_list: list, taxonomy: list) -> list:
     return result
 
 
-def process_quiz_file(name: str, taxonomy: list) -> dict:
+def describe_corrections(corrections: list) -> str:
+    """
+    Returns a line for each auto-corrected species name, as collected by
+    sorted_species, e.g. 'Grey Heron -> Gray Heron (100%)'.
+    """
+    return "\n".join(
+        f"{c['name']} -> {c['comName']} ({c['score']:.0%})"
+        for c in corrections
+    )
+
+
+def process_quiz_file(
+    name: str, taxonomy: list, corrections: typing.Optional[list] = None
+) -> dict:
     """
     Processes a quiz file and returns a dictionary with quiz details and sorted species.
+    A quiz with a 'locale' (e.g. "no") may use common names in that language.
 
     Parameters:
     name : The name of the quiz file to process.
-    taxonomy : A list of dicts, each containing the common name and taxonomic order of a species.
+    taxonomy : A TaxonomyIndex, or a list of dicts each containing the common name and
+    taxonomic order of a species.
+    corrections : If given, the auto-corrected species names are appended, see
+    sorted_species.
 
     Returns:
     dict: A dictionary containing the quiz details including the sorted species.
@@ -69,25 +153,52 @@ def process_quiz_file(name: str, taxonomy: list) -> dict:
     result["notes"] = (
         "" if "notes" not in file_data.keys() else file_data["notes"]
     )
-    result["species"] = sorted_species(file_data["species"], taxonomy)
+    if "locale" in file_data:
+        taxonomy = taxonomy_index.as_index(taxonomy)
+        get_taxonomy.load_locale(taxonomy, file_data["locale"])
+    result["species"] = sorted_species(
+        file_data["species"], taxonomy, corrections=corrections
+    )
     return result
 
 
-def sort_quiz(name: str, taxonomy: list) -> None:
+def sort_quiz(
+    name: str,
+    taxonomy: list,
+    manifest: typing.Optional[build_manifest.BuildManifest] = None,
+) -> list:
     """
     Sorts the species in a quiz file based on a given taxonomy and saves the result to a new file.
 
     Parameters:
     name (str): The name of the quiz file to process.
     taxonomy (list): A list of dicts, each with the common name and taxonomic order of a species.
+    manifest (BuildManifest, optional): If given, nothing is done when the quiz was already
+    sorted with the same taxonomy version.
+
+    Returns:
+    list: The species names that were auto-corrected, see sorted_species.
     """
+    output = name + ".sorted"
+    params = taxonomy_params(taxonomy) if manifest is not None else None
+    if params is not None and manifest.is_current("sort", name, params):
+        logging.info("%s is up to date", output)
+        return []
     with open(name, encoding="utf-8", mode="rt") as file:
         result = json.load(file)
 
-    result["species"] = sorted_species(result["species"], taxonomy)
+    if "locale" in result:
+        taxonomy = taxonomy_index.as_index(taxonomy)
+        get_taxonomy.load_locale(taxonomy, result["locale"])
+    corrections: typing.List[typing.Dict[str, typing.Any]] = []
+    result["species"] = sorted_species(
+        result["species"], taxonomy, corrections=corrections
+    )
 
-    with open(name + ".sorted", encoding="utf-8", mode="wt") as file:
-        json.dump(result, file, ensure_ascii=False, indent=4)
+    write_if_changed(output, result, ensure_ascii=False, indent=4)
+    if params is not None:
+        manifest.record("sort", name, params, [output])
+    return corrections
 
 
 def build_quiz_from_target_species(
@@ -97,6 +208,7 @@ def build_quiz_from_target_species(
     start_month: int,
     end_month: int,
     location_code: str,
+    manifest: typing.Optional[build_manifest.BuildManifest] = None,
 ) -> None:
     """
     Accepts a target species url from eBird, sorted by frequency (descending)
@@ -110,7 +222,19 @@ def build_quiz_from_target_species(
     start_month : starting month
     end_month : ending month
     location_code : 2 letter location code
+    manifest : if given, nothing is done when the output was already built
+    from the same file and parameters
     """
+    params = [
+        min_frequency,
+        start_month,
+        end_month,
+        location_code,
+        os.path.abspath(output_file),
+    ]
+    if manifest is not None and manifest.is_current("build", in_file, params):
+        logging.info("%s is up to date", output_file)
+        return
 
     def parse_line(line: str) -> bool:
         return re.match(r"\d+\.", line) is not None
@@ -153,25 +277,46 @@ def build_quiz_from_target_species(
                 except ValueError:
                     break
 
-    with open(output_file, "wt", encoding="utf-8") as outfile:
-        outfile.write(json.dumps(result, indent=2))
+    write_if_changed(output_file, result, indent=2)
+    if manifest is not None:
+        manifest.record("build", in_file, params, [output_file])
 
 
-def split_quiz(in_file: str, max_size: int, taxonomy) -> None:
+def split_quiz(
+    in_file: str,
+    max_size: int,
+    taxonomy,
+    manifest: typing.Optional[build_manifest.BuildManifest] = None,
+) -> list:
     """
     Splits a quiz file into multiple parts based on a maximum size.
 
     Parameters:
     in_file (str): The input file path of the quiz to be split.
     max_size (int): The maximum number of species per split quiz file.
-    taxonomy (list): The taxonomy list used for sorting species.
+    taxonomy (list): The taxonomy list or TaxonomyIndex used for sorting.
+    manifest (BuildManifest, optional): If given, nothing is done when the
+    quiz was already split the same way with the same taxonomy version.
+
+    Returns:
+    list: The species names that were auto-corrected, see sorted_species.
     """
-    quiz = process_quiz_file(name=in_file, taxonomy=taxonomy)
+    params = taxonomy_params(taxonomy) if manifest is not None else None
+    if params is not None:
+        params["max_size"] = max_size
+        if manifest.is_current("split", in_file, params):
+            logging.info("Parts of %s are up to date", in_file)
+            return []
+    corrections: typing.List[typing.Dict[str, typing.Any]] = []
+    quiz = process_quiz_file(
+        name=in_file, taxonomy=taxonomy, corrections=corrections
+    )
     length = len(quiz["species"])
     part = 1
     start = 0
     end = 0
     quiz["species"] = sorted_species(quiz["species"], taxonomy)
+    parts = []
     while end < length:
         end = min(length, start + max_size)
         split = {key: value for key, value in quiz.items() if key != "species"}
@@ -182,15 +327,29 @@ def split_quiz(in_file: str, max_size: int, taxonomy) -> None:
             f"{pathlib.Path(in_file).suffix}"
         )
         start = end
-        with open(file_name, "wt", encoding="utf-8") as outfile:
-            json.dump(split, outfile, indent=2)
+        write_if_changed(file_name, split, indent=2)
+        parts.append(file_name)
         part += 1
+    if params is not None:
+        manifest.record("split", in_file, params, parts)
+    return corrections
 
 
-def apply_avonet_data(filename, avonet_data):
+def apply_avonet_data(
+    filename,
+    avonet_data,
+    manifest: typing.Optional[build_manifest.BuildManifest] = None,
+):
     """
-    Apply Avonet data to quizzes
+    Apply Avonet data to quizzes. The file is only rewritten if it changes,
+    and with a manifest a quiz that already has this Avonet data is skipped.
     """
+    params = None
+    if manifest is not None:
+        params = {"avonet": build_manifest.data_version(avonet_data)}
+        if manifest.is_current("avonet", filename, params):
+            logging.info("%s is up to date", filename)
+            return
     try:
         with open(filename, encoding="utf-8", mode="rt") as file:
             quiz = json.load(file)
@@ -219,10 +378,11 @@ def apply_avonet_data(filename, avonet_data):
         species.update(avonet_info)
 
     try:
-        with open(filename, encoding="utf-8", mode="wt") as file:
-            json.dump(quiz, file, indent=2)
+        write_if_changed(filename, quiz, indent=2)
     except IOError:
         logging.error(
             "An I/O error occurred while writing to the file %s", filename
         )
         sys.exit(1)
+    if params is not None:
+        manifest.record("avonet", filename, params, [filename])
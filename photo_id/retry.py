@@ -0,0 +1,226 @@
+"""
+Module: retry
+
+Retries failed HTTP requests without hammering a struggling server. Each
+retry waits for an exponentially growing, randomly jittered delay, or for as
+long as the server asks in a Retry-After header. A circuit breaker per host
+counts consecutive failures; once a host has failed too often, requests to it
+fail straight away for a while, so callers can fall back to cached or
+placeholder images instead of waiting, and a single trial request is let
+through to see whether it has recovered.
+"""
+
+import concurrent.futures
+import email.utils
+import logging
+import random
+import threading
+import time
+import typing
+import urllib.parse
+
+import requests
+
+# Responses worth retrying, as the server may answer differently later.
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+_breakers: typing.Dict[str, "CircuitBreaker"] = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host that is failing."""
+
+
+class RetryPolicy(typing.NamedTuple):
+    """
+    How often and how patiently to retry a request.
+
+    Args:
+        attempts (int): The most times a request is sent.
+        base_delay (float): Seconds before the first retry, before jitter.
+        max_delay (float): The longest wait between attempts, in seconds.
+    """
+
+    attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(
+        self,
+        attempt: int,
+        response: typing.Optional[requests.Response] = None,
+    ) -> float:
+        """
+        Returns the seconds to wait after a failed attempt, counting from 0.
+        A Retry-After header is honoured, up to max_delay; otherwise the
+        wait is a random time up to the exponential backoff ("full jitter")
+        so clients that failed together do not retry together.
+        """
+        if response is not None:
+            retry_after = retry_after_seconds(
+                response.headers.get("Retry-After")
+            )
+            if retry_after is not None:
+                return min(self.max_delay, retry_after)
+        backoff = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(0, backoff)
+
+
+def retry_after_seconds(value: typing.Optional[str]) -> typing.Optional[float]:
+    """Returns the wait a Retry-After header asks for, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of a host. After failure_threshold consecutive
+    failures the circuit opens and requests are refused for reset_timeout
+    seconds, then one trial request is allowed: success closes the circuit
+    and failure opens it again.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+        clock: Returns the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: typing.Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are currently being refused."""
+        with self._lock:
+            return (
+                self._opened_at is not None
+                and self.clock() - self._opened_at < self.reset_timeout
+            )
+
+    def allow(self) -> bool:
+        """Returns whether a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """Records a request the host answered."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_cancelled(self) -> None:
+        """Records a request that was called off before it was answered."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Records a request the host failed."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+
+def breaker(host: str) -> CircuitBreaker:
+    """Returns the circuit breaker shared by all requests to a host."""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def get(
+    url: str,
+    fetch: typing.Callable[[str], requests.Response],
+    policy: RetryPolicy = RetryPolicy(),
+    sleep: typing.Callable[[float], None] = time.sleep,
+) -> requests.Response:
+    """
+    Fetches a URL, retrying connection failures and retryable statuses.
+
+    Args:
+        url (str): The address to fetch.
+        fetch: Sends one request and returns the response.
+        policy (RetryPolicy): How often and how patiently to retry.
+        sleep: Waits for a number of seconds.
+
+    Raises:
+        CircuitOpenError: The host has been failing and is being left alone.
+        requests.exceptions.RequestException: The last attempt failed, or
+            the server answered with a status that is not worth retrying.
+        concurrent.futures.CancelledError: fetch was called off.
+    """
+    host = urllib.parse.urlsplit(url).hostname or ""
+    host_breaker = breaker(host)
+    for attempt in range(policy.attempts):
+        if not host_breaker.allow():
+            raise CircuitOpenError(f"{host} is failing, not requesting {url}")
+        response = None
+        try:
+            response = fetch(url)
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as e:
+            error = e
+        except concurrent.futures.CancelledError:
+            # Called off by the caller, which says nothing about the host.
+            host_breaker.record_cancelled()
+            raise
+        except Exception:
+            # Not worth retrying, e.g. a truncated body, but it still ends a
+            # trial request so the circuit can not stay half open for good.
+            host_breaker.record_failure()
+            raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                host_breaker.record_success()
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    # Frees a streamed response's connection and host slot.
+                    response.close()
+                    raise
+                return response
+            error = requests.exceptions.HTTPError(
+                f"{response.status_code} from {url}", response=response
+            )
+            response.close()
+        host_breaker.record_failure()
+        if attempt + 1 == policy.attempts:
+            raise error
+        wait = policy.delay(attempt, response)
+        logging.warning(
+            "Get of %s failed with %s, retrying in %.1fs", url, error, wait
+        )
+        sleep(wait)
@@ -0,0 +1,157 @@
+"""
+Module: scheduler
+
+A priority queue of image work shared by every quiz window. Worker threads
+take the most urgent job first, so the image the user is looking at is never
+stuck behind prefetches for images they may never see. Jobs can be moved up
+or down the queue as the user scrolls and pages through images, and the
+queued jobs of a closed window can be dropped all at once.
+"""
+
+import concurrent.futures
+import enum
+import heapq
+import itertools
+import threading
+import typing
+
+# Number of jobs run at the same time, across all windows.
+WORKERS = 12
+
+_shared: typing.Optional["Scheduler"] = None
+_shared_lock = threading.Lock()
+
+
+class Priority(enum.IntEnum):
+    """How urgent a job is; lower values run first."""
+
+    VISIBLE = 0  # The current image of a species on screen
+    FIRST_IMAGE = 1  # The current image of a species near the screen
+    LOOKAHEAD = 2  # The images either side of the current one
+    WARMING = 3  # Anything else that may be wanted later
+
+
+class Job(concurrent.futures.Future):
+    """A queued piece of work, and the future for its result."""
+
+    def __init__(self, work: typing.Callable[[], typing.Any], priority, owner):
+        super().__init__()
+        self.work = work
+        self.priority = priority
+        self.owner = owner
+        self.sequence = 0
+        self.taken = False
+
+
+class Scheduler:
+    """
+    Runs jobs on worker threads in order of priority, then submission.
+
+    Args:
+        workers (int): The number of jobs run at the same time.
+    """
+
+    def __init__(self, workers: int = WORKERS):
+        self._condition = threading.Condition()
+        # Entries are (priority, sequence, entry, job). A job moved to a new
+        # priority gets a new entry and the old one is skipped.
+        self._queue: typing.List[tuple] = []
+        self._sequence = itertools.count()
+        self._entries = itertools.count()
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"photo-id-image-{n}", daemon=True
+            )
+            for n in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        work: typing.Callable[[], typing.Any],
+        priority: Priority = Priority.FIRST_IMAGE,
+        owner: typing.Any = None,
+    ) -> Job:
+        """
+        Queues work. Returns its Job, which is a future for its result.
+
+        Args:
+            work: Called with no arguments on a worker thread.
+            priority (Priority): How urgent the work is.
+            owner: What the work is for, so it can be cancelled with
+                cancel_owner.
+        """
+        job = Job(work, priority, owner)
+        with self._condition:
+            job.sequence = next(self._sequence)
+            self._push(job)
+            self._condition.notify()
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(
+            self._queue,
+            (job.priority, job.sequence, next(self._entries), job),
+        )
+
+    def reprioritise(self, job: Job, priority: Priority) -> None:
+        """Moves a job that has not started to a new priority."""
+        with self._condition:
+            if job.taken or job.done() or job.priority == priority:
+                return
+            job.priority = priority
+            self._push(job)
+
+    def cancel_owner(self, owner: typing.Any) -> int:
+        """Cancels the jobs of an owner that have not started."""
+        with self._condition:
+            jobs = [
+                job
+                for _, _, _, job in self._queue
+                if job.owner is owner and not job.taken
+            ]
+        return sum(1 for job in set(jobs) if job.cancel())
+
+    def pending(self) -> int:
+        """Returns the number of jobs waiting to start."""
+        with self._condition:
+            return len(
+                {
+                    job
+                    for _, _, _, job in self._queue
+                    if not job.taken and not job.done()
+                }
+            )
+
+    def _next_job(self) -> Job:
+        with self._condition:
+            while True:
+                while not self._queue:
+                    self._condition.wait()
+                priority, _, _, job = heapq.heappop(self._queue)
+                if job.taken or priority != job.priority:
+                    continue  # Started already, or moved to a new priority
+                job.taken = True
+                if job.set_running_or_notify_cancel():
+                    return job
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            try:
+                result = job.work()
+            except BaseException as e:  # Passed on to whoever waits for it
+                job.set_exception(e)
+            else:
+                job.set_result(result)
+            del job
+
+
+def shared_scheduler() -> Scheduler:
+    """Returns the scheduler shared by the whole process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Scheduler()
+        return _shared
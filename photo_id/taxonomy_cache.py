@@ -0,0 +1,294 @@
+"""
+Module: taxonomy_cache
+
+A compact binary cache for the eBird taxonomy. The file holds a small header,
+the list of field names, one fixed-width record per taxonomy entry and a
+string table. Records are read straight out of a memory map, so opening the
+cache takes constant time and entries are only decoded when they are used.
+
+Layout (all integers little endian):
+    header      magic, format version, field count, record count, fetch time
+                and the length of the taxonomy version that follows it
+    version     the UTF-8 eBird taxonomy version the cache was built from
+    fields      for each field, a uint16 length and the UTF-8 field name
+    records     for each entry and field, a uint32 offset and uint32 length
+                into the string table
+    strings     the deduplicated field values
+"""
+
+import collections.abc
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import typing
+
+MAGIC = b"PHIDTAX\0"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<8sHIIdH")
+_FIELD_NAME_LENGTH = struct.Struct("<H")
+_SLOT = struct.Struct("<II")
+
+# A length with this bit set marks a JSON encoded (non string) value.
+_JSON_FLAG = 0x80000000
+# Length used for fields an entry does not have.
+_ABSENT = 0xFFFFFFFF
+
+
+class TaxonomyCacheError(ValueError):
+    """Raised when a cache file is missing, truncated or in an old format."""
+
+
+def _encode(value: typing.Any) -> typing.Tuple[bytes, int]:
+    """Returns the bytes stored for a value and the flags for its length."""
+    if isinstance(value, str):
+        return value.encode("utf-8"), 0
+    return json.dumps(value, ensure_ascii=False).encode("utf-8"), _JSON_FLAG
+
+
+def write_cache(
+    path: str,
+    taxonomy: typing.Iterable[dict],
+    taxonomy_version: str = "",
+    fetched_at: typing.Optional[float] = None,
+) -> None:
+    """
+    Writes the taxonomy to a binary cache file. The file is written under a
+    temporary name and renamed into place, so readers never see a partly
+    written cache.
+
+    Args:
+        path (str): The path of the cache file to write.
+        taxonomy (list): The taxonomy entries as returned by the eBird API.
+        taxonomy_version (str): The eBird taxonomy version of the entries.
+        fetched_at (float, optional): When the taxonomy was fetched from
+            eBird, in seconds since the epoch. Defaults to now.
+    """
+    if fetched_at is None:
+        fetched_at = time.time()
+    entries = list(taxonomy)
+    fields: typing.List[str] = []
+    for entry in entries:
+        for name in entry:
+            if name not in fields:
+                fields.append(name)
+
+    strings = bytearray()
+    string_offsets: typing.Dict[typing.Tuple[bytes, int], int] = {}
+    records = bytearray()
+    for entry in entries:
+        for name in fields:
+            if name not in entry:
+                records += _SLOT.pack(0, _ABSENT)
+                continue
+            data, flag = _encode(entry[name])
+            offset = string_offsets.get((data, flag))
+            if offset is None:
+                offset = len(strings)
+                string_offsets[(data, flag)] = offset
+                strings += data
+            records += _SLOT.pack(offset, len(data) | flag)
+
+    encoded_version = taxonomy_version.encode("utf-8")
+    directory = os.path.dirname(path) or "."
+    f = tempfile.NamedTemporaryFile(
+        mode="wb", dir=directory, prefix=".taxonomy-", delete=False
+    )
+    try:
+        with f:
+            f.write(
+                _HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    len(fields),
+                    len(entries),
+                    fetched_at,
+                    len(encoded_version),
+                )
+            )
+            f.write(encoded_version)
+            for name in fields:
+                encoded = name.encode("utf-8")
+                f.write(_FIELD_NAME_LENGTH.pack(len(encoded)))
+                f.write(encoded)
+            f.write(records)
+            f.write(strings)
+            f.flush()
+            os.fsync(f.fileno())
+        _install(f.name, path)
+    except BaseException:
+        # Nothing half written is left behind, e.g. when the disk is full.
+        os.remove(f.name)
+        raise
+
+
+def _install(temporary_path: str, path: str) -> None:
+    """
+    Renames a newly written cache into place. Windows refuses to replace a
+    file another process has mapped, so in that case the new cache is left
+    beside the old one and installed the next time the cache is opened.
+    """
+    try:
+        os.replace(temporary_path, path)
+    except PermissionError:
+        logging.info("Taxonomy cache %s in use, deferring update", path)
+        os.replace(temporary_path, path + ".new")
+
+
+class TaxonomyCache(collections.abc.Sequence):
+    """
+    A read-only, lazily decoded view of a taxonomy cache file. Indexing or
+    iterating returns the same dicts the eBird API returned.
+    """
+
+    def __init__(self, path: str):
+        with open(path, mode="rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # An empty file can not be mapped
+                raise TaxonomyCacheError(f"Empty cache file {path}") from e
+        try:
+            self._read_header()
+        except (struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise TaxonomyCacheError(f"Truncated cache file {path}") from e
+        except TaxonomyCacheError:
+            self.close()
+            raise
+
+    def _read_header(self) -> None:
+        (
+            magic,
+            version,
+            field_count,
+            record_count,
+            self.fetched_at,
+            version_length,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise TaxonomyCacheError("Not a taxonomy cache file")
+        if version != FORMAT_VERSION:
+            raise TaxonomyCacheError(
+                f"Unsupported taxonomy cache version {version}"
+            )
+        position = _HEADER.size + version_length
+        self.taxonomy_version = self._map[_HEADER.size : position].decode(
+            "utf-8"
+        )
+        self.fields: typing.List[str] = []
+        for _ in range(field_count):
+            (length,) = _FIELD_NAME_LENGTH.unpack_from(self._map, position)
+            position += _FIELD_NAME_LENGTH.size
+            name = self._map[position : position + length].decode("utf-8")
+            self.fields.append(name)
+            position += length
+        self._field_numbers = {
+            name: number for number, name in enumerate(self.fields)
+        }
+        self._records = position
+        self._record_size = _SLOT.size * field_count
+        self._record_count = record_count
+        self._strings = position + self._record_size * record_count
+        if self._strings > len(self._map):
+            raise TaxonomyCacheError("Truncated taxonomy cache file")
+
+    def close(self) -> None:
+        """Releases the memory map."""
+        self._map.close()
+
+    def age(self) -> float:
+        """Returns the seconds since the taxonomy was fetched from eBird."""
+        return time.time() - self.fetched_at
+
+    def _decode(self, offset: int, length: int) -> typing.Any:
+        if length == _ABSENT:
+            return None
+        start = self._strings + offset
+        data = self._map[start : start + (length & ~_JSON_FLAG)]
+        if length & _JSON_FLAG:
+            return json.loads(data)
+        return data.decode("utf-8")
+
+    def _value(self, position: int, number: int) -> typing.Any:
+        offset, length = _SLOT.unpack_from(
+            self._map,
+            self._records + position * self._record_size + number * _SLOT.size,
+        )
+        if length == _ABSENT:
+            raise KeyError(self.fields[number])
+        return self._decode(offset, length)
+
+    def field(
+        self, position: int, name: str, default: typing.Any = None
+    ) -> typing.Any:
+        """Decodes a single field of an entry without building the dict."""
+        number = self._field_numbers.get(name)
+        if number is None:
+            return default
+        try:
+            return self._value(self._check(position), number)
+        except KeyError:
+            return default
+
+    def iter_fields(
+        self, *names: str
+    ) -> typing.Iterator[typing.Tuple[typing.Any, ...]]:
+        """Yields a tuple of the named fields for each entry in order."""
+        numbers = [self._field_numbers.get(name) for name in names]
+        records = memoryview(self._map)[self._records : self._strings]
+        record = struct.Struct("<" + "II" * len(self.fields))
+        try:
+            for slots in record.iter_unpack(records) if self.fields else ():
+                yield tuple(
+                    None
+                    if number is None
+                    else self._decode(slots[2 * number], slots[2 * number + 1])
+                    for number in numbers
+                )
+        finally:
+            records.release()
+
+    def _check(self, position: int) -> int:
+        if position < 0:
+            position += self._record_count
+        if not 0 <= position < self._record_count:
+            raise IndexError("taxonomy index out of range")
+        return position
+
+    def __len__(self) -> int:
+        return self._record_count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [
+                self[i] for i in range(*position.indices(self._record_count))
+            ]
+        position = self._check(position)
+        entry = {}
+        for number, name in enumerate(self.fields):
+            try:
+                entry[name] = self._value(position, number)
+            except KeyError:
+                pass
+        return entry
+
+
+def open_cache(path: str) -> TaxonomyCache:
+    """
+    Opens a taxonomy cache file.
+
+    Raises:
+        TaxonomyCacheError: If the file is not a usable taxonomy cache.
+    """
+    if os.path.isfile(path + ".new"):
+        try:
+            os.replace(path + ".new", path)
+        except PermissionError:
+            pass
+    if not os.path.isfile(path):
+        raise TaxonomyCacheError(f"No taxonomy cache at {path}")
+    return TaxonomyCache(path)
@@ -0,0 +1,186 @@
+"""
+Module: taxonomy_index
+
+Hash indexes over the eBird taxonomy so species can be looked up by name or
+code without scanning the whole taxonomy for every quiz entry.
+"""
+
+import itertools
+import sys
+import typing
+
+from photo_id import fuzzy_names
+from photo_id import taxonomy_store
+
+
+def _key(name: str) -> str:
+    """Normalises a name or code for case-insensitive lookups."""
+    return name.strip().casefold()
+
+
+KEY_FIELDS = (
+    "comName",
+    "sciName",
+    "speciesCode",
+    "bandingCodes",
+    "comNameCodes",
+)
+
+
+class TaxonomyIndex:
+    """
+    A read-only view of the taxonomy with O(1) lookups by common name,
+    scientific name, species code, banding codes and common name codes.
+
+    The index behaves like the underlying list of taxonomy entries, so it can
+    be passed anywhere a taxonomy list was accepted before.
+
+    Common names in other locales can be added with add_locale. Each locale
+    is held as a column of names aligned with the taxonomy, and its names
+    resolve to the same canonical entries as the English ones.
+    """
+
+    def __init__(self, taxonomy: typing.Sequence[dict]):
+        self.taxonomy = taxonomy
+        # The eBird version of the taxonomy, if it is known.
+        self.taxonomy_version: str = getattr(taxonomy, "taxonomy_version", "")
+        self._by_common_name: typing.Dict[str, int] = {}
+        self._by_scientific_name: typing.Dict[str, int] = {}
+        self._by_species_code: typing.Dict[str, int] = {}
+        self._by_code: typing.Dict[str, int] = {}
+        self._fuzzy: typing.Optional[fuzzy_names.FuzzyNameIndex] = None
+        self._by_local_name: typing.Dict[str, int] = {}
+        self.locales: typing.Dict[str, typing.List[typing.Optional[str]]] = {}
+        for position, (
+            common_name,
+            scientific_name,
+            species_code,
+            banding_codes,
+            common_name_codes,
+        ) in enumerate(taxonomy_store.iter_fields(taxonomy, *KEY_FIELDS)):
+            self._add(self._by_common_name, common_name, position)
+            self._add(self._by_scientific_name, scientific_name, position)
+            self._add(self._by_species_code, species_code, position)
+            for code in banding_codes or []:
+                self._add(self._by_code, code, position)
+            for code in common_name_codes or []:
+                self._add(self._by_code, code, position)
+
+    @staticmethod
+    def _add(index: dict, name: typing.Optional[str], position: int) -> None:
+        # The first entry wins, matching the old linear scan behaviour.
+        if name:
+            index.setdefault(_key(name), position)
+
+    def _get(self, index: dict, name: str) -> typing.Optional[dict]:
+        position = index.get(_key(name))
+        return None if position is None else self.taxonomy[position]
+
+    def by_common_name(self, name: str) -> typing.Optional[dict]:
+        """Returns the entry with the given common name in English or any
+        added locale, or None."""
+        entry = self._get(self._by_common_name, name)
+        if entry is None:
+            entry = self._get(self._by_local_name, name)
+        return entry
+
+    def add_locale(self, locale: str, names: typing.Sequence[dict]) -> None:
+        """
+        Adds the common names of a locale.
+
+        Parameters:
+        locale (str): The eBird locale code, e.g. 'no'.
+        names: Entries with the speciesCode and comName in that locale, as
+        returned by get_taxonomy.ebird_taxonomy(locale=locale).
+        """
+        column: typing.List[typing.Optional[str]] = [None] * len(self)
+        for species_code, name in taxonomy_store.iter_fields(
+            names, "speciesCode", "comName"
+        ):
+            position = self._by_species_code.get(_key(species_code or ""))
+            if position is None or not name:
+                continue
+            column[position] = sys.intern(name)
+            self._add(self._by_local_name, name, position)
+        self.locales[locale] = column
+        # Rebuild the fuzzy index with the new names when next needed.
+        self._fuzzy = None
+
+    def local_name(self, position: int, locale: str) -> typing.Optional[str]:
+        """Returns the common name of an entry in an added locale."""
+        column = self.locales.get(locale)
+        return None if column is None else column[position]
+
+    def by_scientific_name(self, name: str) -> typing.Optional[dict]:
+        """Returns the entry with the given scientific name, or None."""
+        return self._get(self._by_scientific_name, name)
+
+    def by_species_code(self, code: str) -> typing.Optional[dict]:
+        """Returns the entry with the given eBird species code, or None."""
+        return self._get(self._by_species_code, code)
+
+    def by_code(self, code: str) -> typing.Optional[dict]:
+        """Returns the entry with the given banding or common name code."""
+        return self._get(self._by_code, code)
+
+    def lookup(self, name: str) -> typing.Optional[dict]:
+        """
+        Returns the entry matching a name or code of any kind, trying common
+        name, scientific name, species code and then the 4 letter codes.
+        """
+        for index in (
+            self._by_common_name,
+            self._by_scientific_name,
+            self._by_species_code,
+            self._by_code,
+        ):
+            entry = self._get(index, name)
+            if entry is not None:
+                return entry
+        return self._get(self._by_local_name, name)
+
+    def closest(
+        self, name: str, threshold: float = fuzzy_names.DEFAULT_THRESHOLD
+    ) -> typing.Optional[fuzzy_names.Match]:
+        """
+        Returns the closest common, local or scientific name scoring at least
+        the threshold, for names with no exact match. The position of the
+        match is its position in the taxonomy. The trigram index behind this
+        is built on first use.
+        """
+        if self._fuzzy is None:
+            self._fuzzy = fuzzy_names.FuzzyNameIndex(
+                itertools.chain(
+                    (
+                        (position, name)
+                        for position, names in enumerate(
+                            taxonomy_store.iter_fields(
+                                self.taxonomy, "comName", "sciName"
+                            )
+                        )
+                        for name in names
+                    ),
+                    (
+                        (position, name)
+                        for column in self.locales.values()
+                        for position, name in enumerate(column)
+                    ),
+                )
+            )
+        return self._fuzzy.match(name, threshold)
+
+    def __len__(self) -> int:
+        return len(self.taxonomy)
+
+    def __iter__(self) -> typing.Iterator[dict]:
+        return iter(self.taxonomy)
+
+    def __getitem__(self, position: int) -> dict:
+        return self.taxonomy[position]
+
+
+def as_index(taxonomy: typing.Sequence[dict]) -> TaxonomyIndex:
+    """Returns the taxonomy as a TaxonomyIndex, building one if needed."""
+    if isinstance(taxonomy, TaxonomyIndex):
+        return taxonomy
+    return TaxonomyIndex(taxonomy)
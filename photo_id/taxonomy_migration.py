@@ -0,0 +1,244 @@
+"""
+Module: taxonomy_migration
+
+Moves quiz files from one eBird taxonomy version to another. A diff between
+the two taxonomies is computed once, keyed by speciesCode and sciName, and
+each quiz in a directory tree is then read, updated and written back in a
+single pass, rewriting only the files whose species actually changed.
+"""
+
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import typing
+
+from photo_id import taxonomy_store
+
+# The taxonomy fields copied into quizzes, and so updated by a migration.
+MIGRATED_FIELDS = taxonomy_store.APP_FIELDS
+
+
+def _key(name: str) -> str:
+    return name.strip().casefold()
+
+
+class TaxonomyDiff:
+    """
+    The species that differ between two taxonomy versions.
+
+    Species are matched on speciesCode, or on sciName when the code was
+    changed. Splits cannot be told apart from new species, so the parent
+    keeps its code (or is removed) and the daughters are listed as added.
+
+    Attributes:
+        changes (dict): The new fields of each old speciesCode whose
+            fields changed, e.g. a renamed or re-ordered species.
+        lumped (dict): The old speciesCodes merged into each new species.
+        removed (list): Old speciesCodes with no species in the new version.
+        added (list): New speciesCodes with no species in the old version.
+    """
+
+    def __init__(self, old: typing.Sequence[dict], new: typing.Sequence[dict]):
+        new_entries: typing.Dict[str, dict] = {}
+        new_codes: typing.Dict[str, str] = {}
+        new_by_sci_name: typing.Dict[str, str] = {}
+        for values in taxonomy_store.iter_fields(new, *MIGRATED_FIELDS):
+            entry = {
+                name: value
+                for name, value in zip(MIGRATED_FIELDS, values)
+                if value is not None
+            }
+            code = entry.get("speciesCode")
+            if not code or code in new_entries:
+                continue
+            new_entries[code] = entry
+            new_codes[_key(code)] = code
+            if entry.get("sciName"):
+                new_by_sci_name.setdefault(_key(entry["sciName"]), code)
+
+        self.changes: typing.Dict[str, dict] = {}
+        self.lumped: typing.Dict[str, typing.List[str]] = {}
+        self.removed: typing.List[str] = []
+        self._names: typing.Dict[str, str] = {}
+        matched: typing.Dict[str, typing.List[str]] = {}
+        for values in taxonomy_store.iter_fields(old, *MIGRATED_FIELDS):
+            entry = dict(zip(MIGRATED_FIELDS, values))
+            code = entry.get("speciesCode")
+            if not code:
+                continue
+            new_code = new_codes.get(_key(code))
+            if new_code is None and entry.get("sciName"):
+                new_code = new_by_sci_name.get(_key(entry["sciName"]))
+            if entry.get("comName"):
+                self._names.setdefault(_key(entry["comName"]), code)
+            if new_code is None:
+                self.removed.append(code)
+                continue
+            matched.setdefault(new_code, []).append(code)
+            new_entry = new_entries[new_code]
+            if any(
+                entry.get(name) != new_entry.get(name)
+                for name in MIGRATED_FIELDS
+            ):
+                self.changes[code] = new_entry
+        for new_code, codes in matched.items():
+            if len(codes) > 1:
+                self.lumped[new_code] = codes
+        self.added = [code for code in new_entries if code not in matched]
+        # Only names that need migrating are kept for quizzes without codes.
+        self._names = {
+            name: code
+            for name, code in self._names.items()
+            if code in self.changes or code in self.removed
+        }
+        self._removed = set(self.removed)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes or self.removed)
+
+    def species_code(self, species: dict) -> typing.Optional[str]:
+        """Returns the old speciesCode of a quiz species, if it is known."""
+        code = species.get("speciesCode")
+        if code:
+            return code
+        return self._names.get(_key(species.get("comName", "")))
+
+    def is_removed(self, species: dict) -> bool:
+        """Returns whether a quiz species is not in the new taxonomy."""
+        return self.species_code(species) in self._removed
+
+    def migrated(self, species: dict) -> typing.Optional[dict]:
+        """
+        Returns a quiz species updated to the new taxonomy, or None if it
+        is unchanged. Only the taxonomy fields the species already has are
+        updated; other quiz fields are kept as they are.
+        """
+        new_entry = self.changes.get(self.species_code(species) or "")
+        if new_entry is None:
+            return None
+        result = species.copy()
+        for name in MIGRATED_FIELDS:
+            if name in species and name in new_entry:
+                result[name] = new_entry[name]
+        return None if result == species else result
+
+
+def diff_taxonomies(
+    old: typing.Sequence[dict], new: typing.Sequence[dict]
+) -> TaxonomyDiff:
+    """
+    Compares two taxonomies, e.g. two cached taxonomy versions.
+
+    Args:
+        old (list): The taxonomy the quizzes were built with.
+        new (list): The taxonomy to move them to.
+
+    Returns:
+        TaxonomyDiff: The changed, lumped, removed and added species.
+    """
+    return TaxonomyDiff(old, new)
+
+
+def _is_sorted(species: typing.List[dict]) -> bool:
+    orders = [entry.get("taxonOrder") for entry in species]
+    if None in orders:
+        return False
+    return all(a <= b for a, b in zip(orders, orders[1:]))
+
+
+def migrate_quiz(quiz: dict, diff: TaxonomyDiff) -> bool:
+    """
+    Updates the species of a quiz in place. Lumped species that end up
+    duplicated are removed, and a quiz in taxonomic order is kept in order.
+
+    Returns:
+        bool: True if the quiz was changed.
+    """
+    species_list = quiz.get("species")
+    if not isinstance(species_list, list):
+        return False
+    was_sorted = _is_sorted(species_list)
+    changed = False
+    result = []
+    seen: typing.Set[str] = set()
+    for species in species_list:
+        migrated = diff.migrated(species)
+        if migrated is not None:
+            logging.info(
+                "Species %s migrated to %s",
+                species.get("comName"),
+                migrated.get("comName"),
+            )
+            species = migrated
+            changed = True
+        elif diff.is_removed(species):
+            logging.warning(
+                "Species %s is not in the new taxonomy",
+                species.get("comName"),
+            )
+        name = _key(species.get("comName", ""))
+        if name and name in seen:
+            logging.info("Duplicate species removed %s", species["comName"])
+            changed = True
+            continue
+        seen.add(name)
+        result.append(species)
+    if changed and was_sorted:
+        result.sort(key=lambda x: x["taxonOrder"])
+    quiz["species"] = result
+    return changed
+
+
+def _write_json(path: str, data: dict) -> None:
+    """Writes a JSON file under a temporary name and renames it into place."""
+    directory = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile(
+        mode="wt",
+        encoding="utf-8",
+        dir=directory,
+        prefix=".quiz-",
+        delete=False,
+    ) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def migrate_directory(
+    directory: str, diff: TaxonomyDiff, pattern: str = "*.json"
+) -> typing.List[str]:
+    """
+    Migrates every quiz file under a directory to a new taxonomy. Files are
+    read one at a time, and only those that change are written back.
+    Files that are not quizzes are skipped.
+
+    Args:
+        directory (str): The root of the tree of quiz files.
+        diff (TaxonomyDiff): The difference between the two taxonomies.
+        pattern (str): The file names to look at.
+
+    Returns:
+        list: The paths of the quiz files that were rewritten.
+    """
+    rewritten: typing.List[str] = []
+    if not diff:
+        return rewritten
+    for path in sorted(pathlib.Path(directory).rglob(pattern)):
+        if not path.is_file():
+            continue
+        try:
+            with open(path, encoding="utf-8", mode="rt") as file:
+                quiz = json.load(file)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            logging.warning("Skipping %s: %s", path, str(e))
+            continue
+        if not isinstance(quiz, dict) or not migrate_quiz(quiz, diff):
+            continue
+        _write_json(str(path), quiz)
+        rewritten.append(str(path))
+    return rewritten
@@ -0,0 +1,169 @@
+"""
+Module: taxonomy_store
+
+A compact, columnar in-memory taxonomy. Each field is held as one column
+with interned strings, list fields as shared tuples, and taxonOrder as an
+integer array. Entry dicts are only built when an entry is asked for.
+"""
+
+import array
+import collections.abc
+import sys
+import typing
+
+# The fields the app shows and sorts by. Loading only these keeps a
+# taxonomy small where codes and the other fields are not needed.
+APP_FIELDS = (
+    "comName",
+    "sciName",
+    "speciesCode",
+    "taxonOrder",
+    "familyCode",
+    "familyComName",
+    "familySciName",
+)
+
+_EMPTY: typing.Tuple = ()
+
+
+def iter_fields(
+    taxonomy: typing.Sequence[dict], *names: str
+) -> typing.Iterator[typing.Tuple[typing.Any, ...]]:
+    """
+    Yields a tuple of the named fields of each entry, with None for missing
+    fields. Taxonomies that can read single fields, like a TaxonomyCache or
+    TaxonomyStore, are read without building whole entries.
+    """
+    reader = getattr(taxonomy, "iter_fields", None)
+    if reader is not None:
+        yield from reader(*names)
+    else:
+        for entry in taxonomy:
+            yield tuple(entry.get(name) for name in names)
+
+
+def _all_fields(taxonomy: typing.Sequence[dict]) -> typing.List[str]:
+    fields = getattr(taxonomy, "fields", None)
+    if fields is not None:
+        return list(fields)
+    names: typing.List[str] = []
+    for entry in taxonomy:
+        for name in entry:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def _compact(value: typing.Any) -> typing.Any:
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        if not value:
+            return _EMPTY
+        return tuple(_compact(item) for item in value)
+    return value
+
+
+def _expand(value: typing.Any) -> typing.Any:
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+class TaxonomyStore(collections.abc.Sequence):
+    """
+    A read-only taxonomy held column by column. Indexing or iterating
+    returns new entry dicts, so callers may modify them freely.
+
+    Args:
+        taxonomy (list): The taxonomy entries, or a TaxonomyCache.
+        fields (tuple, optional): The fields to keep, for example APP_FIELDS.
+            Defaults to every field in the taxonomy.
+    """
+
+    __slots__ = (
+        "fields",
+        "taxonomy_version",
+        "_columns",
+        "_layout",
+        "_taxon_order",
+        "_order_is_float",
+        "_length",
+    )
+
+    def __init__(
+        self,
+        taxonomy: typing.Sequence[dict],
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ):
+        self.fields = tuple(fields if fields else _all_fields(taxonomy))
+        self.taxonomy_version: str = getattr(taxonomy, "taxonomy_version", "")
+        columns: typing.Dict[str, list] = {
+            name: [] for name in self.fields if name != "taxonOrder"
+        }
+        orders: typing.List[typing.Any] = []
+        self._length = 0
+        for values in iter_fields(taxonomy, *self.fields):
+            self._length += 1
+            for name, value in zip(self.fields, values):
+                if name == "taxonOrder":
+                    orders.append(value)
+                else:
+                    columns[name].append(_compact(value))
+        self._columns = columns
+        # Columns in field order, with None standing for taxonOrder.
+        self._layout = tuple((name, columns.get(name)) for name in self.fields)
+        self._order_is_float = any(isinstance(x, float) for x in orders)
+        if all(x is not None and float(x).is_integer() for x in orders):
+            self._taxon_order = array.array("q", (int(x) for x in orders))
+        else:
+            # Orders that are not whole numbers are kept exactly.
+            self._taxon_order = orders
+
+    def taxon_order(self, position: int) -> typing.Any:
+        """Returns the taxonOrder of an entry."""
+        order = self._taxon_order[position]
+        if self._order_is_float and order is not None:
+            return float(order)
+        return order
+
+    def field(
+        self, position: int, name: str, default: typing.Any = None
+    ) -> typing.Any:
+        """Returns a single field of an entry without building the dict."""
+        if name == "taxonOrder" and name in self.fields:
+            value = self.taxon_order(position)
+        elif name in self._columns:
+            value = _expand(self._columns[name][position])
+        else:
+            return default
+        return default if value is None else value
+
+    def iter_fields(
+        self, *names: str
+    ) -> typing.Iterator[typing.Tuple[typing.Any, ...]]:
+        """Yields a tuple of the named fields for each entry in order."""
+        for position in range(len(self)):
+            yield tuple(self.field(position, name) for name in names)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("taxonomy index out of range")
+        entry = {}
+        for name, column in self._layout:
+            if column is None:
+                value = self.taxon_order(position)
+            else:
+                value = column[position]
+                if type(value) is tuple:
+                    value = list(value)
+            if value is not None:
+                entry[name] = value
+        return entry
@@ -0,0 +1,66 @@
+"""
+A local HTTP server for tests that need real network round trips.
+"""
+
+import http.server
+import threading
+import urllib.parse
+
+
+class StubServer:
+    """
+    Serves canned responses on localhost. Each route maps a path to a
+    function that takes the parsed query and returns (status, headers, body).
+    Use as a context manager; `url(path)` gives the address of a route and
+    `requests` records the paths that were requested and `clients` the
+    address of the connection each arrived on. Connections are kept alive.
+    """
+
+    def __init__(self, routes: dict):
+        self.routes = routes
+        self.requests = []
+        self.clients = []
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                stub.requests.append(parsed.path)
+                stub.clients.append(self.client_address)
+                route = stub.routes.get(parsed.path)
+                if route is None:
+                    status, headers, body = 404, {}, b""
+                else:
+                    status, headers, body = route(
+                        urllib.parse.parse_qs(parsed.query)
+                    )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), Handler
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def url(self, path: str) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
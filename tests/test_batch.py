@@ -0,0 +1,175 @@
+"""
+Tests  photo_id/batch.py
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from photo_id import batch
+from photo_id import taxonomy_cache
+
+TAXONOMY = [
+    {"comName": "Brambling", "speciesCode": "brambl", "taxonOrder": 1},
+    {"comName": "Common Chaffinch", "speciesCode": "comcha", "taxonOrder": 2},
+    {"comName": "Reed Bunting", "speciesCode": "reebun", "taxonOrder": 3},
+]
+
+
+def parse(*argv):
+    parser = argparse.ArgumentParser(prog="photo-id")
+    batch.add_parser(parser.add_subparsers(dest="command"))
+    return parser.parse_args(argv)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        """Run each test in a directory with a fresh taxonomy cache."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        os.makedirs(".cache")
+        taxonomy_cache.write_cache(".cache/taxonomy.bin", TAXONOMY, "2024")
+        os.makedirs("trip/day1")
+        for name, species in (
+            ("trip/a.json", ["Reed Bunting", "Brambling"]),
+            ("trip/day1/b.json", ["Common Chaffinch", "Brambling"]),
+        ):
+            self.write_quiz(name, species)
+        batch._taxonomy = None
+
+    def tearDown(self):
+        batch._taxonomy = None
+        if batch._manifest is not None:
+            batch._manifest.close()
+            batch._manifest = None
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    @staticmethod
+    def write_quiz(name, species):
+        with open(name, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "location": "NO",
+                    "start_month": 5,
+                    "end_month": 6,
+                    "species": [{"comName": s} for s in species],
+                },
+                f,
+            )
+
+    def run_batch(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = batch.run(parse("batch", *argv))
+        return code, output.getvalue()
+
+    def sorted_names(self, name):
+        with open(name + ".sorted", encoding="utf-8") as f:
+            return [s["comName"] for s in json.load(f)["species"]]
+
+    def test_expand_files(self):
+        self.assertEqual(
+            batch.expand_files(["trip/**/*.json", "trip/a.json", "none/*"]),
+            ["trip/a.json", os.path.join("trip", "day1", "b.json")],
+        )
+
+    def test_sort(self):
+        code, output = self.run_batch("--jobs", "1", "sort", "trip/**/*.json")
+        self.assertEqual(code, batch.OK)
+        self.assertEqual(
+            self.sorted_names("trip/a.json"), ["Brambling", "Reed Bunting"]
+        )
+        self.assertEqual(
+            self.sorted_names("trip/day1/b.json"),
+            ["Brambling", "Common Chaffinch"],
+        )
+        self.assertIn("2 file(s), 0 failed", output)
+
+    def test_sort_skips_unchanged_files(self):
+        self.run_batch("--jobs", "1", "sort", "trip/**/*.json")
+        self.write_quiz("trip/a.json", ["Brambling"])
+        code, output = self.run_batch("--jobs", "1", "sort", "trip/**/*.json")
+        self.assertEqual(code, batch.OK)
+        self.assertIn("ok     trip/a.json: sorted", output)
+        self.assertIn("b.json: up to date", output)
+        self.assertEqual(self.sorted_names("trip/a.json"), ["Brambling"])
+
+        _, output = self.run_batch(
+            "--jobs", "1", "--force", "sort", "trip/**/*.json"
+        )
+        self.assertNotIn("up to date", output)
+
+    def test_sort_in_process_pool(self):
+        code, output = self.run_batch("--jobs", "2", "sort", "trip/**/*.json")
+        self.assertEqual(code, batch.OK, output)
+        self.assertEqual(
+            self.sorted_names("trip/a.json"), ["Brambling", "Reed Bunting"]
+        )
+        self.assertTrue(os.path.isfile("trip/day1/b.json.sorted"))
+
+    def test_split(self):
+        code, _ = self.run_batch(
+            "--jobs", "1", "split", "--max-size", "1", "trip/a.json"
+        )
+        self.assertEqual(code, batch.OK)
+        self.assertTrue(os.path.isfile("trip/a_Part2.json"))
+
+    def test_build(self):
+        with open("targets.txt", "wt", encoding="utf-8") as f:
+            f.write("1.\nBrambling\n10.\n2.\nReed Bunting\n2.\n")
+        code, output = self.run_batch(
+            "build",
+            "--min-frequency",
+            "5",
+            "--start-month",
+            "5",
+            "--end-month",
+            "6",
+            "--location",
+            "NO",
+            "targets.txt",
+        )
+        self.assertEqual(code, batch.OK, output)
+        with open("targets.json", encoding="utf-8") as f:
+            quiz = json.load(f)
+        self.assertEqual(
+            [s["comName"] for s in quiz["species"]], ["Brambling"]
+        )
+
+    @mock.patch(
+        "photo_id.batch.get_size_data.read_cached_avonet_data",
+        return_value={"Emberiza schoeniclus": {"Mass": 19.0}},
+    )
+    def test_avonet_failure(self, _mock_read):
+        with open("trip/broken.json", "wt", encoding="utf-8") as f:
+            f.write("{")
+        code, output = self.run_batch("--jobs", "1", "avonet", "trip/*.json")
+        self.assertEqual(code, batch.FAILED)
+        self.assertIn("FAILED trip/broken.json", output)
+        self.assertIn("ok     trip/a.json", output)
+
+    @mock.patch(
+        "photo_id.batch.get_size_data.read_cached_avonet_data",
+        return_value={},
+    )
+    def test_avonet_without_data(self, _mock_read):
+        code, output = self.run_batch("--jobs", "1", "avonet", "trip/*.json")
+        self.assertEqual(code, batch.FAILED)
+        self.assertIn("No cached Avonet data", output)
+        self.assertNotIn("trip/a.json", output)
+
+    def test_no_files(self):
+        code, output = self.run_batch("sort", "missing/*.json")
+        self.assertEqual(code, batch.NO_FILES)
+        self.assertIn("No files", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
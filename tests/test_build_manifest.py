@@ -0,0 +1,83 @@
+"""
+Tests  photo_id/build_manifest.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from photo_id import build_manifest
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = self.path("quiz.json")
+        self.output = self.path("quiz.json.sorted")
+        self.write(self.source, '{"species": []}')
+        self.write(self.output, "sorted")
+        self.manifest = build_manifest.BuildManifest(
+            self.path(".cache/manifest.sqlite")
+        )
+
+    def tearDown(self):
+        self.manifest.close()
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    @staticmethod
+    def write(path, text):
+        with open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_not_current_until_recorded(self):
+        self.assertFalse(self.manifest.is_current("sort", self.source, [1]))
+        self.manifest.record("sort", self.source, [1], [self.output])
+        self.assertTrue(self.manifest.is_current("sort", self.source, [1]))
+        self.assertEqual(self.manifest.hits, 1)
+
+    def test_params_change(self):
+        self.manifest.record("sort", self.source, [1], [self.output])
+        self.assertFalse(self.manifest.is_current("sort", self.source, [2]))
+        self.assertFalse(self.manifest.is_current("split", self.source, [1]))
+
+    def test_source_change(self):
+        self.manifest.record("sort", self.source, [1], [self.output])
+        self.write(self.source, '{"species": [{}]}')
+        self.assertFalse(self.manifest.is_current("sort", self.source, [1]))
+
+    def test_output_touched_or_removed(self):
+        self.manifest.record("sort", self.source, [1], [self.output])
+        self.write(self.output, "edited by hand")
+        self.assertFalse(self.manifest.is_current("sort", self.source, [1]))
+        self.manifest.record("sort", self.source, [1], [self.output])
+        os.remove(self.output)
+        self.assertFalse(self.manifest.is_current("sort", self.source, [1]))
+
+    def test_persists(self):
+        self.manifest.record("sort", self.source, [1], [self.output])
+        self.manifest.close()
+        self.manifest = build_manifest.BuildManifest(
+            self.path(".cache/manifest.sqlite")
+        )
+        self.assertTrue(self.manifest.is_current("sort", self.source, [1]))
+
+    def test_missing_source(self):
+        missing = self.path("missing.json")
+        self.manifest.record("sort", missing, [1], [self.output])
+        self.assertFalse(self.manifest.is_current("sort", missing, [1]))
+
+    def test_data_version(self):
+        data = {"Fringilla coelebs": {"Mass": 20}}
+        version = build_manifest.data_version(data)
+        self.assertEqual(build_manifest.data_version(dict(data)), version)
+        self.assertNotEqual(
+            build_manifest.data_version({"Fringilla coelebs": {"Mass": 21}}),
+            version,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests  photo_id/catalog_cache.py
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from photo_id import catalog_cache
+from photo_id.catalog_cache import CatalogCache, catalog_key
+from photo_id.scheduler import Priority
+
+KEY = catalog_key("comchi1", "NO", 6, 8)
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "catalog.sqlite")
+        self.cache = CatalogCache(self.path, ttl=60)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get(KEY))
+        self.cache.put(KEY, ["1", "2"])
+        self.assertEqual(
+            self.cache.get(KEY), catalog_cache.CatalogEntry(["1", "2"], False)
+        )
+        self.assertIsNone(self.cache.get(catalog_key("comchi1", "", 6, 8)))
+
+    def test_persists(self):
+        self.cache.put(KEY, ["1"])
+        self.cache.close()
+        self.cache = CatalogCache(self.path, ttl=60)
+        self.assertEqual(self.cache.get(KEY).asset_ids, ["1"])
+
+    def test_lookup_miss_searches(self):
+        search = mock.Mock(return_value=["1", "2"])
+        self.assertEqual(self.cache.lookup(KEY, search), ["1", "2"])
+        self.assertEqual(self.cache.lookup(KEY, search), ["1", "2"])
+        search.assert_called_once_with()
+
+    def test_lookup_stale_revalidates(self):
+        self.cache.put(KEY, ["1"])
+        self.cache.ttl = -1
+        search = mock.Mock(return_value=["2"])
+        with mock.patch.object(self.cache, "revalidate") as revalidate:
+            self.assertEqual(self.cache.lookup(KEY, search), ["1"])
+        revalidate.assert_called_once_with(KEY, search)
+        search.assert_not_called()
+
+    def test_revalidate_once(self):
+        release = threading.Event()
+
+        def search():
+            release.wait()
+            return ["2"]
+
+        job = self.cache.revalidate(KEY, search)
+        self.assertIsNone(self.cache.revalidate(KEY, search))
+        release.set()
+        job.result(timeout=10)
+        self.assertIsNotNone(self.cache.revalidate(KEY, lambda: ["3"]))
+
+    def test_revalidate_scheduled(self):
+        work_scheduler = mock.Mock()
+        with mock.patch(
+            "photo_id.catalog_cache.scheduler.shared_scheduler",
+            return_value=work_scheduler,
+        ):
+            job = self.cache.revalidate(KEY, lambda: ["2"])
+        self.assertIs(job, work_scheduler.submit.return_value)
+        work, priority = work_scheduler.submit.call_args.args
+        self.assertEqual(priority, Priority.WARMING)
+        work()
+        self.assertEqual(self.cache.get(KEY).asset_ids, ["2"])
+
+    def test_revalidate_failure_keeps_entry(self):
+        self.cache.put(KEY, ["1"])
+
+        def search():
+            raise OSError("offline")
+
+        with self.assertLogs(level="WARNING"):
+            self.cache.revalidate(KEY, search).result(timeout=10)
+        self.assertEqual(self.cache.get(KEY).asset_ids, ["1"])
+
+
+class TestCatalogKey(unittest.TestCase):
+    def test_months_are_numbers(self):
+        self.assertEqual(
+            catalog_key("comchi1", None, "1", "12"),
+            catalog_cache.CatalogKey("comchi1", "", 1, 12),
+        )
+
+
+class TestCatalogTtl(unittest.TestCase):
+    def test_default(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual(catalog_cache.catalog_ttl(), 14 * 24 * 60 * 60)
+
+    def test_environment(self):
+        with mock.patch.dict(
+            os.environ, {"PHOTO_ID_CATALOG_TTL_DAYS": "0.5"}, clear=True
+        ):
+            self.assertEqual(catalog_cache.catalog_ttl(), 12 * 60 * 60)
+
+    def test_invalid(self):
+        with mock.patch.dict(
+            os.environ, {"PHOTO_ID_CATALOG_TTL_DAYS": "soon"}, clear=True
+        ), self.assertLogs(level="WARNING"):
+            self.assertEqual(catalog_cache.catalog_ttl(), 14 * 24 * 60 * 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests  photo_id/fetch_engine.py
+"""
+
+import asyncio
+import concurrent.futures
+import gc
+import threading
+import time
+import unittest
+from unittest import mock
+
+from photo_id import fetch_engine
+from photo_id.fetch_engine import FetchEngine, FetchGroup, TokenBucket
+from tests.http_stub import StubServer
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=2)
+
+        async def acquire(count):
+            started = time.monotonic()
+            for _ in range(count):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        self.assertLess(asyncio.run(acquire(2)), 0.015)
+        # Two more tokens take about 1 / 50 s each.
+        self.assertGreaterEqual(asyncio.run(acquire(2)), 0.03)
+
+
+class TestFetchEngine(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+        self.release = threading.Event()
+
+        def slow(query):
+            with self.lock:
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            self.release.wait(5)
+            with self.lock:
+                self.running -= 1
+            return 200, {}, b"done"
+
+        self.stub = StubServer({"/slow": slow})
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.addCleanup(self.release.set)
+
+    def test_host_limit(self):
+        engine = FetchEngine(host_limits={"127.0.0.1": 2}, host_rates={})
+        self.addCleanup(engine.close)
+        futures = [engine.fetch(self.stub.url("/slow")) for _ in range(6)]
+        time.sleep(0.2)
+        self.assertEqual(self.running, 2)
+        self.release.set()
+        for future in futures:
+            self.assertEqual(future.result(5).content, b"done")
+        self.assertEqual(self.most_running, 2)
+
+    def test_overlaps_requests(self):
+        engine = FetchEngine(host_limits={}, host_rates={}, default_limit=5)
+        self.addCleanup(engine.close)
+        futures = [engine.fetch(self.stub.url("/slow")) for _ in range(5)]
+        time.sleep(0.2)
+        self.assertEqual(self.running, 5)
+        self.release.set()
+        for future in futures:
+            self.assertEqual(future.result(5).status_code, 200)
+
+    def test_rate_limit(self):
+        self.release.set()
+        engine = FetchEngine(host_rates={"127.0.0.1": (20, 1)})
+        self.addCleanup(engine.close)
+        started = time.monotonic()
+        futures = [engine.fetch(self.stub.url("/slow")) for _ in range(4)]
+        for future in futures:
+            future.result(5)
+        # One request at once, then one every 1 / 20 s.
+        self.assertGreaterEqual(time.monotonic() - started, 0.14)
+
+    def test_cancel_queued(self):
+        engine = FetchEngine(host_limits={"127.0.0.1": 1}, host_rates={})
+        self.addCleanup(engine.close)
+        first = engine.fetch(self.stub.url("/slow"))
+        second = engine.fetch(self.stub.url("/slow"))
+        time.sleep(0.1)
+        self.assertTrue(second.cancel())
+        self.release.set()
+        first.result(5)
+        time.sleep(0.1)
+        self.assertEqual(self.stub.requests, ["/slow"])
+
+    def test_close_cancels_waiting_requests(self):
+        engine = FetchEngine(host_limits={"127.0.0.1": 1}, host_rates={})
+        running = engine.fetch(self.stub.url("/slow"))
+        queued = engine.fetch(self.stub.url("/slow"))
+        time.sleep(0.1)
+        engine.close()
+        self.assertTrue(running.cancelled())
+        self.assertTrue(queued.cancelled())
+
+    def test_stream_holds_slot_until_closed(self):
+        self.release.set()
+        engine = FetchEngine(host_limits={"127.0.0.1": 1}, host_rates={})
+        self.addCleanup(engine.close)
+        first = engine.fetch(self.stub.url("/slow"), stream=True).result(5)
+        second = engine.fetch(self.stub.url("/slow"), stream=True)
+        time.sleep(0.1)
+        # The first body has not been read, so the second waits for it.
+        self.assertFalse(second.done())
+        self.assertEqual(first.content, b"done")
+        first.close()
+        second.result(5).close()
+
+    def test_stream_slot_released_when_collected(self):
+        self.release.set()
+        engine = FetchEngine(host_limits={"127.0.0.1": 1}, host_rates={})
+        self.addCleanup(engine.close)
+        engine.fetch(self.stub.url("/slow"), stream=True).result(5)
+        # The response was never closed, only dropped once the engine's
+        # own references to it have gone.
+        time.sleep(0.1)
+        gc.collect()
+        self.assertEqual(
+            engine.fetch(self.stub.url("/slow")).result(5).content, b"done"
+        )
+
+    def test_get(self):
+        self.release.set()
+        engine = FetchEngine()
+        self.addCleanup(engine.close)
+        with mock.patch(
+            "photo_id.fetch_engine.http_client.get",
+            wraps=fetch_engine.http_client.get,
+        ) as get:
+            response = engine.get(self.stub.url("/slow"), timeout=3)
+        self.assertEqual(response.content, b"done")
+        get.assert_called_once_with(self.stub.url("/slow"), timeout=3)
+
+
+class TestFetchGroup(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+        def slow(query):
+            self.release.wait(5)
+            return 200, {}, b"done"
+
+        self.stub = StubServer({"/slow": slow})
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.addCleanup(self.release.set)
+        self.engine = FetchEngine(host_limits={"127.0.0.1": 1}, host_rates={})
+        self.addCleanup(self.engine.close)
+
+    def test_get(self):
+        self.release.set()
+        response = FetchGroup(self.engine).get(self.stub.url("/slow"))
+        self.assertEqual(response.content, b"done")
+
+    def test_cancel_waiting_for_slot(self):
+        first = self.engine.fetch(self.stub.url("/slow"))
+        group = FetchGroup(self.engine)
+        pool = concurrent.futures.ThreadPoolExecutor(1)
+        self.addCleanup(pool.shutdown)
+        waiting = pool.submit(group.get, self.stub.url("/slow"))
+        time.sleep(0.1)
+        group.cancel()
+        with self.assertRaises(concurrent.futures.CancelledError):
+            waiting.result(5)
+        with self.assertRaises(concurrent.futures.CancelledError):
+            group.get(self.stub.url("/slow"))
+        self.release.set()
+        first.result(5)
+        time.sleep(0.1)
+        self.assertEqual(self.stub.requests, ["/slow"])
+
+
+if __name__ == "__main__":
+    unittest.main()
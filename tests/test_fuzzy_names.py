@@ -0,0 +1,63 @@
+"""
+Tests  photo_id/fuzzy_names.py
+"""
+
+import unittest
+
+from photo_id.fuzzy_names import FuzzyNameIndex, normalise, trigrams
+
+
+class TestNormalise(unittest.TestCase):
+    def test_normalise(self):
+        self.assertEqual(
+            normalise("Grey-headed  Woodpecker"), "gray headed woodpecker"
+        )
+        self.assertEqual(normalise("Swainson's Hawk"), "swainsons hawk")
+        self.assertEqual(normalise("Heron/Egret sp."), "heron egret sp")
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams("ab"), {"  a", " ab", "ab "})
+        self.assertEqual(trigrams(""), set())
+
+
+class TestFuzzyNameIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.index = FuzzyNameIndex(
+            [
+                (0, "Gray Heron"),
+                (1, "White-rumped Swift"),
+                (2, "Common Chiffchaff"),
+                (2, "Phylloscopus collybita"),
+                (3, "Eurasian Bullfinch"),
+                (4, ""),
+            ]
+        )
+
+    def test_len_skips_empty_names(self):
+        self.assertEqual(len(self.index), 5)
+
+    def test_spelling_variant_is_exact(self):
+        match = self.index.match("Grey Heron")
+        self.assertEqual(match.position, 0)
+        self.assertEqual(match.name, "Gray Heron")
+        self.assertEqual(match.score, 1.0)
+
+    def test_typos(self):
+        self.assertEqual(self.index.match("Whiterumped Swift").position, 1)
+        self.assertEqual(self.index.match("Common Chifchaff").position, 2)
+        self.assertEqual(self.index.match("phylloscopus colybita").position, 2)
+
+    def test_threshold(self):
+        self.assertIsNone(self.index.match("Eurasian Bullfrog"))
+        match = self.index.match("Eurasian Bullfrog", threshold=0.5)
+        self.assertEqual(match.position, 3)
+        self.assertLess(match.score, 0.85)
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.match("Unknown Species"))
+        self.assertIsNone(self.index.match("   "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -132,7 +132,7 @@ class TestReadXlsxToDict(unittest.TestCase):
 
 
 class TestDownloadFile(unittest.TestCase):
-    @mock.patch("photo_id.get_size_data.requests.get")
+    @mock.patch("photo_id.get_size_data.http_client.get")
     def test_successful_download(self, mock_get):
         # Mock the response object
         mock_response = MagicMock()
@@ -146,7 +146,7 @@ class TestDownloadFile(unittest.TestCase):
             mock_file().write.assert_called_once_with(b"file content")
 
     @mock.patch(
-        "photo_id.get_size_data.requests.get",
+        "photo_id.get_size_data.http_client.get",
         side_effect=requests.exceptions.HTTPError,
     )
     @mock.patch("photo_id.get_size_data.logging.error")
@@ -160,7 +160,7 @@ class TestDownloadFile(unittest.TestCase):
         )
 
     @mock.patch(
-        "photo_id.get_size_data.requests.get",
+        "photo_id.get_size_data.http_client.get",
         side_effect=requests.exceptions.Timeout,
     )
     @mock.patch("photo_id.get_size_data.logging.error")
@@ -173,7 +173,7 @@ class TestDownloadFile(unittest.TestCase):
             mock.ANY,
         )
 
-    @mock.patch("photo_id.get_size_data.requests.get")
+    @mock.patch("photo_id.get_size_data.http_client.get")
     @mock.patch("photo_id.get_size_data.logging.error")
     def test_io_error(self, mock_log_error, mock_get):
         # Mock the response object
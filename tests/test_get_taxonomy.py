@@ -3,42 +3,301 @@ Tests  photo_id/get_taxonomy.py
 """
 
 import json
+import os
+import tempfile
+import time
 import unittest
 from unittest import mock
+
 import photo_id.get_taxonomy
+from photo_id import taxonomy_cache
+from photo_id.taxonomy_index import TaxonomyIndex
+from tests.http_stub import StubServer
+
+
+def json_response(data):
+    return lambda _query: (
+        200,
+        {"Content-Type": "application/json"},
+        json.dumps(data).encode("utf-8"),
+    )
 
 
 class TestGetTaxonomy(unittest.TestCase):
-    def test_ebird_taxonomy(self):
+    def setUp(self):
+        """Run each test in an empty working directory."""
+        self.test_json = [{"comName": "value", "taxonOrder": 1.0}]
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    @mock.patch(
+        "photo_id.get_taxonomy.get_taxonomy_versions",
+        return_value=[{"authorityVer": 2024.0, "latest": True}],
+    )
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_downloads_when_no_cache(
+        self, mock_get_taxonomy, _mock_versions
+    ):
         """tests the function with that name"""
-        test_json = {"comName": "value"}
-        # Test case for when does not exist
-        with mock.patch(
-            "photo_id.get_taxonomy.os.path.isfile"
-        ) as mock_isfile, mock.patch(
-            "builtins.open", mock.mock_open(read_data=json.dumps(test_json))
-        ) as mock_file, mock.patch(
-            "photo_id.get_taxonomy.get_taxonomy"
-        ) as mock_get_taxonomy:
-            mock_isfile.return_value = True
-            mock_get_taxonomy.return_value = test_json
-            taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
-            mock_file.assert_called_with(
-                ".cache/taxonomy", encoding="utf-8", mode="rt"
-            )
-            self.assertEqual(taxonomy, test_json)
-        # Cache does not exist
-        with mock.patch(
-            "photo_id.get_taxonomy.os.path.isfile"
-        ) as mock_isfile, mock.patch(
-            "builtins.open", mock.mock_open(read_data=json.dumps(test_json))
-        ) as mock_file, mock.patch(
-            "photo_id.get_taxonomy.get_taxonomy"
-        ) as mock_get_taxonomy:
-            mock_isfile.return_value = False
-            mock_get_taxonomy.return_value = test_json
-            taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
-            mock_file.assert_called_with(
-                ".cache/taxonomy", encoding="utf-8", mode="wt"
+        mock_get_taxonomy.return_value = self.test_json
+        taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
+        mock_get_taxonomy.assert_called_once()
+        self.assertEqual(list(taxonomy), self.test_json)
+        self.assertEqual(taxonomy.taxonomy_version, "2024.0")
+        self.assertTrue(os.path.isfile(".cache/taxonomy.bin"))
+        taxonomy.close()
+
+    @mock.patch(
+        "photo_id.get_taxonomy.get_taxonomy_versions",
+        return_value=[{"authorityVer": 2024.0, "latest": True}],
+    )
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_rebuilds_empty_cache(
+        self, mock_get_taxonomy, _mock_versions
+    ):
+        os.makedirs(".cache")
+        open(".cache/taxonomy.bin", "wb").close()
+        self.assertEqual(photo_id.get_taxonomy.cached_versions(), {})
+        mock_get_taxonomy.return_value = self.test_json
+        taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
+        self.assertEqual(list(taxonomy), self.test_json)
+        taxonomy.close()
+
+    @mock.patch("photo_id.get_taxonomy.start_refresh")
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_uses_fresh_cache(
+        self, mock_get_taxonomy, mock_start_refresh
+    ):
+        os.makedirs(".cache")
+        taxonomy_cache.write_cache(".cache/taxonomy.bin", self.test_json)
+        taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
+        mock_get_taxonomy.assert_not_called()
+        mock_start_refresh.assert_not_called()
+        self.assertEqual(list(taxonomy), self.test_json)
+        taxonomy.close()
+
+    @mock.patch("photo_id.get_taxonomy.start_refresh")
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_serves_stale_cache(
+        self, mock_get_taxonomy, mock_start_refresh
+    ):
+        os.makedirs(".cache")
+        taxonomy_cache.write_cache(
+            ".cache/taxonomy.bin",
+            self.test_json,
+            "2023.0",
+            fetched_at=time.time() - 100,
+        )
+        taxonomy = photo_id.get_taxonomy.ebird_taxonomy(ttl=10)
+        mock_get_taxonomy.assert_not_called()
+        mock_start_refresh.assert_called_once_with("2023.0", "en")
+        self.assertEqual(list(taxonomy), self.test_json)
+        taxonomy.close()
+
+    @mock.patch("photo_id.get_taxonomy.start_refresh")
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_converts_legacy_cache(
+        self, mock_get_taxonomy, _mock_start_refresh
+    ):
+        os.makedirs(".cache")
+        with open(".cache/taxonomy", encoding="utf-8", mode="wt") as f:
+            json.dump(self.test_json, f)
+        taxonomy = photo_id.get_taxonomy.ebird_taxonomy()
+        mock_get_taxonomy.assert_not_called()
+        self.assertEqual(list(taxonomy), self.test_json)
+        taxonomy.close()
+
+    @mock.patch(
+        "photo_id.get_taxonomy.get_taxonomy_versions",
+        return_value=[{"authorityVer": 2024.0, "latest": True}],
+    )
+    @mock.patch("photo_id.get_taxonomy.get_taxonomy")
+    def test_ebird_taxonomy_locale(self, mock_get_taxonomy, _mock_versions):
+        mock_get_taxonomy.return_value = [
+            {
+                "comName": "Grågås",
+                "sciName": "Anser anser",
+                "speciesCode": "gragoo",
+                "taxonOrder": 263.0,
+            }
+        ]
+        names = photo_id.get_taxonomy.ebird_taxonomy(locale="no")
+        mock_get_taxonomy.assert_called_once_with(mock.ANY, locale="no")
+        self.assertEqual(
+            list(names), [{"speciesCode": "gragoo", "comName": "Grågås"}]
+        )
+        self.assertTrue(os.path.isfile(".cache/taxonomy-no.bin"))
+        self.assertFalse(os.path.isfile(".cache/taxonomy.bin"))
+        names.close()
+
+    @mock.patch("photo_id.get_taxonomy.ebird_taxonomy")
+    def test_load_locale(self, mock_ebird_taxonomy):
+        index = TaxonomyIndex(
+            [{"comName": "Graylag Goose", "speciesCode": "gragoo"}]
+        )
+        names = mock.MagicMock()
+        names.iter_fields.return_value = [("gragoo", "Grågås")]
+        mock_ebird_taxonomy.return_value = names
+        photo_id.get_taxonomy.load_locale(index, "no")
+        photo_id.get_taxonomy.load_locale(index, "no")
+        photo_id.get_taxonomy.load_locale(index, "en")
+        mock_ebird_taxonomy.assert_called_once_with(locale="no")
+        names.close.assert_called_once()
+        self.assertEqual(
+            index.by_common_name("grågås")["comName"], "Graylag Goose"
+        )
+
+    @mock.patch(
+        "photo_id.get_taxonomy.ebird_taxonomy",
+        side_effect=ValueError("eBird does not support this locale: xx"),
+    )
+    def test_load_locale_unsupported(self, _mock_ebird_taxonomy):
+        index = TaxonomyIndex([])
+        with mock.patch("photo_id.get_taxonomy.logging.error") as mock_error:
+            photo_id.get_taxonomy.load_locale(index, "xx")
+        mock_error.assert_called_once()
+        self.assertEqual(index.locales, {})
+
+    def test_ebird_api_key_not_set(self):
+        with mock.patch.dict(
+            os.environ, {photo_id.get_taxonomy.ebird_api_key_name: "0"}
+        ):
+            with self.assertRaises(SystemExit):
+                photo_id.get_taxonomy.ebird_api_key()
+
+    def test_taxonomy_ttl(self):
+        with mock.patch.dict(
+            os.environ, {photo_id.get_taxonomy.ttl_days_name: "2"}
+        ):
+            self.assertEqual(photo_id.get_taxonomy.taxonomy_ttl(), 172800)
+        with mock.patch.dict(
+            os.environ, {photo_id.get_taxonomy.ttl_days_name: "soon"}
+        ):
+            self.assertEqual(
+                photo_id.get_taxonomy.taxonomy_ttl(), 30 * 24 * 60 * 60
             )
-            self.assertEqual(taxonomy, test_json)
+
+
+class TestRefreshTaxonomy(unittest.TestCase):
+    """Revalidates the cache against a local stub of the ebird API."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        os.makedirs(".cache")
+        self.old = [{"comName": "Old Name", "taxonOrder": 1.0}]
+        self.new = [{"comName": "New Name", "taxonOrder": 1.0}]
+        taxonomy_cache.write_cache(
+            ".cache/taxonomy.bin", self.old, "2023.0", fetched_at=0
+        )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def refresh(self, routes, cached_version="2023.0"):
+        with StubServer(routes) as stub, mock.patch(
+            "ebird.api.taxonomy.TAXONOMY_URL", stub.url("/taxonomy")
+        ), mock.patch(
+            "ebird.api.taxonomy.TAXONOMY_VERSIONS_URL", stub.url("/versions")
+        ), mock.patch.dict(
+            os.environ, {photo_id.get_taxonomy.ebird_api_key_name: "key"}
+        ):
+            photo_id.get_taxonomy.start_refresh(cached_version).join(10)
+            return stub.requests
+
+    def test_refresh_new_version(self):
+        requests = self.refresh(
+            {
+                "/versions": json_response(
+                    [
+                        {"authorityVer": 2023.0, "latest": False},
+                        {"authorityVer": 2024.0, "latest": True},
+                    ]
+                ),
+                "/taxonomy": json_response(self.new),
+            }
+        )
+        self.assertEqual(requests, ["/versions", "/taxonomy"])
+        cache = taxonomy_cache.open_cache(".cache/taxonomy.bin")
+        self.assertEqual(list(cache), self.new)
+        self.assertEqual(cache.taxonomy_version, "2024.0")
+        self.assertLess(cache.age(), 60)
+        cache.close()
+        archived = taxonomy_cache.open_cache(
+            ".cache/versions/taxonomy-2023.0.bin"
+        )
+        self.assertEqual(list(archived), self.old)
+        archived.close()
+        self.assertEqual(
+            photo_id.get_taxonomy.cached_versions(),
+            {
+                "2023.0": os.path.join(
+                    ".cache/versions", "taxonomy-2023.0.bin"
+                ),
+                "2024.0": ".cache/taxonomy.bin",
+            },
+        )
+
+    def test_refresh_archives_legacy_cache(self):
+        taxonomy_cache.write_cache(
+            ".cache/taxonomy.bin", self.old, fetched_at=86400
+        )
+        self.refresh(
+            {
+                "/versions": json_response(
+                    [{"authorityVer": 2024.0, "latest": True}]
+                ),
+                "/taxonomy": json_response(self.new),
+            },
+            cached_version="",
+        )
+        archived = taxonomy_cache.open_cache(
+            ".cache/versions/taxonomy-fetched-1970-01-02.bin"
+        )
+        self.assertEqual(list(archived), self.old)
+        archived.close()
+        self.assertEqual(
+            photo_id.get_taxonomy.cached_versions(),
+            {
+                "fetched-1970-01-02": os.path.join(
+                    ".cache/versions", "taxonomy-fetched-1970-01-02.bin"
+                ),
+                "2024.0": ".cache/taxonomy.bin",
+            },
+        )
+
+    def test_refresh_same_version(self):
+        requests = self.refresh(
+            {
+                "/versions": json_response(
+                    [{"authorityVer": 2023.0, "latest": True}]
+                ),
+            }
+        )
+        self.assertEqual(requests, ["/versions"])
+        cache = taxonomy_cache.open_cache(".cache/taxonomy.bin")
+        self.assertEqual(list(cache), self.old)
+        self.assertLess(cache.age(), 60)
+        cache.close()
+        self.assertEqual(
+            photo_id.get_taxonomy.cached_versions(),
+            {"2023.0": ".cache/taxonomy.bin"},
+        )
+
+    def test_refresh_failure_keeps_stale_cache(self):
+        requests = self.refresh(
+            {"/versions": lambda _query: (503, {}, b"unavailable")}
+        )
+        self.assertEqual(requests, ["/versions"])
+        cache = taxonomy_cache.open_cache(".cache/taxonomy.bin")
+        self.assertEqual(list(cache), self.old)
+        self.assertEqual(cache.fetched_at, 0)
+        cache.close()
+        self.assertEqual(os.listdir(".cache"), ["taxonomy.bin"])
@@ -0,0 +1,80 @@
+"""
+Tests  photo_id/http_client.py
+"""
+
+import os
+import unittest
+from unittest import mock
+
+import requests
+
+from photo_id import http_client
+from tests.http_stub import StubServer
+
+
+def ok(query):
+    return 200, {"Content-Type": "text/plain"}, b"ok"
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            http_client, "_session", http_client.new_session(2)
+        )
+        self.session = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.session.close)
+
+    def test_connections_reused(self):
+        with StubServer({"/a": ok, "/b": ok}) as stub:
+            for path in ("/a", "/b", "/a"):
+                response = http_client.get(stub.url(path))
+                self.assertEqual(response.content, b"ok")
+        self.assertEqual(stub.requests, ["/a", "/b", "/a"])
+        self.assertEqual(len(set(stub.clients)), 1)
+
+    def test_shared(self):
+        self.assertIs(http_client.shared_session(), self.session)
+
+    def test_timeouts(self):
+        with mock.patch.object(self.session, "get") as get:
+            http_client.get("http://example.com", timeout=7, stream=True)
+        get.assert_called_once_with(
+            "http://example.com",
+            timeout=(http_client.CONNECT_TIMEOUT, 7),
+            stream=True,
+        )
+
+    def test_error_status_not_retried(self):
+        def fail(query):
+            return 503, {}, b""
+
+        with StubServer({"/fail": fail}) as stub:
+            response = http_client.get(stub.url("/fail"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(stub.requests, ["/fail"])
+        with self.assertRaises(requests.exceptions.HTTPError):
+            response.raise_for_status()
+
+
+class TestPoolSize(unittest.TestCase):
+    def test_default(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual(http_client.pool_size(), 16)
+
+    def test_environment(self):
+        with mock.patch.dict(
+            os.environ, {"PHOTO_ID_HTTP_POOL_SIZE": "4"}, clear=True
+        ):
+            self.assertEqual(http_client.pool_size(), 4)
+
+    def test_invalid(self):
+        for value in ("many", "0"):
+            with mock.patch.dict(
+                os.environ, {"PHOTO_ID_HTTP_POOL_SIZE": value}, clear=True
+            ), self.assertLogs(level="WARNING"):
+                self.assertEqual(http_client.pool_size(), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests  photo_id/image_cache.py
+"""
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from photo_id import image_cache
+from photo_id.image_cache import ImageCache
+
+
+def fill_cache(directory, worker):
+    cache = ImageCache(directory, max_bytes=10_000)
+    for number in range(20):
+        cache.put(f"http://example.com/{worker}/{number}", b"x" * 1000)
+    cache.close()
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ImageCache(self.directory.name, max_bytes=2500)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def files(self):
+        return sorted(
+            name
+            for _, _, names in os.walk(self.directory.name)
+            for name in names
+            if not name.startswith("index.sqlite")
+        )
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("http://example.com/1"))
+        self.cache.put("http://example.com/1", b"image")
+        self.assertEqual(self.cache.get("http://example.com/1"), b"image")
+        self.assertEqual(self.cache.size(), 5)
+
+    def test_persists(self):
+        self.cache.put("http://example.com/1", b"image")
+        self.cache.close()
+        self.cache = ImageCache(self.directory.name, max_bytes=2500)
+        self.assertEqual(self.cache.get("http://example.com/1"), b"image")
+
+    def test_least_recently_used_evicted(self):
+        for name in ("a", "b"):
+            self.cache.put(f"http://example.com/{name}", b"x" * 1000)
+        self.cache.get("http://example.com/a")
+        self.cache.put("http://example.com/c", b"x" * 1000)
+        self.assertIsNotNone(self.cache.get("http://example.com/a"))
+        self.assertIsNone(self.cache.get("http://example.com/b"))
+        self.assertIsNotNone(self.cache.get("http://example.com/c"))
+        self.assertEqual(self.cache.size(), 2000)
+        self.assertEqual(len(self.files()), 2)
+
+    def test_no_temporary_files_left(self):
+        self.cache.put("http://example.com/1", b"image")
+        self.assertFalse(any(name.startswith(".") for name in self.files()))
+
+    def test_missing_file(self):
+        self.cache.put("http://example.com/1", b"image")
+        for root, _, names in os.walk(self.directory.name):
+            for name in names:
+                if not name.startswith("index.sqlite"):
+                    os.remove(os.path.join(root, name))
+        self.assertIsNone(self.cache.get("http://example.com/1"))
+
+    def test_shared_by_processes(self):
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(
+                target=fill_cache, args=(self.directory.name, worker)
+            )
+            for worker in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+        self.assertLessEqual(self.cache.size(), 10_000)
+        self.assertEqual(len(self.files()), self.cache.size() // 1000)
+
+    def test_cache_budget(self):
+        with mock.patch.dict(os.environ, {image_cache.budget_name: "2"}):
+            self.assertEqual(image_cache.cache_budget(), 2 * 1024 * 1024)
+        with mock.patch.dict(os.environ, {image_cache.budget_name: "x"}):
+            self.assertEqual(image_cache.cache_budget(), 500 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests  photo_id/image_loader.py
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from photo_id.image_loader import ImageLoader
+from photo_id.scheduler import Priority, Scheduler
+
+
+class TestImageLoader(unittest.TestCase):
+    def setUp(self):
+        self.root = MagicMock()
+        self.loader = ImageLoader(self.root, Scheduler(workers=4))
+
+    def tearDown(self):
+        self.loader.close()
+
+    def poll_until_done(self, futures):
+        for future in futures:
+            future.exception(timeout=5)
+        self.loader.poll()
+
+    def test_results_delivered_on_poll(self):
+        results = []
+        futures = [
+            self.loader.submit(lambda n=n: n * n, results.append)
+            for n in range(5)
+        ]
+        self.root.after.assert_called_once_with(50, self.loader.poll)
+        self.assertEqual(results, [])
+        self.poll_until_done(futures)
+        self.assertEqual(sorted(results), [0, 1, 4, 9, 16])
+
+    def test_work_runs_in_parallel(self):
+        started = threading.Barrier(3, timeout=5)
+        results = []
+        futures = [
+            self.loader.submit(started.wait, results.append) for _ in range(3)
+        ]
+        self.poll_until_done(futures)
+        self.assertEqual(len(results), 3)
+
+    def test_keeps_polling_while_work_pending(self):
+        release = threading.Event()
+        future = self.loader.submit(release.wait, MagicMock())
+        self.loader.poll()
+        self.assertEqual(self.root.after.call_count, 2)
+        release.set()
+        self.poll_until_done([future])
+        self.assertEqual(self.root.after.call_count, 2)
+
+    def test_delivery_yields_to_tk(self):
+        results = []
+
+        def slow_done(result):
+            # Longer than a poll may spend delivering.
+            time.sleep(0.02)
+            results.append(result)
+
+        futures = [
+            self.loader.submit(lambda n=n: n, slow_done) for n in range(4)
+        ]
+        self.poll_until_done(futures)
+        self.assertEqual(len(results), 1)
+        self.root.after.assert_called_with(1, self.loader.poll)
+        for _ in range(3):
+            self.loader.poll()
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+
+    def test_failures_are_logged(self):
+        done = MagicMock()
+
+        def fail():
+            raise OSError("offline")
+
+        future = self.loader.submit(fail, done)
+        with self.assertLogs(level="ERROR"):
+            self.poll_until_done([future])
+        done.assert_not_called()
+
+    def test_failures_reported(self):
+        done = MagicMock()
+        failed = MagicMock()
+        error = OSError("offline")
+
+        def fail():
+            raise error
+
+        future = self.loader.submit(fail, done, failed=failed)
+        with self.assertLogs(level="ERROR"):
+            self.poll_until_done([future])
+        done.assert_not_called()
+        failed.assert_called_once_with(error)
+
+    def test_reprioritise(self):
+        work_scheduler = MagicMock()
+        loader = ImageLoader(self.root, work_scheduler)
+        job = loader.submit(MagicMock(), MagicMock(), Priority.LOOKAHEAD)
+        work_scheduler.submit.assert_called_once_with(
+            unittest.mock.ANY, Priority.LOOKAHEAD, owner=loader
+        )
+        loader.reprioritise(job, Priority.VISIBLE)
+        work_scheduler.reprioritise.assert_called_once_with(
+            job, Priority.VISIBLE
+        )
+
+    def test_close_cancels_queued_work(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        for _ in range(4):
+            self.loader.submit(release.wait, MagicMock())
+        queued = self.loader.submit(lambda: 1, MagicMock())
+        self.loader.close()
+        self.assertTrue(queued.cancelled())
+
+    def test_no_results_after_close(self):
+        done = MagicMock()
+        future = self.loader.submit(lambda: 1, done)
+        future.result(timeout=5)
+        self.loader.close()
+        self.loader.poll()
+        done.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests  photo_id/image_pipeline.py
+"""
+
+import concurrent.futures
+import concurrent.futures.process
+import io
+import multiprocessing
+import unittest
+from unittest import mock
+
+from PIL import Image, JpegImagePlugin
+
+from photo_id import image_pipeline
+
+
+def encoded(image_format, size=(1200, 800)):
+    output = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(output, format=image_format)
+    return output.getvalue()
+
+
+class TestScaleToWidth(unittest.TestCase):
+    def test_jpeg_decoded_in_draft_mode(self):
+        image = Image.open(io.BytesIO(encoded("JPEG")))
+        with mock.patch.object(
+            JpegImagePlugin.JpegImageFile,
+            "draft",
+            autospec=True,
+            side_effect=JpegImagePlugin.JpegImageFile.draft,
+        ) as draft:
+            scaled = image_pipeline.scale_to_width(image, 300)
+        draft.assert_called_once_with(image, "RGB", (300, 200))
+        # Drafting at 1/4 scale decodes no more than the 300 x 200 asked for.
+        self.assertEqual(image.size, (300, 200))
+        self.assertEqual(scaled.size, (300, 200))
+        self.assertEqual(scaled.getpixel((150, 100)), image.getpixel((0, 0)))
+
+    def test_jpeg_not_enlarged_by_draft(self):
+        image = Image.open(io.BytesIO(encoded("JPEG", (400, 300))))
+        with mock.patch.object(
+            JpegImagePlugin.JpegImageFile, "draft"
+        ) as draft:
+            scaled = image_pipeline.scale_to_width(image, 800)
+        draft.assert_not_called()
+        self.assertEqual(scaled.size, (800, 600))
+
+    def test_png(self):
+        scaled = image_pipeline.scale_to_width(
+            Image.open(io.BytesIO(encoded("PNG"))), 420
+        )
+        self.assertEqual(scaled.size, (420, 280))
+
+    def test_reduces_before_resampling(self):
+        image = Image.new("RGB", (1200, 800))
+        with mock.patch.object(image, "resize") as resize:
+            image_pipeline.scale_to_width(image, 420)
+        resize.assert_called_once_with(
+            (420, 280), Image.Resampling.LANCZOS, reducing_gap=2.0
+        )
+
+
+class TestDecode(unittest.TestCase):
+    def use_pool(self, pool):
+        patcher = mock.patch.object(
+            image_pipeline, "shared_pool", return_value=pool
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_decode_here(self):
+        self.use_pool(None)
+        scaled = image_pipeline.decode(encoded("JPEG"), 420)
+        self.assertEqual(scaled.size, (420, 280))
+        self.assertEqual(scaled.mode, "RGB")
+
+    def test_decode_in_process(self):
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.addCleanup(pool.shutdown)
+        self.use_pool(pool)
+        scaled = image_pipeline.decode(encoded("PNG"), 420)
+        self.assertEqual(scaled.size, (420, 280))
+        self.assertEqual(scaled.mode, "RGB")
+        self.assertEqual(scaled.getpixel((210, 140)), (200, 120, 40))
+
+    def test_pixels(self):
+        pixels = image_pipeline.decode_pixels(encoded("PNG"), 6)
+        self.assertEqual(pixels.size, (6, 4))
+        self.assertEqual(len(pixels.data), 6 * 4 * 3)
+        image = image_pipeline.to_image(pixels)
+        self.assertEqual(image.mode, "RGB")
+        self.assertEqual(image.getpixel((5, 3)), (200, 120, 40))
+
+    def test_broken_pool_decodes_here(self):
+        pool = mock.MagicMock()
+        pool.submit.return_value.result.side_effect = (
+            concurrent.futures.process.BrokenProcessPool("killed")
+        )
+        self.use_pool(pool)
+        with self.assertLogs(level="WARNING"):
+            scaled = image_pipeline.decode(encoded("JPEG"), 420)
+        self.assertEqual(scaled.size, (420, 280))
+        pool.shutdown.assert_called_once()
+
+
+class TestDecodeProcesses(unittest.TestCase):
+    @mock.patch.dict("os.environ", {"PHOTO_ID_DECODE_PROCESSES": "3"})
+    def test_from_environment(self):
+        self.assertEqual(image_pipeline.decode_processes(), 3)
+
+    @mock.patch.dict("os.environ", {"PHOTO_ID_DECODE_PROCESSES": "0"})
+    def test_disabled(self):
+        self.assertEqual(image_pipeline.decode_processes(), 0)
+
+    @mock.patch.dict("os.environ", {"PHOTO_ID_DECODE_PROCESSES": "-1"})
+    def test_invalid(self):
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(
+                image_pipeline.decode_processes(),
+                image_pipeline.default_processes,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,25 @@
+import concurrent.futures
 import requests
+import threading
 import unittest
 
 from unittest.mock import MagicMock, patch
 
+from photo_id import catalog_cache
+from photo_id import fetch_engine
+from photo_id import retry
+from photo_id import scheduler
+from photo_id.scheduler import Priority
 
 from photo_id.match_window import (
+    PLACEHOLDER_IMAGE,
     SpeciesFrame,
     VerticalScrolledFrame,
+    asset_url,
+    display_scaling,
+    fallback_searches,
+    rendition_width,
+    scan_asset_ids,
     web_browser_callback,
     MatchWindow,
 )
@@ -59,6 +72,87 @@ class TestVerticalScrolledFrame(unittest.TestCase):
         )
 
 
+class TestVirtualizedFrame(unittest.TestCase):
+    @patch("photo_id.match_window.ttk.Frame")
+    @patch("photo_id.match_window.Scrollbar")
+    @patch("photo_id.match_window.Canvas")
+    def setUp(self, mock_canvas, mock_scrollbar, mock_frame):
+        self.canvas = mock_canvas.return_value
+        self.canvas.canvasy.return_value = 0
+        self.canvas.winfo_height.return_value = 600
+        self.scrollbar = mock_scrollbar.return_value
+        self.vs_frame = VerticalScrolledFrame(MagicMock())
+        self.created = []
+        self.hidden = []
+        self.shown = []
+        self.visible = {}
+
+        def create(index):
+            widget = MagicMock(name=f"cell{index}")
+            widget.winfo_reqheight.return_value = 450
+            self.created.append(index)
+            return widget
+
+        # 20 cells in rows of 2, each row 450 pixels high.
+        self.vs_frame.virtualize(
+            20,
+            2,
+            428,
+            create,
+            on_hide=self.hidden.append,
+            on_show=self.shown.append,
+            on_visible=self.visible.__setitem__,
+        )
+
+    def scroll_to(self, y):
+        self.canvas.canvasy.return_value = y
+        self.vs_frame._scrolled(0.0, 1.0)
+
+    def test_only_rows_near_view_created(self):
+        # Rows within half a view height of the 600 pixel view.
+        self.assertEqual(self.created, list(range(6)))
+        self.canvas.create_window.assert_any_call(
+            428, 450, window=self.vs_frame.cells[3][0], anchor="nw"
+        )
+        self.canvas.config.assert_any_call(scrollregion="0 0 856 4500")
+
+    def test_scroll_creates_rows(self):
+        self.scroll_to(3000)
+        self.scrollbar.set.assert_called_with(0.0, 1.0)
+        self.assertEqual(self.created, list(range(6)) + list(range(10, 18)))
+        # Rows more than two views above are hidden.
+        self.assertEqual(
+            self.hidden, [self.vs_frame.cells[i][0] for i in range(6)]
+        )
+
+    def test_scroll_back_shows_rows(self):
+        self.scroll_to(3000)
+        self.scroll_to(0)
+        self.assertEqual(
+            self.shown, [self.vs_frame.cells[i][0] for i in range(6)]
+        )
+        self.assertEqual(len(self.created), 14)
+
+    def test_visibility(self):
+        cells = self.vs_frame.cells
+        # The first two rows fill the 600 pixel view.
+        self.assertEqual(self.visible, {cells[i][0]: True for i in range(4)})
+        self.scroll_to(900)
+        self.assertFalse(self.visible[cells[0][0]])
+        self.assertFalse(self.visible[cells[3][0]])
+        self.assertTrue(self.visible[cells[4][0]])
+        self.assertTrue(self.visible[cells[7][0]])
+
+    def test_row_resized(self):
+        widget, _ = self.vs_frame.cells[0]
+        widget.winfo_reqheight.return_value = 600
+        configure = widget.bind.call_args[0][1]
+        configure(None)
+        window = self.vs_frame.cells[2][1]
+        self.canvas.coords.assert_any_call(window, 0, 600)
+        self.canvas.config.assert_called_with(scrollregion="0 0 856 4650")
+
+
 class TestWebBrowserCallback(unittest.TestCase):
     @patch("photo_id.match_window.webbrowser.open_new")
     def test_web_browser_callback(self, mock_open_new):
@@ -67,9 +161,72 @@ class TestWebBrowserCallback(unittest.TestCase):
         mock_open_new.assert_called_once_with(url)
 
 
+def catalog_page(text, chunk_size=None):
+    """A streamed catalog page response."""
+    data = text.encode("ascii")
+    response = MagicMock(status_code=200)
+    response.iter_content.side_effect = lambda size: (
+        data[start : start + (chunk_size or size)]
+        for start in range(0, len(data), chunk_size or size)
+    )
+    return response
+
+
+def image_url(asset_id):
+    return (
+        "https://cdn.download.ams.birds.cornell.edu/api/v2/asset/"
+        f"{asset_id}/1200"
+    )
+
+
+class TestScanAssetIds(unittest.TestCase):
+    def test_urls_split_between_chunks(self):
+        page = "<img src='%s'> <img src='%s'>" % (
+            image_url(12),
+            image_url(345),
+        )
+        for chunk_size in (1, 7, 50, 1000):
+            chunks = catalog_page(page, chunk_size).iter_content(0)
+            self.assertEqual(scan_asset_ids(chunks), ["12", "345"])
+
+    def test_stops_at_limit(self):
+        page = " ".join(image_url(n) for n in range(100))
+        response = catalog_page(page, 200)
+        chunks = response.iter_content(0)
+        self.assertEqual(scan_asset_ids(chunks, limit=3), ["0", "1", "2"])
+        # The rest of the page is never read.
+        self.assertGreater(len(list(chunks)), 20)
+
+    def test_other_renditions_ignored(self):
+        page = image_url(1).replace("/1200", "/320") + image_url(2)
+        self.assertEqual(scan_asset_ids([page.encode("ascii")]), ["2"])
+
+
+class TestRenditions(unittest.TestCase):
+    def test_rendition_width(self):
+        self.assertEqual(rendition_width(100), 160)
+        self.assertEqual(rendition_width(420), 480)
+        self.assertEqual(rendition_width(480), 480)
+        self.assertEqual(rendition_width(840), 900)
+        self.assertEqual(rendition_width(5000), 2400)
+
+    def test_asset_url(self):
+        self.assertEqual(
+            asset_url("1234", 420),
+            "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/1234/480",
+        )
+
+    def test_display_scaling(self):
+        widget = MagicMock()
+        widget.winfo_fpixels.return_value = 192.0
+        self.assertEqual(display_scaling(widget), 2.0)
+        widget.winfo_fpixels.return_value = 72.0
+        self.assertEqual(display_scaling(widget), 1.0)
+
+
 class TestSpeciesFrame(unittest.TestCase):
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch("photo_id.match_window.StringVar")
     @patch("photo_id.match_window.Label")
     @patch("photo_id.match_window.Scrollbar")
@@ -88,6 +245,25 @@ class TestSpeciesFrame(unittest.TestCase):
     ):
         self.mock_requests_get = mock_requests_get
         self.mock_image_open = mock_image_open
+        cache_patcher = patch("photo_id.match_window.image_cache.shared_cache")
+        self.mock_cache = cache_patcher.start().return_value
+        self.mock_cache.get.return_value = None
+        self.addCleanup(cache_patcher.stop)
+        catalog_patcher = patch(
+            "photo_id.match_window.catalog_cache.shared_cache",
+            return_value=catalog_cache.CatalogCache(":memory:", ttl=60),
+        )
+        self.catalog = catalog_patcher.start().return_value
+        self.addCleanup(catalog_patcher.stop)
+        # Catalog searches in tests are not rate limited.
+        engine = fetch_engine.FetchEngine(host_rates={})
+        self.addCleanup(engine.close)
+        engine_patcher = patch(
+            "photo_id.match_window.fetch_engine.shared_engine",
+            return_value=engine,
+        )
+        engine_patcher.start()
+        self.addCleanup(engine_patcher.stop)
 
         self.base = MagicMock()
         self.species_number = 0
@@ -120,9 +296,11 @@ class TestSpeciesFrame(unittest.TestCase):
             )
             self.assertEqual(mock_button.call_count, 2)
             self.assertEqual(mock_label.call_count, 4)
+            self.mock_label = mock_label
             mock_update.assert_called_once()
 
     def test_initialization(self):
+        self.mock_label.assert_any_call(self.sf, text="Loading image...")
         self.assertEqual(self.sf.species_code, "comchi1")
         self.assertEqual(self.sf.species_name, "Common Chiffchaff")
         self.assertEqual(self.sf.location, "NO")
@@ -131,13 +309,205 @@ class TestSpeciesFrame(unittest.TestCase):
         self.assertEqual(self.sf.image_width, 300)
 
     @patch("photo_id.match_window.ImageTk.PhotoImage")
-    @patch.object(SpeciesFrame, "get_image")
+    @patch.object(SpeciesFrame, "get_image_data", return_value=b"jpeg")
+    @patch("photo_id.match_window.image_pipeline.decode")
+    def test_update_image(self, mock_decode, mock_get_data, mock_photo_image):
+        self.sf.update_image()
+        mock_get_data.assert_called_once_with("comchi1", "NO", "6", "8", 0)
+        mock_decode.assert_called_once_with(b"jpeg", 300)
+        mock_photo_image.assert_called_once_with(mock_decode.return_value)
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch.object(SpeciesFrame, "get_image_data", return_value=None)
+    @patch("photo_id.match_window.image_pipeline.decode")
+    @patch("photo_id.match_window.Image.open")
     @patch.object(SpeciesFrame, "scale_image_width")
-    def test_update_image(self, mock_scale, mock_get_image, mock_photo_image):
+    def test_update_image_placeholder(
+        self, mock_scale, mock_open, mock_decode, mock_get_data, mock_photo
+    ):
+        self.sf.update_image()
+        mock_decode.assert_not_called()
+        mock_open.assert_called_once_with(PLACEHOLDER_IMAGE)
+        mock_scale.assert_called_once_with(mock_open.return_value)
+        mock_photo.assert_called_once_with(mock_scale.return_value)
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch.object(SpeciesFrame, "load_image", return_value="scaled")
+    def test_update_image_with_loader(self, mock_load_image, mock_photo):
+        self.sf.loader = self.mock_loader()
+        self.sf.image_number = 1
         self.sf.update_image()
-        mock_get_image.assert_called_once_with("comchi1", "NO", "6", "8")
-        mock_photo_image.assert_called_once()
-        mock_scale.assert_called_once()
+        mock_load_image.assert_not_called()
+        work, done, _ = self.sf.loader.submit.call_args[0]
+        self.assertEqual(work(), "scaled")
+        mock_load_image.assert_called_once_with(1)
+
+        # A result for an image the user has moved past is dropped.
+        self.sf.image_number = 2
+        done("scaled")
+        mock_photo.assert_not_called()
+        self.sf.image_number = 1
+        done("scaled")
+        mock_photo.assert_called_once_with("scaled")
+
+    def mock_loader(self):
+        """A loader whose jobs stay queued until run."""
+        loader = MagicMock()
+        loader.submit.return_value.cancelled.return_value = False
+        return loader
+
+    def run_loader(self):
+        """Runs the work submitted to a mock loader, as it would be."""
+        while self.sf.loader.submit.call_args_list:
+            calls = list(self.sf.loader.submit.call_args_list)
+            self.sf.loader.submit.reset_mock()
+            for (work, done, _), _ in calls:
+                done(work())
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch.object(SpeciesFrame, "load_image", side_effect=lambda n: f"img{n}")
+    def test_prefetches_neighbours(self, mock_load_image, mock_photo):
+        self.sf.loader = self.mock_loader()
+        self.sf.cached_image_list = ["url"] * 5
+        self.sf.update_image()
+        self.run_loader()
+        self.assertEqual(
+            sorted(c[0][0] for c in mock_load_image.call_args_list), [0, 1, 4]
+        )
+        self.assertEqual(
+            self.sf.image_buffer, {0: "img0", 1: "img1", 4: "img4"}
+        )
+        mock_photo.assert_called_once_with("img0")
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch.object(SpeciesFrame, "load_image", side_effect=lambda n: f"img{n}")
+    def test_next_image_from_buffer(self, mock_load_image, mock_photo):
+        self.sf.loader = self.mock_loader()
+        self.sf.cached_image_list = ["url"] * 5
+        self.sf.update_image()
+        self.run_loader()
+        mock_load_image.reset_mock()
+
+        self.sf.next_image()
+        # Shown straight away, while the one after is fetched.
+        mock_photo.assert_called_with("img1")
+        mock_load_image.assert_not_called()
+        self.run_loader()
+        mock_load_image.assert_called_once_with(2)
+        # Only the current image and those either side are kept.
+        self.assertEqual(
+            self.sf.image_buffer, {0: "img0", 1: "img1", 2: "img2"}
+        )
+
+    def test_request_image_once(self):
+        self.sf.loader = self.mock_loader()
+        self.sf.request_image(3)
+        self.sf.request_image(3)
+        self.sf.loader.submit.assert_called_once()
+        # Work cancelled when a loader closes is asked for again.
+        self.sf.jobs[3].cancelled.return_value = True
+        self.sf.request_image(3)
+        self.assertEqual(self.sf.loader.submit.call_count, 2)
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch("photo_id.match_window.Image.open")
+    @patch.object(SpeciesFrame, "scale_image_width")
+    @patch.object(SpeciesFrame, "load_image")
+    def test_failed_image_tried_again(
+        self, mock_load_image, mock_scale, mock_open, mock_photo
+    ):
+        self.sf.loader = self.mock_loader()
+        self.sf.request_image(0)
+        failed = self.sf.loader.submit.call_args[1]["failed"]
+        failed(OSError("offline"))
+        self.assertEqual(self.sf.jobs, {})
+        mock_open.assert_called_once_with(PLACEHOLDER_IMAGE)
+        mock_photo.assert_called_once_with(mock_scale.return_value)
+        self.sf.request_image(0)
+        self.assertEqual(self.sf.loader.submit.call_count, 2)
+
+    def test_image_priority(self):
+        self.sf.cached_image_list = ["url"] * 5
+        self.sf.image_number = 1
+        # Off screen, only the current image is wanted soon.
+        self.assertEqual(self.sf.image_priority(1), Priority.FIRST_IMAGE)
+        self.assertEqual(self.sf.image_priority(2), Priority.WARMING)
+        self.assertEqual(self.sf.image_priority(3), Priority.WARMING)
+        self.sf.visible = True
+        self.assertEqual(self.sf.image_priority(1), Priority.VISIBLE)
+        self.assertEqual(self.sf.image_priority(2), Priority.LOOKAHEAD)
+        self.assertEqual(self.sf.image_priority(0), Priority.LOOKAHEAD)
+        self.assertEqual(self.sf.image_priority(3), Priority.WARMING)
+
+    def test_set_visible_reprioritises(self):
+        self.sf.loader = self.mock_loader()
+        self.sf.cached_image_list = ["url"] * 5
+        self.sf.request_image(0)
+        self.sf.loader.submit.assert_called_once_with(
+            unittest.mock.ANY,
+            unittest.mock.ANY,
+            Priority.FIRST_IMAGE,
+            failed=unittest.mock.ANY,
+        )
+        job = self.sf.jobs[0]
+        self.sf.set_visible(True)
+        self.sf.loader.reprioritise.assert_called_once_with(
+            job, Priority.VISIBLE
+        )
+
+    def test_neighbours(self):
+        self.sf.cached_image_list = ["url"] * 2
+        self.assertEqual(self.sf.neighbours(), [1])
+        self.sf.cached_image_list = ["url"]
+        self.assertEqual(self.sf.neighbours(), [])
+
+    @patch("photo_id.match_window.ImageTk.PhotoImage")
+    @patch("photo_id.match_window.Label")
+    @patch("photo_id.match_window.Toplevel")
+    @patch.object(SpeciesFrame, "_download_image", return_value=b"jpeg")
+    @patch("photo_id.match_window.image_pipeline.decode")
+    def test_open_large_view(
+        self,
+        mock_decode,
+        mock_download,
+        mock_toplevel,
+        mock_label,
+        mock_photo,
+    ):
+        self.sf.asset_ids = ["111", "222"]
+        self.sf.image_number = 1
+        self.sf.open_large_view()
+        # 2.5 times the 300 pixel quiz width.
+        mock_download.assert_called_once_with(
+            "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/222/900"
+        )
+        mock_decode.assert_called_once_with(b"jpeg", 750)
+        mock_photo.assert_called_once_with(mock_decode.return_value)
+        mock_label.return_value.configure.assert_called_once_with(
+            image=mock_photo.return_value
+        )
+
+    def test_release_image(self):
+        self.sf.image_buffer[0] = "image"
+        self.sf.release_image()
+        self.assertEqual(self.sf.image_buffer, {})
+        self.sf.image_display.configure.assert_called_with(image="")
+        self.assertIsNone(self.sf.image_display.image)
+
+    def test_release_image_cancels_queued_loads(self):
+        queued = scheduler.Job(MagicMock(), Priority.FIRST_IMAGE, None)
+        running = scheduler.Job(MagicMock(), Priority.LOOKAHEAD, None)
+        running.set_running_or_notify_cancel()
+        self.sf.jobs = {0: queued, 1: running}
+        self.sf.release_image()
+        self.assertTrue(queued.cancelled())
+        # A load already under way is kept, so it is not asked for again.
+        self.assertEqual(self.sf.jobs, {1: running})
+
+    @patch("photo_id.match_window.Toplevel")
+    def test_open_large_view_still_loading(self, mock_toplevel):
+        self.sf.open_large_view()
+        mock_toplevel.assert_not_called()
 
     @patch("photo_id.match_window.Toplevel")
     @patch("photo_id.match_window.Message")
@@ -190,43 +560,96 @@ class TestSpeciesFrame(unittest.TestCase):
         self.assertEqual(self.sf.image_number, 2)
         mock_update_image.assert_called_once()
 
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     def test_get_image_list_not_enough(self, mock_requests_get):
-        mock_response = MagicMock()
-        mock_response.content = (
+        mock_requests_get.side_effect = lambda url, **kwargs: catalog_page(
             "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/1234/1200"
         )
-
-        mock_requests_get.return_value = mock_response
         image_list = self.sf.get_image_list("comchi1", "NO", 6, 8)
-        mock_requests_get.assert_called_with(
-            "https://media.ebird.org/catalog?view=grid&taxonCode=comchi1&"
-            "sort=rating_rank_desc&mediaType=photo&regionCode=NO&beginMonth=6&endMonth=8",
-            timeout=20,
-        )
+        for query in (
+            "&regionCode=NO&beginMonth=6&endMonth=8",
+            "&beginMonth=6&endMonth=8",
+            "",
+        ):
+            mock_requests_get.assert_any_call(
+                "https://media.ebird.org/catalog?view=grid&taxonCode=comchi1&"
+                f"sort=rating_rank_desc&mediaType=photo{query}",
+                timeout=20,
+                stream=True,
+            )
         self.assertEqual(len(image_list), 0)
 
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     def test_get_image_list_enough(self, mock_requests_get):
-        mock_response = MagicMock()
-        mock_response.content = (
+        mock_response = catalog_page(
             "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/1234/1200"
             * 20
         )
         mock_requests_get.return_value = mock_response
+        close = mock_response.close
         image_list = self.sf.get_image_list("comchi1", "NO", 6, 8)
-        mock_requests_get.assert_called_with(
+        mock_requests_get.assert_any_call(
             "https://media.ebird.org/catalog?view=grid&taxonCode=comchi1&"
             "sort=rating_rank_desc&mediaType=photo&regionCode=NO&beginMonth=6&endMonth=8",
             timeout=20,
+            stream=True,
         )
+        close.assert_called()
+        # A 300 pixel wide frame uses the 320 pixel rendition.
         self.assertIn(
-            "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/1234/1200",
+            "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/1234/320",
             image_list,
         )
 
+    @patch("photo_id.fetch_engine.http_client.get")
+    def test_get_image_list_from_catalog_cache(self, mock_requests_get):
+        key = catalog_cache.catalog_key("comchi1", "NO", "6", "8")
+        self.catalog.put(key, ["111", "222", "333"])
+        image_list = self.sf.get_image_list("comchi1", "NO", "6", "8")
+        mock_requests_get.assert_not_called()
+        self.assertEqual(
+            image_list,
+            [
+                "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/"
+                f"{asset_id}/320"
+                for asset_id in ("111", "222", "333")
+            ],
+        )
+        self.assertEqual(self.sf.asset_ids, ["111", "222", "333"])
+
+    def test_get_image_list_high_dpi(self):
+        self.catalog.put(
+            catalog_cache.catalog_key("comchi1", "NO", "6", "8"),
+            ["111", "222", "333"],
+        )
+        self.sf.display_scale = 2.0
+        image_list = self.sf.get_image_list("comchi1", "NO", "6", "8")
+        # 300 pixels shown, from the 640 pixel rendition.
+        self.assertEqual(
+            image_list[0],
+            "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/111/640",
+        )
+        self.assertEqual(self.sf.image_width, 300)
+
+    @patch("photo_id.fetch_engine.http_client.get")
+    def test_get_image_list_caches_search(self, mock_requests_get):
+        mock_requests_get.return_value = catalog_page(
+            "".join(
+                "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/"
+                f"{asset_id}/1200"
+                for asset_id in range(10)
+            )
+        )
+        self.sf.get_image_list("comchi1", "NO", 6, 8)
+        self.assertEqual(
+            self.catalog.get(
+                catalog_cache.catalog_key("comchi1", "NO", 6, 8)
+            ).asset_ids,
+            ["2", "4", "6", "8"],
+        )
+
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch.object(SpeciesFrame, "get_image_list")
     def test_get_image_initial_search(
         self, mock_get_image_list, mock_requests_get, mock_image_open
@@ -237,7 +660,8 @@ class TestSpeciesFrame(unittest.TestCase):
         mock_requests_get.return_value = MagicMock(
             status_code=200, content=b"fake_image_data"
         )
-        mock_image_open.return_value = "fake_image"
+        fake_image = MagicMock()
+        mock_image_open.return_value = fake_image
 
         image = self.sf.get_image("comchi1", "NO", 6, 8)
 
@@ -245,78 +669,235 @@ class TestSpeciesFrame(unittest.TestCase):
         mock_requests_get.assert_called_once_with(
             "http://example.com/image1.jpg", timeout=10
         )
-        mock_image_open.assert_called_once()
-        self.assertEqual(image, "fake_image")
+        # Checked to be an image before it is cached, then opened.
+        fake_image.verify.assert_called_once()
+        self.assertEqual(mock_image_open.call_count, 2)
+        self.assertIs(image, fake_image)
 
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch.object(SpeciesFrame, "get_image_list")
-    def test_get_image_expand_location(
+    def test_get_image_from_disk_cache(
         self, mock_get_image_list, mock_requests_get, mock_image_open
     ):
-        mock_get_image_list.side_effect = [
-            [],
-            ["http://example.com/image2.jpg"] * 20,
-        ]
-        mock_requests_get.return_value = MagicMock(
-            status_code=200, content=b"fake_image_data"
-        )
-        mock_image_open.return_value = "fake_image"
+        mock_get_image_list.return_value = ["http://example.com/a.jpg"] * 20
+        self.mock_cache.get.return_value = b"cached_image_data"
+        mock_image_open.return_value = "cached_image"
 
         image = self.sf.get_image("comchi1", "NO", 6, 8)
 
-        self.assertEqual(mock_get_image_list.call_count, 2)
-        mock_get_image_list.assert_any_call("comchi1", "NO", 6, 8)
-        mock_get_image_list.assert_any_call("comchi1", "", 6, 8)
-        mock_requests_get.assert_called_once_with(
-            "http://example.com/image2.jpg", timeout=10
+        self.mock_cache.get.assert_called_once_with("http://example.com/a.jpg")
+        mock_requests_get.assert_not_called()
+        self.assertEqual(
+            mock_image_open.call_args[0][0].getvalue(), b"cached_image_data"
         )
-        mock_image_open.assert_called_once()
-        self.assertEqual(image, "fake_image")
+        self.assertEqual(image, "cached_image")
 
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch.object(SpeciesFrame, "get_image_list")
-    def test_get_image_expand_time(
+    def test_get_image_stores_download(
         self, mock_get_image_list, mock_requests_get, mock_image_open
     ):
-        mock_get_image_list.side_effect = [
-            [],
-            [],
-            ["http://example.com/image3.jpg"] * 20,
-        ]
-        mock_requests_get.return_value = MagicMock(
-            status_code=200, content=b"fake_image_data"
+        mock_get_image_list.return_value = ["http://example.com/a.jpg"] * 20
+        mock_requests_get.return_value = MagicMock(content=b"image_data")
+
+        self.sf.get_image("comchi1", "NO", 6, 8)
+
+        self.mock_cache.put.assert_called_once_with(
+            "http://example.com/a.jpg", b"image_data"
         )
-        mock_image_open.return_value = "fake_image"
 
-        image = self.sf.get_image("comchi1", "NO", 6, 8)
+    @patch("photo_id.match_window.Image.open")
+    @patch("photo_id.fetch_engine.http_client.get")
+    @patch.object(SpeciesFrame, "get_image_list")
+    def test_get_image_not_an_image(
+        self, mock_get_image_list, mock_requests_get, mock_image_open
+    ):
+        mock_get_image_list.return_value = ["http://example.com/a.jpg"] * 20
+        mock_requests_get.return_value = MagicMock(content=b"<html>")
+        mock_image_open.return_value.verify.side_effect = SyntaxError
 
-        self.assertEqual(mock_get_image_list.call_count, 3)
-        mock_get_image_list.assert_any_call("comchi1", "NO", 6, 8)
-        mock_get_image_list.assert_any_call("comchi1", "", 6, 8)
-        mock_get_image_list.assert_any_call("comchi1", "", 1, 12)
-        mock_requests_get.assert_called_once_with(
-            "http://example.com/image3.jpg", timeout=10
+        with self.assertLogs(level="WARNING"):
+            image = self.sf.get_image("comchi1", "NO", 6, 8)
+
+        self.mock_cache.put.assert_not_called()
+        mock_image_open.assert_called_with(PLACEHOLDER_IMAGE)
+        self.assertIs(image, mock_image_open.return_value)
+
+    def resolve_with(self, found):
+        """Resolves with search_catalog finding found[(region, months)]."""
+
+        def search_catalog(
+            species_code, region, begin_month, end_month, group=None
+        ):
+            return found.get((region, begin_month, end_month), [])
+
+        with patch.object(
+            self.sf, "search_catalog", side_effect=search_catalog
+        ) as mock_search:
+            asset_ids = self.sf.resolve_asset_ids("comchi1", "NO", 6, 8)
+        return asset_ids, mock_search
+
+    def test_resolve_runs_queued_wider_search_now(self):
+        # No workers, so the wider searches stay queued.
+        work_scheduler = scheduler.Scheduler(workers=0)
+        self.sf.loader = MagicMock(scheduler=work_scheduler)
+        queued = []
+        groups = []
+
+        def search_catalog(
+            species_code, region, begin_month, end_month, group
+        ):
+            queued.append(work_scheduler.pending())
+            groups.append(group)
+            return ["1", "2", "3"] if not region else []
+
+        with patch.object(
+            self.sf, "search_catalog", side_effect=search_catalog
+        ) as mock_search:
+            asset_ids = self.sf.resolve_asset_ids("comchi1", "NO", 6, 8)
+        self.assertEqual(asset_ids, ["1", "2", "3"])
+        # Both wider searches were queued while the first was made, then
+        # the one needed was made straight away and the other cancelled.
+        self.assertEqual(queued, [2, 1])
+        self.assertEqual(
+            [c.args[1:] for c in mock_search.call_args_list],
+            [("NO", 6, 8), ("", 6, 8)],
+        )
+        self.assertEqual(work_scheduler.pending(), 0)
+        with self.assertRaises(concurrent.futures.CancelledError):
+            groups[0].get("https://media.ebird.org/catalog")
+
+    def test_resolve_waits_for_running_wider_search(self):
+        self.sf.loader = MagicMock(scheduler=scheduler.Scheduler(workers=1))
+        wider_searched = threading.Event()
+        regions = []
+
+        def search_catalog(
+            species_code, region, begin_month, end_month, group
+        ):
+            regions.append((region, begin_month, end_month))
+            if region:
+                # Comes back short after the wider search has been made.
+                self.assertTrue(wider_searched.wait(5))
+                return []
+            if begin_month == 6:
+                wider_searched.set()
+                return ["4", "5", "6"]
+            return []
+
+        with patch.object(
+            self.sf, "search_catalog", side_effect=search_catalog
+        ):
+            asset_ids = self.sf.resolve_asset_ids("comchi1", "NO", 6, 8)
+        self.assertEqual(asset_ids, ["4", "5", "6"])
+        # The speculative result is used, not searched for again.
+        self.assertEqual(regions.count(("", 6, 8)), 1)
+        self.assertEqual(
+            self.catalog.get(
+                catalog_cache.catalog_key("comchi1", "", 6, 8)
+            ).asset_ids,
+            ["4", "5", "6"],
+        )
+
+    def test_resolve_no_speculation_when_cached(self):
+        self.catalog.put(
+            catalog_cache.catalog_key("comchi1", "NO", 6, 8), ["1", "2", "3"]
+        )
+        work_scheduler = scheduler.Scheduler(workers=0)
+        self.sf.loader = MagicMock(scheduler=work_scheduler)
+        asset_ids, mock_search = self.resolve_with({})
+        self.assertEqual(asset_ids, ["1", "2", "3"])
+        mock_search.assert_not_called()
+        self.assertEqual(work_scheduler.pending(), 0)
+
+    def test_resolve_prefers_most_specific(self):
+        asset_ids, mock_search = self.resolve_with(
+            {
+                ("NO", 6, 8): ["1", "2", "3"],
+                ("", 6, 8): ["4", "5", "6"],
+                ("", 1, 12): ["7", "8", "9"],
+            }
+        )
+        self.assertEqual(asset_ids, ["1", "2", "3"])
+        self.assertEqual(mock_search.call_count, 1)
+
+    def test_resolve_any_time(self):
+        asset_ids, mock_search = self.resolve_with(
+            {("", 1, 12): ["7", "8", "9"]}
+        )
+        self.assertEqual(asset_ids, ["7", "8", "9"])
+        self.assertEqual(mock_search.call_count, 3)
+
+    def test_resolve_failed_search(self):
+        def search_catalog(
+            species_code, region, begin_month, end_month, group=None
+        ):
+            if region:
+                raise retry.CircuitOpenError("media.ebird.org is failing")
+            return ["4", "5", "6"]
+
+        with patch.object(
+            self.sf, "search_catalog", side_effect=search_catalog
+        ), self.assertLogs(level="WARNING"):
+            asset_ids = self.sf.resolve_asset_ids("comchi1", "NO", 6, 8)
+        self.assertEqual(asset_ids, ["4", "5", "6"])
+        # A failed search is not cached as finding nothing.
+        self.assertIsNone(
+            self.catalog.get(catalog_cache.catalog_key("comchi1", "NO", 6, 8))
+        )
+
+    @patch("photo_id.match_window.retry.get")
+    def test_fetch_images_retries(self, mock_retry_get):
+        result = self.sf._fetch_images("https://media.ebird.org/catalog")
+        self.assertIs(result, mock_retry_get.return_value)
+        url, fetch, policy = mock_retry_get.call_args[0]
+        self.assertEqual(url, "https://media.ebird.org/catalog")
+        self.assertEqual(policy.attempts, 5)
+
+    def test_resolve_nothing_found(self):
+        asset_ids, mock_search = self.resolve_with({})
+        self.assertEqual(asset_ids, [])
+        self.assertEqual(mock_search.call_count, 3)
+
+    def test_resolve_from_cache(self):
+        self.catalog.put(
+            catalog_cache.catalog_key("comchi1", "NO", 6, 8), ["1", "2", "3"]
+        )
+        asset_ids, mock_search = self.resolve_with({})
+        self.assertEqual(asset_ids, ["1", "2", "3"])
+        mock_search.assert_not_called()
+
+    def test_resolve_skips_wider_than_cached(self):
+        self.catalog.put(
+            catalog_cache.catalog_key("comchi1", "", 6, 8), ["4", "5", "6"]
+        )
+        asset_ids, mock_search = self.resolve_with({})
+        self.assertEqual(asset_ids, ["4", "5", "6"])
+        # Only the more specific search that is not cached is made.
+        mock_search.assert_called_once_with(
+            "comchi1", "NO", 6, 8, group=unittest.mock.ANY
+        )
+
+    def test_fallback_searches_deduplicated(self):
+        self.assertEqual(
+            fallback_searches("comchi1", "", "1", "12"),
+            [catalog_cache.CatalogKey("comchi1", "", 1, 12)],
         )
-        mock_image_open.assert_called_once()
-        self.assertEqual(image, "fake_image")
 
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch.object(SpeciesFrame, "get_image_list")
     def test_get_image_no_images(
         self, mock_get_image_list, mock_requests_get, mock_image_open
     ):
-        mock_get_image_list.side_effect = [[], [], []]
+        mock_get_image_list.return_value = []
         mock_image_open.return_value = "default_image"
 
         image = self.sf.get_image("comchi1", "NO", 6, 8)
 
-        self.assertEqual(mock_get_image_list.call_count, 3)
-        mock_get_image_list.assert_any_call("comchi1", "NO", 6, 8)
-        mock_get_image_list.assert_any_call("comchi1", "", 6, 8)
-        mock_get_image_list.assert_any_call("comchi1", "", 1, 12)
+        mock_get_image_list.assert_called_once_with("comchi1", "NO", 6, 8)
         mock_requests_get.assert_not_called()
         mock_image_open.assert_called_once_with(
             "photo_id/resources/Banner__Under_Construction__version_2.jpg"
@@ -324,7 +905,7 @@ class TestSpeciesFrame(unittest.TestCase):
         self.assertEqual(image, "default_image")
 
     @patch("photo_id.match_window.Image.open")
-    @patch("photo_id.match_window.requests.get")
+    @patch("photo_id.fetch_engine.http_client.get")
     @patch.object(SpeciesFrame, "get_image_list")
     def test_get_image_request_failure(
         self, mock_get_image_list, mock_requests_get, mock_image_open
@@ -363,6 +944,8 @@ class TestMatchWindow(unittest.TestCase):
         self.mock_species_frame = mock_species_frame
         self.mock_vsframe = mock_vsframe
         self.mock_process_quiz = mock_process_quiz
+        mock_toplevel.return_value.winfo_screenwidth.return_value = 1920
+        mock_toplevel.return_value.winfo_fpixels.return_value = 96.0
 
         self.file = "test_file"
         self.taxonomy = {"species": "test_species"}
@@ -370,7 +953,8 @@ class TestMatchWindow(unittest.TestCase):
 
         self.quiz_data = {
             "species": [
-                {"speciesCode": "comchi1", "comName": "Common Chiffchaff"}
+                {"speciesCode": "comchi1", "comName": "Common Chiffchaff"},
+                {"speciesCode": "wlwarb", "comName": "Willow Warbler"},
             ],
             "notes": "Test notes",
             "location": "NO",
@@ -383,36 +967,86 @@ class TestMatchWindow(unittest.TestCase):
             self.file, self.taxonomy, self.have_list
         )
 
+    @patch("photo_id.match_window.messagebox.showinfo")
+    @patch("photo_id.match_window.process_quiz.process_quiz_file")
+    @patch("photo_id.match_window.VerticalScrolledFrame")
+    @patch("photo_id.match_window.Toplevel")
+    def test_corrections_shown(
+        self, mock_toplevel, _mock_vsframe, mock_process_quiz, mock_showinfo
+    ):
+        mock_toplevel.return_value.winfo_screenwidth.return_value = 1920
+        mock_toplevel.return_value.winfo_fpixels.return_value = 96.0
+
+        def process_quiz_file(file, taxonomy, corrections):
+            corrections.append(
+                {
+                    "name": "Chiffchaff",
+                    "comName": "Common Chiffchaff",
+                    "score": 0.9,
+                }
+            )
+            return self.quiz_data
+
+        mock_process_quiz.side_effect = process_quiz_file
+        MatchWindow(self.file, self.taxonomy, self.have_list)
+        mock_showinfo.assert_called_once_with(
+            title="Species names corrected",
+            message="Chiffchaff -> Common Chiffchaff (90%)",
+            parent=mock_toplevel.return_value,
+        )
+
     def test_initialization(self):
         self.mock_toplevel.assert_called_once()
         self.mock_vsframe.assert_called_once_with(self.match_window.root)
-        self.mock_species_frame.assert_called_once_with(
-            self.mock_vsframe.return_value.interior,
-            0,
+        # Species frames are left for the scrolled frame to create.
+        self.mock_species_frame.assert_not_called()
+
+    def test_virtualized(self):
+        virtualize = self.mock_vsframe.return_value.virtualize
+        virtualize.assert_called_once_with(
+            2,
+            4,
+            428,
+            unittest.mock.ANY,
+            on_hide=self.mock_species_frame.release_image,
+            on_show=self.mock_species_frame.update_image,
+            on_visible=self.mock_species_frame.set_visible,
+        )
+        create = virtualize.call_args[0][3]
+        with patch("photo_id.match_window.SpeciesFrame") as species_frame:
+            self.assertIs(create(1), species_frame.return_value)
+        species_frame.assert_called_once_with(
+            self.mock_vsframe.return_value.canvas,
+            1,
             self.quiz_data["species"],
             self.quiz_data["location"],
             self.quiz_data["start_month"],
             self.quiz_data["end_month"],
             420,
+            loader=self.match_window.loader,
+            display_scale=1.0,
         )
 
-    def test_image_display(self):
-        columns = 1
-        rows = int(len(self.quiz_data["species"]) / columns) + 1
-
-        self.assertEqual(len(self.match_window.image_display), rows + 1)
-        for row in range(1, rows + 1):
-            for column in range(columns):
-                if (row - 1) * columns + column >= len(
-                    self.quiz_data["species"]
-                ):
-                    break
-                self.mock_species_frame.assert_any_call(
-                    self.mock_vsframe.return_value.interior,
-                    (row - 1) * columns + column,
-                    self.quiz_data["species"],
-                    self.quiz_data["location"],
-                    self.quiz_data["start_month"],
-                    self.quiz_data["end_month"],
-                    420,
-                )
+    @patch("photo_id.match_window.process_quiz.process_quiz_file")
+    @patch("photo_id.match_window.VerticalScrolledFrame")
+    @patch("photo_id.match_window.SpeciesFrame")
+    @patch("photo_id.match_window.Toplevel")
+    def test_high_dpi(
+        self, mock_toplevel, mock_species_frame, mock_vsframe, mock_process
+    ):
+        mock_process.return_value = self.quiz_data
+        mock_toplevel.return_value.winfo_screenwidth.return_value = 2880
+        mock_toplevel.return_value.winfo_fpixels.return_value = 144.0
+        MatchWindow(self.file, self.taxonomy, self.have_list)
+        virtualize = mock_vsframe.return_value.virtualize
+        # The layout is the same as at 96 DPI.
+        self.assertEqual(virtualize.call_args[0][1:3], (6, 428))
+        virtualize.call_args[0][3](0)
+        self.assertEqual(mock_species_frame.call_args[0][6], 420)
+        self.assertEqual(mock_species_frame.call_args[1]["display_scale"], 1.5)
+
+    def test_close(self):
+        self.match_window.loader = MagicMock()
+        self.match_window.close()
+        self.match_window.loader.close.assert_called_once()
+        self.mock_toplevel.return_value.destroy.assert_called_once()
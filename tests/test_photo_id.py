@@ -1,3 +1,4 @@
+import concurrent.futures
 import logging
 import unittest
 from unittest.mock import patch, MagicMock
@@ -52,20 +53,34 @@ class MockMenu(MagicMock):
         pass  # do nothing
 
 
+class TaxonomyCacheStub(list):
+    """An empty taxonomy cache that records being closed."""
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
 class TestMainWindow(unittest.TestCase):
-    @patch("photo_id.photo_id.get_taxonomy.ebird_taxonomy", return_value=[])
+    @patch("photo_id.photo_id.get_taxonomy.ebird_taxonomy")
     @patch("photo_id.photo_id.get_have_list.get_have_list", return_value=[])
     @patch("photo_id.photo_id.Tk", spec=MockTK)
     @patch("photo_id.photo_id.Menu", spec=MockMenu)
     def setUp(self, mock_menu, mock_tk, mock_get_have_list, mock_get_taxonomy):
+        mock_get_taxonomy.return_value = TaxonomyCacheStub()
         self.main_window = MainWindow("test_have_list.csv")
+        # Let the background loads finish while the mocks are in place.
+        self.main_window.taxonomy_future.result()
+        self.main_window.have_list_future.result()
+        self.assertTrue(mock_get_taxonomy.return_value.closed)
 
     def tearDown(self):
         self.main_window.root.destroy()
 
     def test_initialization(self):
         self.assertEqual(self.main_window.have_list, [])
-        self.assertEqual(self.main_window.taxonomy, [])
+        self.assertEqual(list(self.main_window.taxonomy), [])
 
     @patch(
         "photo_id.photo_id.filedialog.askopenfilename",
@@ -74,16 +89,32 @@ class TestMainWindow(unittest.TestCase):
     @patch("photo_id.photo_id.match_window.MatchWindow")
     def test_match_open(self, mock_match_window, mock_askopenfilename):
         self.main_window.match_open()
-        mock_match_window.assert_called_once_with("test_quiz.json", [], [])
+        mock_match_window.assert_called_once_with(
+            "test_quiz.json", self.main_window.taxonomy, []
+        )
 
     @patch(
         "photo_id.photo_id.filedialog.askopenfilename",
         return_value="test_quiz.json",
     )
-    @patch("photo_id.photo_id.process_quiz.sort_quiz")
+    @patch("photo_id.photo_id.process_quiz.sort_quiz", return_value=[])
     def test_sort_quiz(self, mock_sort_quiz, mock_askopenfilename):
         self.main_window.sort_quiz()
-        mock_sort_quiz.assert_called_once_with("test_quiz.json", [])
+        mock_sort_quiz.assert_called_once_with(
+            "test_quiz.json", self.main_window.taxonomy
+        )
+
+    @patch("photo_id.photo_id.messagebox.showinfo")
+    def test_report_corrections(self, mock_showinfo):
+        self.main_window.report_corrections([])
+        mock_showinfo.assert_not_called()
+        self.main_window.report_corrections(
+            [{"name": "Grey Heron", "comName": "Gray Heron", "score": 1.0}]
+        )
+        mock_showinfo.assert_called_once_with(
+            title="Species names corrected",
+            message="Grey Heron -> Gray Heron (100%)",
+        )
 
     @patch(
         "photo_id.photo_id.filedialog.askopenfilename",
@@ -127,12 +158,156 @@ class TestMainWindow(unittest.TestCase):
         "photo_id.photo_id.filedialog.askopenfilename",
         return_value="test_quiz.json",
     )
+    @patch("photo_id.photo_id.messagebox.showinfo")
     @patch("photo_id.photo_id.process_quiz.split_quiz")
     def test_break_quiz_into_parts(
-        self, mock_split_quiz, mock_askopenfilename
+        self, mock_split_quiz, mock_showinfo, mock_askopenfilename
     ):
+        mock_split_quiz.return_value = [
+            {"name": "Grey Heron", "comName": "Gray Heron", "score": 0.9}
+        ]
         self.main_window.break_quiz_into_parts()
-        mock_split_quiz.assert_called_once_with("test_quiz.json", 25, [])
+        mock_split_quiz.assert_called_once_with(
+            "test_quiz.json", 25, self.main_window.taxonomy
+        )
+        mock_showinfo.assert_called_once_with(
+            title="Species names corrected",
+            message="Grey Heron -> Gray Heron (90%)",
+        )
+
+    @patch("photo_id.photo_id.messagebox.showinfo")
+    @patch(
+        "photo_id.photo_id.get_taxonomy.cached_versions",
+        return_value={"2023": ".cache/taxonomy.bin"},
+    )
+    def test_migrate_quizzes_no_earlier_version(
+        self, _mock_versions, mock_showinfo
+    ):
+        self.main_window.migrate_quizzes()
+        mock_showinfo.assert_called_once()
+
+    @patch("photo_id.photo_id.filedialog.askdirectory", return_value="quizzes")
+    @patch("photo_id.photo_id.simpledialog.askstring", return_value="2023")
+    @patch(
+        "photo_id.photo_id.get_taxonomy.cached_versions",
+        return_value={
+            "2023": ".cache/versions/taxonomy-2023.bin",
+            "2024": ".cache/taxonomy.bin",
+        },
+    )
+    @patch("photo_id.photo_id.messagebox.showinfo")
+    @patch(
+        "photo_id.photo_id.taxonomy_migration.migrate_directory",
+        return_value=["quizzes/a.json"],
+    )
+    @patch("photo_id.photo_id.taxonomy_migration.diff_taxonomies")
+    @patch("photo_id.photo_id.taxonomy_cache.open_cache")
+    def test_migrate_quizzes(
+        self,
+        mock_open_cache,
+        mock_diff,
+        mock_migrate_directory,
+        mock_showinfo,
+        *_mocks,
+    ):
+        self.main_window.migrate_quizzes()
+        mock_open_cache.assert_called_once_with(
+            ".cache/versions/taxonomy-2023.bin"
+        )
+        mock_diff.assert_called_once_with(
+            mock_open_cache.return_value, self.main_window.taxonomy
+        )
+        mock_open_cache.return_value.close.assert_called_once()
+        mock_migrate_directory.assert_called_once_with(
+            "quizzes", mock_diff.return_value
+        )
+        self.assertIn("1 quiz", mock_showinfo.call_args.kwargs["message"])
+
+    @patch("photo_id.photo_id.ttk.Progressbar")
+    @patch("photo_id.photo_id.Label")
+    @patch("photo_id.photo_id.Toplevel")
+    def test_when_loaded_waits(self, mock_toplevel, _mock_label, _mock_bar):
+        future = concurrent.futures.Future()
+        action = MagicMock()
+        self.main_window.root.after = MagicMock()
+        self.main_window.when_loaded([future], action)
+        action.assert_not_called()
+        mock_toplevel.assert_called_once_with(self.main_window.root)
+
+        poll = self.main_window.root.after.call_args[0][1]
+        poll()
+        action.assert_not_called()
+        self.assertEqual(self.main_window.root.after.call_count, 2)
+
+        future.set_result([])
+        poll()
+        action.assert_called_once()
+        mock_toplevel.return_value.destroy.assert_called_once()
+
+    @patch("photo_id.photo_id.Toplevel")
+    def test_when_loaded_ready(self, mock_toplevel):
+        future = concurrent.futures.Future()
+        future.set_result([])
+        action = MagicMock()
+        self.main_window.when_loaded([future], action)
+        action.assert_called_once()
+        mock_toplevel.assert_not_called()
+
+    @patch("photo_id.photo_id.messagebox.showerror")
+    @patch("photo_id.photo_id.get_taxonomy.ebird_taxonomy")
+    def test_when_loaded_failed(self, mock_get_taxonomy, mock_showerror):
+        future = concurrent.futures.Future()
+        future.set_exception(OSError("Network is unreachable"))
+        self.main_window.taxonomy_future = future
+        # The mocked main loop has returned and shut the loader down.
+        self.main_window.loader = concurrent.futures.ThreadPoolExecutor(1)
+        action = MagicMock()
+        self.main_window.when_loaded([future], action)
+        action.assert_not_called()
+        self.assertIn(
+            "Network is unreachable",
+            mock_showerror.call_args.kwargs["message"],
+        )
+
+        # The load is started again, so trying once more works.
+        mock_get_taxonomy.return_value = TaxonomyCacheStub()
+        self.assertIsNot(self.main_window.taxonomy_future, future)
+        self.main_window.taxonomy_future.result()
+        self.main_window.when_loaded(
+            [self.main_window.taxonomy_future], action
+        )
+        action.assert_called_once()
+
+    @patch("photo_id.photo_id.messagebox.showerror")
+    @patch(
+        "photo_id.photo_id.get_have_list.get_have_list",
+        return_value=["gadwal"],
+    )
+    def test_failed_have_list_reloaded(self, mock_get_have_list, _showerror):
+        future = concurrent.futures.Future()
+        future.set_exception(ValueError("Bad CSV"))
+        self.main_window.have_list_future = future
+        self.main_window.loader = concurrent.futures.ThreadPoolExecutor(1)
+        self.main_window.when_loaded([future], MagicMock())
+        self.assertEqual(self.main_window.have_list, ["gadwal"])
+        mock_get_have_list.assert_called_once_with("test_have_list.csv")
+
+    @patch("photo_id.photo_id.get_taxonomy.ebird_taxonomy")
+    def test_load_taxonomy_keeps_every_field(self, mock_get_taxonomy):
+        entry = {
+            "comName": "Gadwall",
+            "sciName": "Mareca strepera",
+            "speciesCode": "gadwal",
+            "category": "species",
+            "taxonOrder": 278.0,
+            "bandingCodes": ["GADW"],
+            "comNameCodes": ["GADW"],
+            "order": "Anseriformes",
+        }
+        mock_get_taxonomy.return_value = TaxonomyCacheStub([entry])
+        taxonomy = MainWindow.load_taxonomy()
+        self.assertEqual(list(taxonomy), [entry])
+        self.assertEqual(taxonomy.by_code("GADW"), entry)
 
     @patch("photo_id.photo_id.messagebox.showinfo")
     def test_donothing(self, mock_showinfo):
@@ -200,3 +375,38 @@ class TestMainFunction(unittest.TestCase):
         # Assertions
         mock_arg_parser.return_value.parse_args.assert_called_once()
         mock_main_window.assert_called_once_with("test_have_list.csv")
+
+    @patch("photo_id.photo_id.batch.run", return_value=0)
+    @patch("photo_id.photo_id.MainWindow")
+    @patch("sys.argv", ["photo-id", "batch", "sort", "quiz.json"])
+    def test_main_batch(self, mock_main_window, mock_run):
+        from photo_id.photo_id import main
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 0)
+        self.assertEqual(mock_run.call_args[0][0].files, ["quiz.json"])
+        mock_main_window.assert_not_called()
+
+    @patch("photo_id.photo_id.importlib.metadata.version")
+    @patch("photo_id.photo_id.MainWindow")
+    @patch("sys.argv", ["photo-id", "--version"])
+    def test_main_version(self, mock_main_window, mock_version):
+        from photo_id.photo_id import main
+
+        mock_version.return_value = "1.2.3"
+        with patch("sys.stdout") as stdout, self.assertRaises(SystemExit):
+            main()
+        mock_version.assert_called_once_with("photo-id")
+        self.assertIn("photo-id 1.2.3", str(stdout.write.call_args_list))
+        mock_main_window.assert_not_called()
+
+    @patch("photo_id.photo_id.importlib.metadata.version")
+    @patch("photo_id.photo_id.batch.run", return_value=0)
+    @patch("sys.argv", ["photo-id", "batch", "sort", "quiz.json"])
+    def test_main_batch_skips_version(self, mock_run, mock_version):
+        from photo_id.photo_id import main
+
+        with self.assertRaises(SystemExit):
+            main()
+        mock_version.assert_not_called()
@@ -4,12 +4,15 @@ Tests  photo_id/process_quiz.py
 
 import json
 import os
+import tempfile
 import unittest
 from unittest import TestCase, mock
 
 import photo_id.get_taxonomy
 import photo_id.process_quiz
+from photo_id import build_manifest
 from photo_id.process_quiz import build_quiz_from_target_species, sort_quiz
+from photo_id.taxonomy_index import TaxonomyIndex
 
 
 class TestSortedSpecies(unittest.TestCase):
@@ -91,6 +94,45 @@ class TestSortedSpecies(unittest.TestCase):
         )
         self.assertEqual(expected, result)
 
+    def test_sorted_species_auto_corrects_names(self):
+        """Test near misses are corrected and reported."""
+        initial_list = [
+            {"comName": "Eurasian Bulfinch", "notes": "Noisy"},
+            {"comName": "Reed-Bunting"},
+            {"comName": "Fringilla montifringilla"},
+        ]
+        taxonomy = self.taxonomy + [
+            {
+                "comName": "Gray Heron",
+                "sciName": "Fringilla montifringilla",
+                "taxonOrder": 6,
+            }
+        ]
+        corrections = []
+        result = photo_id.process_quiz.sorted_species(
+            initial_list, taxonomy, corrections=corrections
+        )
+        self.assertEqual(
+            [species["comName"] for species in result],
+            ["Eurasian Bullfinch", "Reed Bunting", "Gray Heron"],
+        )
+        self.assertEqual(result[0]["notes"], "Noisy")
+        self.assertEqual(
+            [(c["name"], c["comName"]) for c in corrections],
+            [
+                ("Eurasian Bulfinch", "Eurasian Bullfinch"),
+                ("Reed-Bunting", "Reed Bunting"),
+                ("Fringilla montifringilla", "Gray Heron"),
+            ],
+        )
+
+    def test_sorted_species_threshold(self):
+        """Test names below the threshold are not corrected."""
+        result = photo_id.process_quiz.sorted_species(
+            [{"comName": "Eurasian Bulfinch"}], self.taxonomy, threshold=1.0
+        )
+        self.assertEqual(result, [])
+
     def test_sorted_species_empty_list(self):
         """Test if an empty list is handled correctly."""
         initial_list = []
@@ -152,6 +194,108 @@ class TestProcessQuizFile(unittest.TestCase):
             self.assertEqual(mock_logging.call_count, 2)
 
 
+class TestCorrections(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.quiz = os.path.join(self.directory.name, "quiz.json")
+        with open(self.quiz, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "location": "NO",
+                    "start_month": 5,
+                    "end_month": 6,
+                    "species": [{"comName": "Eurasian Bulfinch"}],
+                },
+                f,
+            )
+        self.taxonomy = [{"comName": "Eurasian Bullfinch", "taxonOrder": 1}]
+
+    def test_process_quiz_file_corrections(self):
+        corrections = []
+        result = photo_id.process_quiz.process_quiz_file(
+            self.quiz, self.taxonomy, corrections=corrections
+        )
+        self.assertEqual(result["species"][0]["comName"], "Eurasian Bullfinch")
+        self.assertEqual(
+            [(c["name"], c["comName"]) for c in corrections],
+            [("Eurasian Bulfinch", "Eurasian Bullfinch")],
+        )
+
+    def test_split_quiz_returns_corrections(self):
+        corrections = photo_id.process_quiz.split_quiz(
+            self.quiz, 10, self.taxonomy
+        )
+        self.assertEqual(
+            [(c["name"], c["comName"]) for c in corrections],
+            [("Eurasian Bulfinch", "Eurasian Bullfinch")],
+        )
+        part = os.path.join(self.directory.name, "quiz_Part1.json")
+        with open(part, encoding="utf-8") as f:
+            self.assertNotIn("corrections", json.load(f))
+
+    def test_describe_corrections(self):
+        self.assertEqual(
+            photo_id.process_quiz.describe_corrections(
+                [
+                    {
+                        "name": "Grey Heron",
+                        "comName": "Gray Heron",
+                        "score": 1,
+                    },
+                    {"name": "Bulfinch", "comName": "Bullfinch", "score": 0.9},
+                ]
+            ),
+            "Grey Heron -> Gray Heron (100%)\nBulfinch -> Bullfinch (90%)",
+        )
+
+
+class TestProcessQuizFileLocale(unittest.TestCase):
+    @mock.patch("photo_id.process_quiz.get_taxonomy.load_locale")
+    def test_process_quiz_file_locale(self, mock_load_locale):
+        """Test quizzes in another locale resolve to the English entries."""
+        test_json = {
+            "start_month": 5,
+            "end_month": 6,
+            "location": "NO",
+            "locale": "no",
+            "species": [{"comName": "Bokfink"}],
+        }
+        taxonomy = TaxonomyIndex(
+            [
+                {
+                    "comName": "Common Chaffinch",
+                    "speciesCode": "comcha",
+                    "taxonOrder": 2,
+                }
+            ]
+        )
+
+        def load_locale(index, locale):
+            index.add_locale(
+                locale, [{"speciesCode": "comcha", "comName": "Bokfink"}]
+            )
+
+        mock_load_locale.side_effect = load_locale
+        with mock.patch(
+            "builtins.open", mock.mock_open(read_data=json.dumps(test_json))
+        ):
+            result = photo_id.process_quiz.process_quiz_file(
+                "quiz.json", taxonomy
+            )
+        mock_load_locale.assert_called_once_with(taxonomy, "no")
+        self.assertEqual(
+            result["species"],
+            [
+                {
+                    "comName": "Common Chaffinch",
+                    "speciesCode": "comcha",
+                    "taxonOrder": 2,
+                }
+            ],
+        )
+
+
 class TestSortQuiz(unittest.TestCase):
     @mock.patch("builtins.open", new_callable=mock.mock_open)
     @mock.patch("json.load")
@@ -194,13 +338,14 @@ class TestBuildQuizFromTargetSpecies(TestCase):
         new_callable=mock.mock_open,
         read_data="1.\nSpecies A\n10.\n2.\nSpecies B\n5.\n",
     )
-    @mock.patch("json.dump")
     @mock.patch("os.path.exists", return_value=True)
-    def test_with_valid_input(self, _mock_exists, _mock_json_dump, mock_open):
+    def test_with_valid_input(self, _mock_exists, mock_open):
         build_quiz_from_target_species(
             "input.txt", 3, "output.json", 5, 6, "LC"
         )
-        mock_open.assert_called_with("output.json", "wt", encoding="utf-8")
+        mock_open.assert_called_with(
+            "output.json", encoding="utf-8", mode="wt"
+        )
         expected_result = {
             "start_month": 5,
             "end_month": 6,
@@ -215,11 +360,8 @@ class TestBuildQuizFromTargetSpecies(TestCase):
         )
 
     @mock.patch("builtins.open", new_callable=mock.mock_open, read_data="")
-    @mock.patch("json.dump")
     @mock.patch("os.path.exists", return_value=True)
-    def test_with_empty_input_file(
-        self, _mock_exists, _mock_json_dump, mock_open
-    ):
+    def test_with_empty_input_file(self, _mock_exists, mock_open):
         build_quiz_from_target_species(
             "input.txt", 3, "output.json", 5, 6, "LC"
         )
@@ -241,6 +383,11 @@ class TestBuildQuizFromTargetSpecies(TestCase):
             )
 
 
+def write_json(data, file, **_options):
+    """Stands in for json.dump, writing some text to the file."""
+    file.write("{}")
+
+
 class TestSplitQuiz(unittest.TestCase):
     @mock.patch("json.dump")
     @mock.patch("builtins.open", new_callable=mock.mock_open)
@@ -267,18 +414,20 @@ class TestSplitQuiz(unittest.TestCase):
         mock_process_quiz_file.return_value = quiz_data
         mock_sorted_species.return_value = quiz_data["species"]
 
+        mock_json_dump.side_effect = write_json
+
         # Execute
         photo_id.process_quiz.split_quiz("input_file.json", 10, taxonomy)
 
         # Assert
         mock_process_quiz_file.assert_called_once_with(
-            name="input_file.json", taxonomy=taxonomy
+            name="input_file.json", taxonomy=taxonomy, corrections=[]
         )
         self.assertEqual(
             mock_open.mock_calls[0][1][0].lower(),
             f"{os.getcwd()}/input_file_Part1.json".lower(),
         )
-        mock_open.assert_called_with(mock.ANY, "wt", encoding="utf-8")
+        mock_open.assert_called_with(mock.ANY, encoding="utf-8", mode="wt")
         mock_json_dump.assert_called_with(quiz_data, mock.ANY, indent=2)
 
     @mock.patch("json.dump")
@@ -308,15 +457,17 @@ class TestSplitQuiz(unittest.TestCase):
         }
         mock_process_quiz_file.return_value = quiz_data
         mock_sorted_species.return_value = quiz_data["species"]
+        mock_json_dump.side_effect = write_json
 
         # Execute
         photo_id.process_quiz.split_quiz("input_file.json", 1, taxonomy)
 
         # Assert
         mock_process_quiz_file.assert_called_once_with(
-            name="input_file.json", taxonomy=taxonomy
+            name="input_file.json", taxonomy=taxonomy, corrections=[]
         )
-        self.assertEqual(mock_open.call_count, 2)
+        # Each part is read, to compare, and then written.
+        self.assertEqual(mock_open.call_count, 4)
         self.assertEqual(mock_json_dump.call_count, 2)
 
     @mock.patch("json.dump")
@@ -349,7 +500,7 @@ class TestSplitQuiz(unittest.TestCase):
 
         # Assert
         mock_process_quiz_file.assert_called_once_with(
-            name="input_file.json", taxonomy=taxonomy
+            name="input_file.json", taxonomy=taxonomy, corrections=[]
         )
         mock_open.assert_not_called()
 
@@ -390,18 +541,47 @@ class TestSplitQuiz(unittest.TestCase):
         photo_id.process_quiz.split_quiz("input_file.json", 1, taxonomy)
 
         # Assert
-        self.assertEqual(
-            mock_open.mock_calls[0][1][0].lower(),
-            f"{os.getcwd()}/input_file_Part1.json".lower(),
+        names = list(
+            dict.fromkeys(c[0][0].lower() for c in mock_open.call_args_list)
         )
         self.assertEqual(
-            mock_open.mock_calls[3][1][0].lower(),
-            f"{os.getcwd()}/input_file_Part2.json".lower(),
+            names,
+            [
+                f"{os.getcwd()}/input_file_Part{part}.json".lower()
+                for part in (1, 2, 3)
+            ],
         )
-        self.assertEqual(
-            mock_open.mock_calls[6][1][0].lower(),
-            f"{os.getcwd()}/input_file_Part3.json".lower(),
+
+    @mock.patch("json.dump")
+    @mock.patch("builtins.open", new_callable=mock.mock_open)
+    @mock.patch("photo_id.process_quiz.process_quiz_file")
+    @mock.patch("photo_id.process_quiz.sorted_species")
+    def test_split_quiz_with_index(
+        self,
+        mock_sorted_species,
+        mock_process_quiz_file,
+        _mock_open,
+        _mock_json_dump,
+    ):
+        """
+        Test a TaxonomyIndex is used as it is, not indexed again.
+        """
+        taxonomy = TaxonomyIndex([{"comName": "Species A", "taxonOrder": 1}])
+        quiz_data = {
+            "location": "Test Location",
+            "start_month": 1,
+            "end_month": 12,
+            "species": [{"comName": "Species A"}],
+        }
+        mock_process_quiz_file.return_value = quiz_data
+        mock_sorted_species.return_value = quiz_data["species"]
+
+        photo_id.process_quiz.split_quiz("input_file.json", 10, taxonomy)
+
+        self.assertIs(
+            mock_process_quiz_file.call_args[1]["taxonomy"], taxonomy
         )
+        self.assertIs(mock_sorted_species.call_args[0][1], taxonomy)
 
 
 class TestApplyAvonetData(unittest.TestCase):
@@ -512,3 +692,93 @@ class TestApplyAvonetData(unittest.TestCase):
         mock_logging_warning.assert_called_once_with(
             "The species %s does not have a scientific name.", "Unknown Bird"
         )
+
+
+class TestIncrementalBuilds(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.quiz = os.path.join(self.directory.name, "quiz.json")
+        with open(self.quiz, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "location": "NO",
+                    "start_month": 5,
+                    "end_month": 6,
+                    "species": [
+                        {
+                            "comName": "Common Chaffinch",
+                            "sciName": "Fringilla coelebs",
+                        },
+                        {
+                            "comName": "Brambling",
+                            "sciName": "Fringilla montifringilla",
+                        },
+                    ],
+                },
+                f,
+            )
+        self.manifest = build_manifest.BuildManifest(
+            os.path.join(self.directory.name, "manifest.sqlite")
+        )
+        self.taxonomy = TaxonomyIndex(
+            [
+                {"comName": "Brambling", "taxonOrder": 1},
+                {"comName": "Common Chaffinch", "taxonOrder": 2},
+            ]
+        )
+        self.taxonomy.taxonomy_version = "2024"
+
+    def tearDown(self):
+        self.manifest.close()
+        self.directory.cleanup()
+
+    def test_sort_quiz_skips_unchanged(self):
+        sort_quiz(self.quiz, self.taxonomy, self.manifest)
+        modified = os.stat(self.quiz + ".sorted").st_mtime_ns
+        sort_quiz(self.quiz, self.taxonomy, self.manifest)
+        self.assertEqual(self.manifest.hits, 1)
+        self.taxonomy.taxonomy_version = "2025"
+        with mock.patch("photo_id.process_quiz.open", wraps=open) as opened:
+            sort_quiz(self.quiz, self.taxonomy, self.manifest)
+        # Rebuilt for the new taxonomy, but the same bytes are not rewritten.
+        self.assertNotIn(
+            mock.call(self.quiz + ".sorted", encoding="utf-8", mode="wt"),
+            opened.call_args_list,
+        )
+        self.assertEqual(os.stat(self.quiz + ".sorted").st_mtime_ns, modified)
+
+    def test_sort_quiz_unknown_taxonomy_version(self):
+        taxonomy = TaxonomyIndex(list(self.taxonomy))
+        sort_quiz(self.quiz, taxonomy, self.manifest)
+        sort_quiz(self.quiz, taxonomy, self.manifest)
+        self.assertEqual(self.manifest.hits, 0)
+
+    def test_build_to_another_output(self):
+        targets = os.path.join(self.directory.name, "targets.txt")
+        with open(targets, "wt", encoding="utf-8") as f:
+            f.write("1.\nBrambling\n10.\n")
+        first = os.path.join(self.directory.name, "first.json")
+        second = os.path.join(self.directory.name, "second.json")
+        build_quiz_from_target_species(
+            targets, 0, first, 5, 6, "NO", self.manifest
+        )
+        build_quiz_from_target_species(
+            targets, 0, second, 5, 6, "NO", self.manifest
+        )
+        self.assertEqual(self.manifest.hits, 0)
+        self.assertTrue(os.path.isfile(second))
+
+    def test_apply_avonet_data_in_place(self):
+        avonet = {"Fringilla coelebs": {"Mass": 20}}
+        photo_id.process_quiz.apply_avonet_data(
+            self.quiz, avonet, self.manifest
+        )
+        photo_id.process_quiz.apply_avonet_data(
+            self.quiz, avonet, self.manifest
+        )
+        self.assertEqual(self.manifest.hits, 1)
+        photo_id.process_quiz.apply_avonet_data(
+            self.quiz, {"Fringilla coelebs": {"Mass": 21}}, self.manifest
+        )
+        with open(self.quiz, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["species"][0]["Mass"], 21)
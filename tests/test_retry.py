@@ -0,0 +1,194 @@
+"""
+Tests  photo_id/retry.py
+"""
+
+import concurrent.futures
+import email.utils
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from photo_id import http_client
+from photo_id import retry
+from photo_id.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from tests.http_stub import StubServer
+
+
+def flaky(failures, status=503, headers=None):
+    """A route that fails `failures` times and then succeeds."""
+    remaining = [failures]
+
+    def route(query):
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            return status, headers or {}, b""
+        return 200, {}, b"ok"
+
+    return route
+
+
+class TestGet(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(retry._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sleeps = []
+
+    def get(self, stub, path, policy=RetryPolicy()):
+        return retry.get(
+            stub.url(path), http_client.get, policy, self.sleeps.append
+        )
+
+    def test_retries_until_success(self):
+        with StubServer({"/flaky": flaky(2)}) as stub:
+            response = self.get(stub, "/flaky")
+        self.assertEqual(response.content, b"ok")
+        self.assertEqual(stub.requests, ["/flaky"] * 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_backoff_is_exponential_with_jitter(self):
+        with mock.patch("photo_id.retry.random.uniform") as uniform:
+            uniform.side_effect = lambda low, high: high
+            with StubServer({"/flaky": flaky(3)}) as stub:
+                self.get(stub, "/flaky")
+        self.assertEqual(self.sleeps, [0.5, 1.0, 2.0])
+        uniform.assert_called_with(0, 2.0)
+
+    def test_retry_after(self):
+        with StubServer(
+            {"/busy": flaky(1, status=429, headers={"Retry-After": "3"})}
+        ) as stub:
+            self.get(stub, "/busy")
+        self.assertEqual(self.sleeps, [3.0])
+
+    def test_gives_up(self):
+        with StubServer({"/down": flaky(10)}) as stub:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.get(stub, "/down", RetryPolicy(attempts=3))
+        self.assertEqual(stub.requests, ["/down"] * 3)
+
+    def test_client_errors_not_retried(self):
+        with StubServer({}) as stub:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.get(stub, "/missing")
+        self.assertEqual(stub.requests, ["/missing"])
+        self.assertEqual(self.sleeps, [])
+
+    def test_connection_errors_retried(self):
+        response = mock.Mock(status_code=200)
+        fetch = mock.Mock(
+            side_effect=[requests.exceptions.ConnectionError, response]
+        )
+        self.assertIs(
+            retry.get("http://example.com/", fetch, sleep=self.sleeps.append),
+            response,
+        )
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_client_error_closes_response(self):
+        response = mock.Mock(status_code=404)
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError
+        with self.assertRaises(requests.exceptions.HTTPError):
+            retry.get("http://example.com/", lambda url: response)
+        response.close.assert_called_once_with()
+
+    def test_other_errors_end_trial(self):
+        retry._breakers["example.com"] = CircuitBreaker(
+            failure_threshold=1, reset_timeout=0
+        )
+        retry.breaker("example.com").record_failure()
+        response = mock.Mock(status_code=200)
+        fetch = mock.Mock(
+            side_effect=[requests.exceptions.ChunkedEncodingError, response]
+        )
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            retry.get("http://example.com/", fetch, sleep=self.sleeps.append)
+        self.assertIs(
+            retry.get("http://example.com/", fetch, sleep=self.sleeps.append),
+            response,
+        )
+        self.assertEqual(self.sleeps, [])
+
+    def test_cancelled_is_not_a_failure(self):
+        retry._breakers["example.com"] = CircuitBreaker(
+            failure_threshold=1, reset_timeout=0
+        )
+        retry.breaker("example.com").record_failure()
+        response = mock.Mock(status_code=200)
+        fetch = mock.Mock(
+            side_effect=[concurrent.futures.CancelledError, response]
+        )
+        with self.assertRaises(concurrent.futures.CancelledError):
+            retry.get("http://example.com/", fetch)
+        # The trial was called off, so the next request is the trial.
+        self.assertIs(retry.get("http://example.com/", fetch), response)
+        self.assertEqual(retry.breaker("example.com")._failures, 0)
+
+    def test_circuit_opens_for_failing_host(self):
+        with StubServer({"/down": flaky(10)}) as stub:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.get(stub, "/down")
+            # Five failures open the circuit, so the host is left alone.
+            with self.assertRaises(CircuitOpenError):
+                self.get(stub, "/down")
+        self.assertEqual(len(stub.requests), 5)
+        self.assertTrue(retry.breaker("127.0.0.1").is_open)
+
+
+class TestRetryAfterSeconds(unittest.TestCase):
+    def test_values(self):
+        self.assertIsNone(retry.retry_after_seconds(None))
+        self.assertIsNone(retry.retry_after_seconds("soon"))
+        self.assertEqual(retry.retry_after_seconds("120"), 120.0)
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(retry.retry_after_seconds(date), 60, delta=2)
+
+    def test_capped(self):
+        response = mock.Mock(headers={"Retry-After": "3600"})
+        self.assertEqual(RetryPolicy(max_delay=30).delay(0, response), 30)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(
+            failure_threshold=2, reset_timeout=10, clock=lambda: self.now
+        )
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+    def test_single_trial_after_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.is_open)
+
+    def test_failed_trial_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.now = 20
+        self.assertTrue(self.breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
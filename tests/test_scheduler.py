@@ -0,0 +1,95 @@
+"""
+Tests  photo_id/scheduler.py
+"""
+
+import threading
+import unittest
+
+from photo_id.scheduler import Priority, Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(workers=1)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        started = threading.Event()
+
+        def block():
+            started.set()
+            self.release.wait()
+
+        # Holds the only worker until the queue is set up.
+        self.blocker = self.scheduler.submit(block)
+        started.wait(5)
+        self.order = []
+
+    def submit(self, name, priority, owner=None):
+        return self.scheduler.submit(
+            lambda: self.order.append(name), priority, owner
+        )
+
+    def run_queue(self, jobs):
+        self.release.set()
+        for job in jobs:
+            job.exception(timeout=5)
+
+    def test_priority_order(self):
+        jobs = [
+            self.submit("warming", Priority.WARMING),
+            self.submit("lookahead", Priority.LOOKAHEAD),
+            self.submit("visible", Priority.VISIBLE),
+            self.submit("first", Priority.FIRST_IMAGE),
+            self.submit("visible2", Priority.VISIBLE),
+        ]
+        self.assertEqual(self.scheduler.pending(), 5)
+        self.run_queue(jobs)
+        self.assertEqual(
+            self.order,
+            ["visible", "visible2", "first", "lookahead", "warming"],
+        )
+
+    def test_reprioritise(self):
+        jobs = [
+            self.submit("a", Priority.LOOKAHEAD),
+            self.submit("b", Priority.LOOKAHEAD),
+            self.submit("c", Priority.LOOKAHEAD),
+        ]
+        self.scheduler.reprioritise(jobs[2], Priority.VISIBLE)
+        self.scheduler.reprioritise(jobs[0], Priority.WARMING)
+        self.scheduler.reprioritise(jobs[0], Priority.LOOKAHEAD)
+        self.assertEqual(self.scheduler.pending(), 3)
+        self.run_queue(jobs)
+        self.assertEqual(self.order, ["c", "a", "b"])
+
+    def test_cancel_owner(self):
+        window, other = object(), object()
+        jobs = [
+            self.submit("a", Priority.VISIBLE, window),
+            self.submit("b", Priority.VISIBLE, other),
+            self.submit("c", Priority.LOOKAHEAD, window),
+        ]
+        self.scheduler.reprioritise(jobs[2], Priority.FIRST_IMAGE)
+        self.assertEqual(self.scheduler.cancel_owner(window), 2)
+        self.run_queue([jobs[1]])
+        self.assertEqual(self.order, ["b"])
+        self.assertTrue(jobs[0].cancelled())
+        self.assertTrue(jobs[2].cancelled())
+
+    def test_results_and_exceptions(self):
+        def fail():
+            raise OSError("offline")
+
+        result = self.scheduler.submit(lambda: 42)
+        failure = self.scheduler.submit(fail)
+        self.run_queue([result, failure])
+        self.assertEqual(result.result(), 42)
+        self.assertIsInstance(failure.exception(), OSError)
+
+    def test_started_job_not_moved(self):
+        self.scheduler.reprioritise(self.blocker, Priority.WARMING)
+        self.assertEqual(self.blocker.priority, Priority.FIRST_IMAGE)
+
+
+if __name__ == "__main__":
+    unittest.main()
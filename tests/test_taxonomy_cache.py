@@ -0,0 +1,168 @@
+"""
+Tests  photo_id/taxonomy_cache.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from photo_id import taxonomy_cache
+
+
+class TestTaxonomyCache(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.taxonomy = [
+            {
+                "sciName": "Anser anser",
+                "comName": "Graylag Goose",
+                "speciesCode": "gragoo",
+                "category": "species",
+                "taxonOrder": 263.0,
+                "bandingCodes": ["GRGO"],
+                "comNameCodes": [],
+                "familyComName": "Ducks, Geese, and Waterfowl",
+            },
+            {
+                "sciName": "Branta leucopsis",
+                "comName": "Barnacle Goose",
+                "speciesCode": "bargoo",
+                "category": "species",
+                "taxonOrder": 304.0,
+                "bandingCodes": ["BARG"],
+                "comNameCodes": ["BAGO"],
+                "familyComName": "Ducks, Geese, and Waterfowl",
+                "extinct": False,
+            },
+        ]
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "taxonomy.bin")
+        taxonomy_cache.write_cache(self.path, self.taxonomy)
+        self.cache = taxonomy_cache.open_cache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(list(self.cache), self.taxonomy)
+        self.assertEqual(self.cache[-1], self.taxonomy[-1])
+        self.assertEqual(self.cache[0:1], self.taxonomy[0:1])
+
+    def test_version_stamp(self):
+        path = os.path.join(self.directory.name, "stamped.bin")
+        taxonomy_cache.write_cache(
+            path, self.taxonomy, "2024.0", fetched_at=1700000000.0
+        )
+        cache = taxonomy_cache.open_cache(path)
+        self.assertEqual(cache.taxonomy_version, "2024.0")
+        self.assertEqual(cache.fetched_at, 1700000000.0)
+        self.assertEqual(list(cache), self.taxonomy)
+        cache.close()
+
+    def test_write_is_atomic(self):
+        with mock.patch(
+            "photo_id.taxonomy_cache.os.replace", side_effect=OSError
+        ):
+            with self.assertRaises(OSError):
+                taxonomy_cache.write_cache(self.path, [])
+        self.assertEqual(os.listdir(self.directory.name), ["taxonomy.bin"])
+        cache = taxonomy_cache.open_cache(self.path)
+        self.assertEqual(list(cache), self.taxonomy)
+        cache.close()
+
+    def test_failed_write_leaves_no_temporary_file(self):
+        with mock.patch(
+            "photo_id.taxonomy_cache.os.fsync",
+            side_effect=OSError("No space left on device"),
+        ):
+            with self.assertRaises(OSError):
+                taxonomy_cache.write_cache(self.path, self.taxonomy)
+        self.assertEqual(os.listdir(self.directory.name), ["taxonomy.bin"])
+
+    def test_replace_deferred_while_in_use(self):
+        real_replace = os.replace
+        calls = []
+
+        def replace(source, destination):
+            calls.append(destination)
+            if len(calls) == 1:
+                raise PermissionError
+            real_replace(source, destination)
+
+        with mock.patch(
+            "photo_id.taxonomy_cache.os.replace", side_effect=replace
+        ):
+            taxonomy_cache.write_cache(self.path, self.taxonomy[:1])
+        self.assertEqual(calls, [self.path, self.path + ".new"])
+        cache = taxonomy_cache.open_cache(self.path)
+        self.assertEqual(list(cache), self.taxonomy[:1])
+        self.assertFalse(os.path.exists(self.path + ".new"))
+        cache.close()
+
+    def test_missing_fields_are_absent(self):
+        self.assertNotIn("extinct", self.cache[0])
+        self.assertIs(self.cache.field(0, "extinct", "none"), "none")
+        self.assertIs(self.cache.field(1, "extinct"), False)
+
+    def test_field(self):
+        self.assertEqual(self.cache.field(1, "comName"), "Barnacle Goose")
+        self.assertEqual(self.cache.field(1, "taxonOrder"), 304.0)
+        self.assertEqual(self.cache.field(1, "comNameCodes"), ["BAGO"])
+        self.assertIsNone(self.cache.field(1, "noSuchField"))
+
+    def test_iter_fields(self):
+        self.assertEqual(
+            list(self.cache.iter_fields("speciesCode", "taxonOrder")),
+            [("gragoo", 263.0), ("bargoo", 304.0)],
+        )
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.cache[2]
+
+    def test_shared_strings_stored_once(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertEqual(data.count(b"Ducks, Geese, and Waterfowl"), 1)
+
+    def test_empty_taxonomy(self):
+        path = os.path.join(self.directory.name, "empty.bin")
+        taxonomy_cache.write_cache(path, [])
+        cache = taxonomy_cache.open_cache(path)
+        self.assertEqual(list(cache), [])
+        cache.close()
+
+    def test_missing_file(self):
+        with self.assertRaises(taxonomy_cache.TaxonomyCacheError):
+            taxonomy_cache.open_cache(
+                os.path.join(self.directory.name, "missing.bin")
+            )
+
+    def test_bad_magic(self):
+        path = os.path.join(self.directory.name, "legacy")
+        with open(path, "wt", encoding="utf-8") as f:
+            f.write('[{"comName": "value"}]')
+        with self.assertRaises(taxonomy_cache.TaxonomyCacheError):
+            taxonomy_cache.open_cache(path)
+
+    def test_empty_file(self):
+        path = os.path.join(self.directory.name, "empty.bin")
+        open(path, "wb").close()
+        with self.assertRaises(taxonomy_cache.TaxonomyCacheError):
+            taxonomy_cache.open_cache(path)
+
+    def test_truncated_file(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        path = os.path.join(self.directory.name, "truncated.bin")
+        with open(path, "wb") as f:
+            f.write(data[:40])
+        with self.assertRaises(taxonomy_cache.TaxonomyCacheError):
+            taxonomy_cache.open_cache(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests  photo_id/taxonomy_index.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from photo_id import taxonomy_cache
+from photo_id.taxonomy_index import TaxonomyIndex, as_index
+
+
+class TestTaxonomyIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.taxonomy = [
+            {
+                "comName": "Brambling",
+                "sciName": "Fringilla montifringilla",
+                "speciesCode": "brambl",
+                "taxonOrder": 1,
+                "bandingCodes": ["BRAM"],
+                "comNameCodes": [],
+            },
+            {
+                "comName": "Common Chaffinch",
+                "sciName": "Fringilla coelebs",
+                "speciesCode": "comcha",
+                "taxonOrder": 2,
+                "bandingCodes": [],
+                "comNameCodes": ["COCH"],
+            },
+            {"comName": "Brambling", "taxonOrder": 3},
+        ]
+        self.index = TaxonomyIndex(self.taxonomy)
+
+    def test_by_common_name_case_insensitive(self):
+        self.assertIs(
+            self.index.by_common_name("common CHAFFINCH"), self.taxonomy[1]
+        )
+
+    def test_by_common_name_first_entry_wins(self):
+        self.assertIs(self.index.by_common_name("Brambling"), self.taxonomy[0])
+
+    def test_by_scientific_name(self):
+        self.assertIs(
+            self.index.by_scientific_name("fringilla coelebs"),
+            self.taxonomy[1],
+        )
+
+    def test_by_species_code(self):
+        self.assertIs(self.index.by_species_code("brambl"), self.taxonomy[0])
+
+    def test_by_code(self):
+        self.assertIs(self.index.by_code("bram"), self.taxonomy[0])
+        self.assertIs(self.index.by_code("COCH"), self.taxonomy[1])
+
+    def test_lookup_any_key(self):
+        self.assertIs(self.index.lookup("comcha"), self.taxonomy[1])
+        self.assertIs(
+            self.index.lookup("Fringilla montifringilla"), self.taxonomy[0]
+        )
+        self.assertIsNone(self.index.lookup("Unknown Species"))
+
+    def test_sequence_behaviour(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(list(self.index), self.taxonomy)
+        self.assertIs(self.index[2], self.taxonomy[2])
+
+    def test_as_index(self):
+        self.assertIs(as_index(self.index), self.index)
+        self.assertIsInstance(as_index(self.taxonomy), TaxonomyIndex)
+
+    def test_add_locale(self):
+        self.index.add_locale(
+            "no",
+            [
+                {"speciesCode": "brambl", "comName": "Bjørkefink"},
+                {"speciesCode": "comcha", "comName": "Bokfink"},
+                {"speciesCode": "nosuch", "comName": "Ukjent"},
+            ],
+        )
+        self.assertIs(self.index.by_common_name("bokfink"), self.taxonomy[1])
+        self.assertIs(self.index.lookup("Bjørkefink"), self.taxonomy[0])
+        self.assertIsNone(self.index.by_common_name("Ukjent"))
+        self.assertEqual(self.index.local_name(1, "no"), "Bokfink")
+        self.assertIsNone(self.index.local_name(2, "no"))
+        self.assertIsNone(self.index.local_name(1, "es"))
+        self.assertEqual(list(self.index.locales), ["no"])
+
+    def test_english_names_win_over_locales(self):
+        self.index.add_locale(
+            "xx", [{"speciesCode": "comcha", "comName": "Brambling"}]
+        )
+        self.assertIs(self.index.by_common_name("Brambling"), self.taxonomy[0])
+
+    def test_closest_includes_locales(self):
+        self.assertIsNone(self.index.closest("Bokfinkk"))
+        self.index.add_locale(
+            "no", [{"speciesCode": "comcha", "comName": "Bokfink"}]
+        )
+        self.assertEqual(self.index.closest("Bokfinkk").position, 1)
+
+    def test_index_over_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "taxonomy.bin")
+            taxonomy_cache.write_cache(path, self.taxonomy)
+            cache = taxonomy_cache.open_cache(path)
+            index = TaxonomyIndex(cache)
+            self.assertEqual(index.by_code("COCH"), self.taxonomy[1])
+            self.assertEqual(
+                index.by_common_name("brambling"), self.taxonomy[0]
+            )
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
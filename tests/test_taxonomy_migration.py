@@ -0,0 +1,170 @@
+"""
+Tests  photo_id/taxonomy_migration.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from photo_id import taxonomy_cache
+from photo_id import taxonomy_migration
+
+
+def species(code, com_name, sci_name, order):
+    return {
+        "comName": com_name,
+        "sciName": sci_name,
+        "speciesCode": code,
+        "taxonOrder": order,
+    }
+
+
+OLD = [
+    species("brambl", "Brambling", "Fringilla montifringilla", 1),
+    species("comcha", "Common Chaffinch", "Fringilla coelebs", 2),
+    species("grhwar", "Grey Warbler", "Gerygone igata", 3),
+    species("westwa", "Western Warbler", "Phylloscopus occidentalis", 4),
+    species("easwar", "Eastern Warbler", "Phylloscopus orientalis", 5),
+    species("extinc", "Extinct Bird", "Avis extincta", 6),
+]
+NEW = [
+    species("comcha", "Eurasian Chaffinch", "Fringilla coelebs", 1),
+    species("brambl", "Brambling", "Fringilla montifringilla", 2),
+    species("gragry", "Grey Gerygone", "Gerygone igata", 3),
+    species("westwa", "Warbler", "Phylloscopus occidentalis", 4),
+    species("newsp1", "New Species", "Avis nova", 5),
+]
+
+
+class TestDiffTaxonomies(unittest.TestCase):
+    def setUp(self):
+        self.diff = taxonomy_migration.diff_taxonomies(OLD, NEW)
+
+    def test_changes(self):
+        self.assertEqual(
+            self.diff.changes,
+            {
+                "brambl": NEW[1],
+                "comcha": NEW[0],
+                "grhwar": NEW[2],
+                "westwa": NEW[3],
+            },
+        )
+
+    def test_removed_and_added(self):
+        self.assertEqual(self.diff.removed, ["easwar", "extinc"])
+        self.assertEqual(self.diff.added, ["newsp1"])
+        self.assertEqual(self.diff.lumped, {})
+
+    def test_lumped(self):
+        old = OLD + [
+            species("easwa2", "Eastern", "Phylloscopus occidentalis", 7)
+        ]
+        diff = taxonomy_migration.diff_taxonomies(old, NEW)
+        self.assertEqual(diff.lumped, {"westwa": ["westwa", "easwa2"]})
+
+    def test_no_differences(self):
+        self.assertFalse(taxonomy_migration.diff_taxonomies(OLD, OLD))
+
+    def test_diff_of_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, taxonomy in (("old.bin", OLD), ("new.bin", NEW)):
+                paths.append(os.path.join(directory, name))
+                taxonomy_cache.write_cache(paths[-1], taxonomy)
+            old, new = (taxonomy_cache.open_cache(p) for p in paths)
+            diff = taxonomy_migration.diff_taxonomies(old, new)
+            old.close()
+            new.close()
+        self.assertEqual(diff.changes, self.diff.changes)
+
+
+class TestMigrateQuiz(unittest.TestCase):
+    def setUp(self):
+        self.diff = taxonomy_migration.diff_taxonomies(OLD, NEW)
+
+    def test_sorted_quiz_is_migrated_and_resorted(self):
+        quiz = {
+            "location": "Norway",
+            "species": [
+                dict(OLD[0], notes="keep me"),
+                OLD[1],
+                OLD[5],
+            ],
+        }
+        self.assertTrue(taxonomy_migration.migrate_quiz(quiz, self.diff))
+        self.assertEqual(
+            quiz["species"],
+            [NEW[0], dict(NEW[1], notes="keep me"), OLD[5]],
+        )
+
+    def test_names_without_codes(self):
+        quiz = {"species": [{"comName": "Grey Warbler"}, {"comName": "Ruff"}]}
+        self.assertTrue(taxonomy_migration.migrate_quiz(quiz, self.diff))
+        self.assertEqual(
+            quiz["species"],
+            [{"comName": "Grey Gerygone"}, {"comName": "Ruff"}],
+        )
+
+    def test_lumped_duplicates_removed(self):
+        old = OLD + [
+            species("easwa2", "Eastern", "Phylloscopus occidentalis", 7)
+        ]
+        diff = taxonomy_migration.diff_taxonomies(old, NEW)
+        quiz = {"species": [OLD[3], old[-1]]}
+        self.assertTrue(taxonomy_migration.migrate_quiz(quiz, diff))
+        self.assertEqual(quiz["species"], [NEW[3]])
+
+    def test_unchanged_quiz(self):
+        quiz = {"species": [{"comName": "Ruff"}]}
+        self.assertFalse(taxonomy_migration.migrate_quiz(quiz, self.diff))
+        self.assertFalse(taxonomy_migration.migrate_quiz({}, self.diff))
+
+
+class TestMigrateDirectory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.makedirs(os.path.join(self.root, "Norway"))
+        self.files = {
+            "Norway/Part1.json": {"species": [OLD[1]]},
+            "Norway/Part2.json": {"species": [{"comName": "Ruff"}]},
+            "notes.json": ["not", "a", "quiz"],
+        }
+        for name, data in self.files.items():
+            with open(os.path.join(self.root, name), "wt") as f:
+                json.dump(data, f, indent=4)
+        with open(os.path.join(self.root, "broken.json"), "wt") as f:
+            f.write("{")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_only_changed_files_rewritten(self):
+        unchanged = os.path.join(self.root, "Norway/Part2.json")
+        before = os.stat(unchanged).st_mtime_ns
+        rewritten = taxonomy_migration.migrate_directory(
+            self.root, taxonomy_migration.diff_taxonomies(OLD, NEW)
+        )
+        changed = os.path.join(self.root, "Norway/Part1.json")
+        self.assertEqual(rewritten, [changed])
+        with open(changed, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"species": [NEW[0]]})
+        self.assertEqual(os.stat(unchanged).st_mtime_ns, before)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.root, "Norway"))),
+            ["Part1.json", "Part2.json"],
+        )
+
+    def test_no_differences(self):
+        self.assertEqual(
+            taxonomy_migration.migrate_directory(
+                self.root, taxonomy_migration.diff_taxonomies(OLD, OLD)
+            ),
+            [],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
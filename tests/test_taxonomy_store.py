@@ -0,0 +1,126 @@
+"""
+Tests  photo_id/taxonomy_store.py
+"""
+
+import array
+import os
+import sys
+import tempfile
+import unittest
+
+from photo_id import taxonomy_cache
+from photo_id.taxonomy_store import APP_FIELDS, TaxonomyStore, iter_fields
+
+
+class TestTaxonomyStore(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.taxonomy = [
+            {
+                "sciName": "Anser anser",
+                "comName": "Graylag Goose",
+                "speciesCode": "gragoo",
+                "category": "species",
+                "taxonOrder": 263.0,
+                "bandingCodes": ["GRGO"],
+                "comNameCodes": [],
+                "familyCode": "anatid1",
+                "familyComName": "Ducks, Geese, and Waterfowl",
+                "familySciName": "Anatidae",
+            },
+            {
+                "sciName": "Branta leucopsis",
+                "comName": "Barnacle Goose",
+                "speciesCode": "bargoo",
+                "category": "species",
+                "taxonOrder": 304.0,
+                "bandingCodes": ["BARG"],
+                "comNameCodes": ["BAGO"],
+                "familyCode": "anatid1",
+                "familyComName": "Ducks, Geese, and Waterfowl",
+                "familySciName": "Anatidae",
+                "extinct": False,
+            },
+        ]
+        self.store = TaxonomyStore(self.taxonomy)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(list(self.store), self.taxonomy)
+        self.assertEqual(self.store[-1], self.taxonomy[-1])
+        self.assertEqual(self.store[0:1], self.taxonomy[0:1])
+        self.assertIsInstance(self.store[0]["taxonOrder"], float)
+
+    def test_entries_are_new_dicts(self):
+        entry = self.store[1]
+        entry["comNameCodes"].append("XXXX")
+        entry["notes"] = "changed"
+        self.assertEqual(self.store[1], self.taxonomy[1])
+
+    def test_integer_taxon_order(self):
+        self.assertIsInstance(self.store._taxon_order, array.array)
+        self.assertEqual(self.store.taxon_order(1), 304.0)
+
+    def test_fractional_taxon_order(self):
+        store = TaxonomyStore([{"comName": "A", "taxonOrder": 1.5}])
+        self.assertEqual(store[0], {"comName": "A", "taxonOrder": 1.5})
+
+    def test_strings_are_interned(self):
+        family = "".join(["Ducks, Geese, ", "and Waterfowl"])
+        store = TaxonomyStore([{"familyComName": family}])
+        self.assertIs(
+            store.field(0, "familyComName"),
+            sys.intern("Ducks, Geese, and Waterfowl"),
+        )
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(self.store, "__dict__"))
+
+    def test_projection(self):
+        store = TaxonomyStore(self.taxonomy, APP_FIELDS)
+        self.assertEqual(
+            store[1],
+            {
+                "comName": "Barnacle Goose",
+                "sciName": "Branta leucopsis",
+                "speciesCode": "bargoo",
+                "taxonOrder": 304.0,
+                "familyCode": "anatid1",
+                "familyComName": "Ducks, Geese, and Waterfowl",
+                "familySciName": "Anatidae",
+            },
+        )
+        self.assertIsNone(store.field(1, "bandingCodes"))
+
+    def test_from_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "taxonomy.bin")
+            taxonomy_cache.write_cache(path, self.taxonomy)
+            cache = taxonomy_cache.open_cache(path)
+            store = TaxonomyStore(cache)
+            projected = TaxonomyStore(cache, APP_FIELDS)
+            cache.close()
+        self.assertEqual(list(store), self.taxonomy)
+        self.assertEqual(projected[0]["comName"], "Graylag Goose")
+
+    def test_iter_fields(self):
+        expected = [("gragoo", 263.0), ("bargoo", 304.0)]
+        self.assertEqual(
+            list(iter_fields(self.store, "speciesCode", "taxonOrder")),
+            expected,
+        )
+        self.assertEqual(
+            list(iter_fields(self.taxonomy, "speciesCode", "taxonOrder")),
+            expected,
+        )
+
+    def test_empty(self):
+        store = TaxonomyStore([], APP_FIELDS)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(list(store), [])
+        with self.assertRaises(IndexError):
+            store[0]
+
+
+if __name__ == "__main__":
+    unittest.main()